@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+지역별 대표시설 일괄 지정 스크립트 (assign_regional_centers.js 대체)
+
+- 로컬 D1 또는 스냅샷 파일을 한 번만 읽어 시도/시군구/유형별로 그룹화
+- 그룹마다 선택 규칙(--rule)으로 대표시설 1곳 선정
+- partners 테이블 변경분을 한 번의 배치 묶음으로 기록 (로컬, --push 시 Production)
+
+assign_regional_centers.js 는 /api/admin/regional-centers 로 등록했지만 그 API 는 없어졌고,
+앱은 대표시설을 partners.is_regional_center 에서 읽으므로 (updateRepresentativeFacilities 와 같은)
+partners 의 AUTO_<facility_id> 행으로 기록한다. --rule first 도 마찬가지.
+
+관리자가 직접 지정한 대표시설(AUTO_ 가 아닌 partners)은 유지하고
+해당 그룹은 건너뛴다.
+
+--snapshot 은 로컬 D1 에 쓰지 않으므로 --push 또는 --dry-run 과 함께 써야 한다.
+로컬 D1 에서 읽어 --push 할 때는 AUTO_ 뒤의 id 를 facility_key 로 찾은 Production id 로 바꾼다.
+"""
+
+import argparse
+import sys
+
+from d1_common import (
+    BATCH_SIZE, build_insert, chunked, connect_local, execute_remote_batches,
+    map_facility_ids, read_snapshot, sql_literal
+)
+
+# 시설 유형 목록
+FACILITY_TYPES = ['요양병원', '요양원', '재가복지센터', '주야간보호']
+
+AUTO_PREFIX = 'AUTO_'
+PARTNER_COLUMNS = [
+    'id', 'facility_name', 'facility_type', 'facility_sido', 'facility_sigungu',
+    'facility_address', 'manager_name', 'manager_phone', 'region_key', 'is_regional_center'
+]
+
+
+# ---------------------------------------------------------------------------
+# 선택 규칙: rule(candidates, context) → 선정 시설 dict 또는 None
+# context 는 SCORING_RULES 의 로더가 규칙별로 미리 한 번 읽어 둔 값
+# ---------------------------------------------------------------------------
+
+def pick_first(candidates, context):
+    """ID가 가장 작은 시설 (assign_regional_centers_sql.sql 과 동일)"""
+    return min(candidates, key=lambda f: f['id'])
+
+
+def pick_by_rating(candidates, context):
+    """평균평점 70% + 그룹 내 리뷰수 정규화 30% (updateRepresentativeFacilities 와 동일)
+
+    승인 리뷰 3개 이상, 평균 3.0 이상인 시설만 대상
+    """
+    eligible = []
+    for facility in candidates:
+        review_count, avg_rating = context.get(facility['id'], (0, 0.0))
+        if review_count >= 3 and avg_rating >= 3.0:
+            eligible.append((facility, review_count, avg_rating))
+
+    if not eligible:
+        return None
+
+    max_count = max(count for _, count, _ in eligible)
+    best = max(
+        eligible,
+        key=lambda e: ((e[2] / 5.0) * 0.7 + (e[1] / max_count) * 0.3, e[1], -e[0]['id'])
+    )
+    return best[0]
+
+
+def pick_by_ai_score(candidates, context):
+    """facility_ai_scores.overall_quality_score 최고 시설"""
+    scored = [f for f in candidates if context.get(f['id']) is not None]
+    if not scored:
+        return None
+    return max(scored, key=lambda f: (context[f['id']], -f['id']))
+
+
+def load_rating_context(conn):
+    return {
+        row[0]: (row[1], row[2])
+        for row in conn.execute("""
+            SELECT facility_id, COUNT(*), AVG(rating)
+            FROM reviews
+            WHERE status = 'approved'
+            GROUP BY facility_id
+        """)
+    }
+
+
+def load_ai_score_context(conn):
+    return {
+        row[0]: row[1]
+        for row in conn.execute(
+            "SELECT facility_id, overall_quality_score FROM facility_ai_scores WHERE overall_quality_score IS NOT NULL"
+        )
+    }
+
+
+SCORING_RULES = {
+    'first': (pick_first, None),
+    'rating': (pick_by_rating, load_rating_context),
+    'ai': (pick_by_ai_score, load_ai_score_context),
+}
+
+
+def iter_facilities(conn, snapshot=None):
+    """로컬 D1 또는 스냅샷에서 시설 dict 를 하나씩 반환"""
+    if snapshot:
+        for row in read_snapshot(snapshot):
+            try:
+                facility_id = int(row.get('id'))
+            except (TypeError, ValueError):
+                continue
+            yield {
+                'id': facility_id,
+                'name': row.get('name') or '',
+                'facility_type': row.get('facility_type') or '',
+                'address': row.get('address') or '',
+                'phone': row.get('phone') or '',
+                'sido': row.get('sido') or '',
+                'sigungu': row.get('sigungu') or '',
+            }
+        return
+
+    for row in conn.execute("SELECT id, name, facility_type, address, phone, sido, sigungu FROM facilities"):
+        yield dict(row)
+
+
+def group_by_region(facilities):
+    """한 번의 스캔으로 (시도, 시군구, 유형) → 시설 목록"""
+    groups = {}
+    for facility in facilities:
+        if not facility['sido'] or not facility['sigungu']:
+            continue
+        if facility['facility_type'] not in FACILITY_TYPES:
+            continue
+        key = (facility['sido'], facility['sigungu'], facility['facility_type'])
+        groups.setdefault(key, []).append(facility)
+    return groups
+
+
+def load_manual_regions(conn):
+    """관리자가 직접 지정한 대표시설이 있는 (시도, 시군구, 유형)"""
+    return {
+        (row[0], row[1], row[2])
+        for row in conn.execute(
+            "SELECT facility_sido, facility_sigungu, facility_type FROM partners "
+            "WHERE is_regional_center = 1 AND id NOT LIKE ?",
+            (AUTO_PREFIX + '%',)
+        )
+    }
+
+
+def select_representatives(groups, rule, context, manual_regions):
+    """그룹별 대표시설 선정 → partners 행 목록"""
+    rows = []
+    for (sido, sigungu, facility_type), candidates in sorted(groups.items()):
+        if (sido, sigungu, facility_type) in manual_regions:
+            continue
+        selected = rule(candidates, context)
+        if selected is None:
+            continue
+        rows.append((
+            f"{AUTO_PREFIX}{selected['id']}",
+            selected['name'],
+            facility_type,
+            sido,
+            sigungu,
+            selected['address'],
+            '자동선정 대표시설',
+            selected['phone'] or '1544-0000',
+            f"{sido}_{sigungu}_{facility_type}",
+            1
+        ))
+    return rows
+
+
+def remap_rows(rows, id_map):
+    """AUTO_<로컬 id> → AUTO_<Production id> (Production 에 없는 시설은 제외)"""
+    remapped = []
+    for row in rows:
+        remote_id = id_map.get(int(row[0][len(AUTO_PREFIX):]))
+        if remote_id is not None:
+            remapped.append((f"{AUTO_PREFIX}{remote_id}",) + tuple(row[1:]))
+    return remapped
+
+
+def build_statements(rows):
+    """partners 반영용 SQL 문 묶음
+
+    1. 선정된 시설 upsert (배치)
+    2. 이번에 선정되지 않은 기존 자동지정 대표시설 해제
+    """
+    statements = []
+    for batch in chunked(rows, BATCH_SIZE):
+        statements.append(build_insert(
+            'partners', PARTNER_COLUMNS, batch,
+            conflict=['id'],
+            update_columns=['facility_name', 'facility_type', 'facility_sido', 'facility_sigungu',
+                            'facility_address', 'manager_phone', 'region_key', 'is_regional_center']
+        ))
+
+    keep = ', '.join(sql_literal(row[0]) for row in rows) or "''"
+    statements.append(
+        f"UPDATE partners SET is_regional_center = 0, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE is_regional_center = 1 AND id LIKE '{AUTO_PREFIX}%' AND id NOT IN ({keep})"
+    )
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description='지역별 대표시설 일괄 지정')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--snapshot', help='시설 목록을 읽을 스냅샷 (JSON 또는 백업 CSV)')
+    parser.add_argument('--rule', default='rating', choices=sorted(SCORING_RULES),
+                        help='대표시설 선택 규칙 (기본: rating)')
+    parser.add_argument('--push', action='store_true', help='Production D1에도 반영')
+    parser.add_argument('--dry-run', action='store_true', help='선정 결과만 출력')
+    args = parser.parse_args()
+    if args.snapshot and not (args.push or args.dry_run):
+        parser.error('--snapshot 은 로컬 D1 에 쓰지 않습니다. --push 또는 --dry-run 과 함께 사용하세요')
+
+    print("=" * 70)
+    print("🚀 지역별 대표시설 일괄 지정")
+    print("=" * 70)
+    print()
+
+    try:
+        conn = connect_local(args.db)
+        rule, context_loader = SCORING_RULES[args.rule]
+        context = context_loader(conn) if context_loader else {}
+
+        groups = group_by_region(iter_facilities(conn, args.snapshot))
+        manual_regions = load_manual_regions(conn)
+        rows = select_representatives(groups, rule, context, manual_regions)
+    except Exception as e:
+        print(f"❌ 대표시설 선정 실패: {e}")
+        sys.exit(1)
+
+    print(f"   지역/유형 그룹: {len(groups):,}개")
+    print(f"   직접 지정 유지: {len(manual_regions):,}개")
+    print(f"   자동 선정: {len(rows):,}개 (규칙: {args.rule})")
+
+    if not rows:
+        # 점수 데이터가 비어 있을 때 기존 자동지정을 모두 해제하지 않도록 중단
+        print("⚠️  선정된 시설이 없어 변경하지 않습니다.")
+        conn.close()
+        return
+
+    if args.dry_run:
+        for row in rows[:20]:
+            print(f"   - {row[8]}: {row[1]} ({row[0]})")
+        conn.close()
+        return
+
+    if not args.snapshot:
+        with conn:
+            for sql in build_statements(rows):
+                conn.execute(sql)
+        print("   ✅ 로컬 D1 반영 완료")
+
+    remote_rows = rows
+    if args.push and not args.snapshot:
+        try:
+            remote_rows = remap_rows(rows, map_facility_ids(conn))
+        except RuntimeError as e:
+            print(f"❌ Production 시설 목록 조회 실패: {e}")
+            sys.exit(1)
+        finally:
+            conn.close()
+        if len(remote_rows) < len(rows):
+            print(f"   ⚠️  Production 에 없는 시설 {len(rows) - len(remote_rows):,}개 제외")
+    else:
+        conn.close()
+
+    if args.push and not remote_rows:
+        print("⚠️  Production 에 반영할 시설이 없어 변경하지 않습니다.")
+    elif args.push:
+        print()
+        print("📤 Production D1에 반영 중...")
+        success, fail = execute_remote_batches(build_statements(remote_rows), label='대표시설')
+        print(f"   성공: {success:,}개 문, 실패: {fail:,}개 문")
+        if fail:
+            sys.exit(1)
+
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
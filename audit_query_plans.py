@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+쿼리 플랜 점검 + 지연시간 벤치마크 (운영 규모 스냅샷 기준)
+
+- 로컬 D1 복사본 또는 백업 스냅샷(JSON/CSV)으로 임시 SQLite 를 만들고
+  (--scale 로 운영 규모까지 복제, 상세/리뷰가 비어 있으면 합성 데이터 생성)
+- 앱이 실제로 쓰는 쿼리 형태(지역, 유형, 이름 검색, 검색 인덱스 조회, 좌표 범위, 상세/평점 조인)를
+  인덱스 후보 세트별로 실행해 EXPLAIN QUERY PLAN 과 p50/p95/p99 지연시간 기록
+- 인덱스 없이 전체를 읽는 쿼리(full scan) 표시
+- 세트별 대량 적재 시간을 재서 인덱스 유지 비용(쓰기 증폭) 비교
+- 중복/접두어가 겹치는 인덱스 목록 출력
+
+원본 DB 는 수정하지 않는다 (임시 파일에서만 인덱스를 바꿈).
+스냅샷에 없는 facility_type / 좌표는 SNAPSHOT_DEFAULTS 로 채우는데, 요양병원 백업 JSON
+(시설명·전화·주소·시도·시군구만 있음)처럼 기본값이 들어간 컬럼으로 거르는 쿼리
+(유형 필터, 좌표 범위)는 측정 결과가 의미 없으므로 건너뛰고 결과에 skipped 로 남긴다.
+
+예)
+    python3 audit_query_plans.py --scale 20 --output audit.json
+    python3 audit_query_plans.py --snapshot carejoa.kr_hospitals_backup_2025-10-17.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+
+from build_search_index import chosung_bigrams, hangul_bigrams, update_search_index
+from d1_common import LOCAL_DB_PATH, read_snapshot
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_RE = re.compile(r'^\d{4}_.*\.sql$')
+SEARCH_INDEX_MIGRATION = '0023_create_facility_search_index.sql'
+
+ITERATIONS = 200
+SEED = 42
+# 일부 컬럼만 있는 스냅샷(예: 요양병원 백업 JSON)의 NOT NULL 컬럼 기본값
+SNAPSHOT_DEFAULTS = {'facility_type': '요양병원', 'latitude': 0.0, 'longitude': 0.0}
+
+# 인덱스 후보 세트 (facilities 테이블 대상)
+#   current: 불러온 DB 의 현재 인덱스 그대로
+#   none: 인덱스 없음 (기준선)
+#   proposed: 중복/저효용 인덱스(sido 단독, sigungu 단독, sido+sigungu, phone)를 빼고
+#             지역+유형 복합 인덱스 하나로 대체
+INDEX_SETS = {
+    'current': None,
+    'none': [],
+    'proposed': [
+        "CREATE INDEX idx_facilities_sido_sigungu_type ON facilities(sido, sigungu, facility_type)",
+        "CREATE INDEX idx_facilities_type ON facilities(facility_type)",
+        "CREATE INDEX idx_facilities_name ON facilities(name)",
+        "CREATE INDEX idx_facilities_location ON facilities(latitude, longitude)",
+    ],
+}
+
+SEARCH_TERM_SLOTS = 3  # 검색 인덱스 조회 쿼리의 term 자리 수 (모자라면 마지막 term 반복)
+
+
+def search_term_params(terms):
+    """검색어 term 목록 → (term × SEARCH_TERM_SLOTS, 서로 다른 term 수)"""
+    terms = sorted(terms)[:SEARCH_TERM_SLOTS] or ['']
+    return (*terms, *[terms[-1]] * (SEARCH_TERM_SLOTS - len(terms)), len(terms))
+
+
+SEARCH_TERM_PLACEHOLDERS = ', '.join('?' * SEARCH_TERM_SLOTS)
+
+# 앱 쿼리 형태 카탈로그: (이름, SQL, 샘플 시설 → 파라미터)
+QUERY_CATALOGUE = [
+    ('region_filter', """
+        SELECT id, name, address, sido, sigungu, facility_type, phone, latitude, longitude
+        FROM facilities WHERE sido = ? AND sigungu = ? ORDER BY id LIMIT 20
+     """, lambda f: (f['sido'], f['sigungu'])),
+    ('region_type_filter', """
+        SELECT id, name, address, facility_type FROM facilities
+        WHERE sido = ? AND sigungu = ? AND facility_type = ? ORDER BY id LIMIT 20
+     """, lambda f: (f['sido'], f['sigungu'], f['facility_type'])),
+    ('region_count', """
+        SELECT COUNT(*) FROM facilities WHERE sido = ? AND sigungu = ?
+     """, lambda f: (f['sido'], f['sigungu'])),
+    ('type_filter', """
+        SELECT id, name, address FROM facilities WHERE facility_type = ? ORDER BY id LIMIT 20 OFFSET 100
+     """, lambda f: (f['facility_type'],)),
+    ('region_list', """
+        SELECT DISTINCT sido, sigungu FROM facilities ORDER BY sido, sigungu
+     """, lambda f: ()),
+    ('name_exact_region', """
+        SELECT id, name, address, phone FROM facilities WHERE name = ? AND sido = ? AND sigungu = ? LIMIT 1
+     """, lambda f: (f['name'], f['sido'], f['sigungu'])),
+    ('name_phone', """
+        SELECT id, name, address, phone FROM facilities WHERE name = ? AND phone = ? LIMIT 1
+     """, lambda f: (f['name'], f['phone'])),
+    ('phone_or_name_like', """
+        SELECT id, name, address, phone FROM facilities WHERE phone = ? OR name LIKE ? LIMIT 5
+     """, lambda f: (f['phone'], f"%{f['name'][:4]}%")),
+    ('name_like', """
+        SELECT id, name, address, phone FROM facilities WHERE name = ? OR name LIKE ? LIMIT 5
+     """, lambda f: (f['name'], f"%{f['name'][:4]}%")),
+    # 검색 인덱스(0023) 조회: 검색어의 term 을 모두 가진 시설 (0023 의 조회 예시와 같은 형태)
+    ('search_terms_bigram', f"""
+        SELECT f.id, f.name, f.address FROM facilities f
+        JOIN (
+            SELECT facility_id FROM facility_search_terms
+            WHERE kind = 'bigram' AND field = 'name' AND term IN ({SEARCH_TERM_PLACEHOLDERS})
+            GROUP BY facility_id HAVING COUNT(DISTINCT term) = ?
+        ) t ON t.facility_id = f.id
+        LIMIT 20
+     """, lambda f: search_term_params(hangul_bigrams(f['name'][:4]))),
+    ('search_terms_chosung', f"""
+        SELECT f.id, f.name, f.address FROM facilities f
+        JOIN (
+            SELECT facility_id FROM facility_search_terms
+            WHERE kind = 'chosung' AND field = 'name' AND term IN ({SEARCH_TERM_PLACEHOLDERS})
+            GROUP BY facility_id HAVING COUNT(DISTINCT term) = ?
+        ) t ON t.facility_id = f.id
+        LIMIT 20
+     """, lambda f: search_term_params(chosung_bigrams(f['name'][:3]))),
+    ('coordinate_box', """
+        SELECT id, name, latitude, longitude FROM facilities
+        WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+     """, lambda f: (f['latitude'] - 0.02, f['latitude'] + 0.02, f['longitude'] - 0.025, f['longitude'] + 0.025)),
+    ('detail_join', """
+        SELECT f.id, f.name, f.address, d.specialties, d.admission_types, d.monthly_cost, d.deposit
+        FROM facilities f LEFT JOIN facility_details d ON d.facility_id = f.id
+        WHERE f.id = ?
+     """, lambda f: (f['id'],)),
+    ('rating_by_facility', """
+        SELECT AVG(rating), COUNT(*) FROM facility_reviews WHERE facility_id = ?
+     """, lambda f: (f['id'],)),
+    ('region_list_with_details_ratings', """
+        SELECT f.id, f.name, f.facility_type, d.monthly_cost, COUNT(r.id) AS review_count, AVG(r.rating) AS avg_rating
+        FROM facilities f
+        LEFT JOIN facility_details d ON d.facility_id = f.id
+        LEFT JOIN facility_reviews r ON r.facility_id = f.id AND r.status = 'approved'
+        WHERE f.sido = ? AND f.sigungu = ?
+        GROUP BY f.id ORDER BY avg_rating DESC LIMIT 20
+     """, lambda f: (f['sido'], f['sigungu'])),
+]
+
+# 스냅샷 기본값(SNAPSHOT_DEFAULTS)이 들어가면 결과가 의미 없어지는 쿼리 → 거르는 컬럼
+DEFAULT_SENSITIVE_QUERIES = {
+    'region_type_filter': ('facility_type',),
+    'type_filter': ('facility_type',),
+    'coordinate_box': ('latitude', 'longitude'),
+}
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크 DB 준비
+# ---------------------------------------------------------------------------
+
+def copy_database(source_path, target_path):
+    """로컬 D1 을 임시 파일로 복사 (sqlite backup API, 원본 잠금 최소화)"""
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    target = sqlite3.connect(target_path)
+    source.backup(target)
+    source.close()
+    return target
+
+
+def apply_migrations(conn):
+    """migrations/00xx_*.sql 을 순서대로 적용 (이미 있는 컬럼 등 오류는 건너뜀)"""
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not MIGRATION_RE.match(name):
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+            try:
+                conn.executescript(f.read())
+            except sqlite3.Error as e:
+                print(f"   ⚠️  {name}: {e}")
+
+
+def load_snapshot(conn, snapshot):
+    """스냅샷 행을 facilities 에 적재 → (적재 수, {기본값 채운 컬럼: 행 수}, 건너뛴 수)
+
+    백업 JSON 처럼 일부 컬럼만 있는 스냅샷은 NOT NULL 컬럼을 SNAPSHOT_DEFAULTS 로 채우고,
+    기본값이 없는 NOT NULL 컬럼(시설명, 주소, 시도, 시군구)이 비어 있는 행은 건너뛴다.
+    """
+    info = list(conn.execute("PRAGMA table_info(facilities)"))
+    columns = [row[1] for row in info]
+    required = [row[1] for row in info if row[3] and row[4] is None and not row[5]]
+    loaded = skipped = 0
+    filled = {}
+    with conn:
+        for row in read_snapshot(snapshot):
+            values = {c: row[c] for c in columns if row.get(c) not in (None, '')}
+            missing = [c for c in required if c not in values]
+            if any(c not in SNAPSHOT_DEFAULTS for c in missing):
+                skipped += 1
+                continue
+            for column in missing:
+                values[column] = SNAPSHOT_DEFAULTS[column]
+                filled[column] = filled.get(column, 0) + 1
+            conn.execute(
+                f"INSERT OR REPLACE INTO facilities ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+                list(values.values())
+            )
+            loaded += 1
+    return loaded, filled, skipped
+
+
+def scale_facilities(conn, factor):
+    """facilities 를 factor 배로 복제 (좌표는 조금씩 이동, 이름/전화는 구분되게)
+
+    검색 인덱스도 원본 시설의 term 을 복제본 id 로 복사한다 (이름 뒤에 붙인 '-n' 은
+    한글 2-gram/초성에 영향이 없어 Python 으로 다시 색인하지 않음).
+    복제본은 id 순서대로 INSERT 하므로 원본 id 순위와 같은 순서로 새 id 를 받는다.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(facilities)") if row[1] != 'id']
+    select = []
+    for column in columns:
+        if column in ('latitude', 'longitude'):
+            select.append(f"{column} + (abs(random()) % 2000 - 1000) / 100000.0")
+        elif column in ('name', 'phone'):
+            select.append(f"{column} || '-' || :copy")
+        else:
+            select.append(column)
+    max_id = conn.execute("SELECT MAX(id) FROM facilities").fetchone()[0] or 0
+    with conn:
+        conn.execute("CREATE TEMP TABLE scale_ids AS "
+                     "SELECT id AS source_id, ROW_NUMBER() OVER (ORDER BY id) AS position FROM facilities")
+        for copy in range(1, factor):
+            inserted = conn.execute(
+                f"INSERT INTO facilities ({', '.join(columns)}) "
+                f"SELECT {', '.join(select)} FROM facilities WHERE id <= :max_id ORDER BY id",
+                {'copy': copy, 'max_id': max_id}
+            ).rowcount
+            start = conn.execute("SELECT MAX(id) FROM facilities").fetchone()[0] - inserted
+            conn.execute(
+                "INSERT OR IGNORE INTO facility_search_terms (term, kind, field, facility_id) "
+                "SELECT t.term, t.kind, t.field, :start + s.position FROM facility_search_terms t "
+                "JOIN temp.scale_ids s ON s.source_id = t.facility_id",
+                {'start': start}
+            )
+        conn.execute("DROP TABLE temp.scale_ids")
+    return conn.execute("SELECT COUNT(*) FROM facilities").fetchone()[0]
+
+
+def synthesize_related(conn, rng):
+    """facility_details / facility_reviews 가 비어 있으면 조인 측정용 합성 행 생성"""
+    ids = [row[0] for row in conn.execute("SELECT id FROM facilities")]
+    created = []
+    with conn:
+        if conn.execute("SELECT COUNT(*) FROM facility_details").fetchone()[0] == 0:
+            conn.executemany(
+                "INSERT INTO facility_details (facility_id, specialties, admission_types, monthly_cost, deposit) "
+                "VALUES (?, '[\"치매\"]', '[\"정규입소\"]', ?, ?)",
+                [(i, rng.randrange(1_000_000, 4_000_000, 10_000), rng.randrange(0, 5_000_000, 10_000)) for i in ids]
+            )
+            created.append('facility_details')
+        if conn.execute("SELECT COUNT(*) FROM facility_reviews").fetchone()[0] == 0:
+            conn.executemany(
+                "INSERT INTO facility_reviews (facility_id, rating, status) VALUES (?, ?, ?)",
+                [(rng.choice(ids), rng.randint(1, 5), rng.choice(('approved', 'approved', 'pending')))
+                 for _ in range(len(ids) * 3 // 2)]
+            )
+            created.append('facility_reviews')
+    return created
+
+
+def prepare_database(args, work_path):
+    """임시 DB 준비 → (연결, {기본값 채운 컬럼: 행 수})
+
+    검색 인덱스(0023) 테이블이 없으면 만들고, 원본 시설 기준으로 증분 갱신해 둔다 (복제 전).
+    """
+    filled = {}
+    if args.snapshot:
+        conn = sqlite3.connect(work_path)
+        apply_migrations(conn)
+        loaded, filled, skipped = load_snapshot(conn, args.snapshot)
+        print(f"   스냅샷 {loaded:,}개 시설 적재 (필수값 누락으로 건너뜀 {skipped:,}개)")
+        for column, count in filled.items():
+            print(f"   ⚠️  {column} 기본값({SNAPSHOT_DEFAULTS[column]!r}) 채움 {count:,}개")
+    else:
+        conn = copy_database(args.db or LOCAL_DB_PATH, work_path)
+    conn.row_factory = sqlite3.Row
+
+    with open(os.path.join(MIGRATIONS_DIR, SEARCH_INDEX_MIGRATION), encoding='utf-8') as f:
+        conn.executescript(f.read())
+    changed_ids, _, _ = update_search_index(conn)
+    print(f"   검색 인덱스 갱신: {len(changed_ids):,}개 시설")
+    return conn, filled
+
+
+# ---------------------------------------------------------------------------
+# 인덱스 점검 / 교체
+# ---------------------------------------------------------------------------
+
+def list_indexes(conn, table):
+    """[(인덱스명, 컬럼 튜플, CREATE 문)] (자동 인덱스 제외)"""
+    indexes = []
+    for row in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ):
+        columns = tuple(info[2] for info in conn.execute(f"PRAGMA index_info({row[0]})"))
+        indexes.append((row[0], columns, row[1]))
+    return indexes
+
+
+def primary_key(conn, table):
+    return tuple(row[1] for row in sorted(conn.execute(f"PRAGMA table_info({table})"), key=lambda r: r[5]) if row[5])
+
+
+def find_redundant_indexes(conn, tables):
+    """같은 컬럼 인덱스, 다른 인덱스의 앞부분과 같은 인덱스, 기본키와 같은 인덱스"""
+    findings = []
+    for table in tables:
+        indexes = list_indexes(conn, table)
+        pk = primary_key(conn, table)
+        for name, columns, _ in indexes:
+            if columns == pk:
+                findings.append((table, name, f"기본키 {pk} 와 같음"))
+                continue
+            for other, other_columns, _ in indexes:
+                if other == name:
+                    continue
+                if other_columns == columns and name > other:
+                    findings.append((table, name, f"{other} 와 같은 컬럼 {columns}"))
+                elif len(other_columns) > len(columns) and other_columns[:len(columns)] == columns:
+                    findings.append((table, name, f"{other}{other_columns} 의 앞부분"))
+                    break
+    return findings
+
+
+def apply_index_set(conn, statements):
+    """facilities 의 사용자 인덱스를 모두 지우고 세트의 인덱스만 생성"""
+    with conn:
+        for name, _, _ in list_indexes(conn, 'facilities'):
+            conn.execute(f"DROP INDEX {name}")
+        for sql in statements:
+            conn.execute(sql)
+        conn.execute("ANALYZE")
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+
+def explain(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_scans(plan):
+    """인덱스 없이 테이블 전체를 읽는 단계 ('SCAN f' / 'SCAN TABLE facilities')
+
+    서브쿼리 결과(MATERIALIZE / CO-ROUTINE)를 읽는 SCAN 은 테이블 스캔이 아니므로 제외.
+    """
+    subqueries = {step.split()[-1] for step in plan if step.startswith(('MATERIALIZE', 'CO-ROUTINE'))}
+    return [step for step in plan
+            if step.startswith('SCAN') and 'USING' not in step and step.split()[-1] not in subqueries]
+
+
+def percentile(sorted_values, ratio):
+    index = min(len(sorted_values) - 1, int(round(ratio * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def benchmark_queries(conn, samples, iterations, filled=None):
+    """카탈로그 쿼리별 플랜 + 지연시간 (기본값이 채워진 컬럼으로 거르는 쿼리는 skipped)"""
+    results = {}
+    for name, sql, make_params in QUERY_CATALOGUE:
+        defaulted = [c for c in DEFAULT_SENSITIVE_QUERIES.get(name, ()) if (filled or {}).get(c)]
+        if defaulted:
+            results[name] = {'skipped': f"스냅샷 기본값으로 채운 컬럼: {', '.join(defaulted)}"}
+            continue
+        plan = explain(conn, sql, make_params(samples[0]))
+        timings = []
+        for i in range(iterations):
+            params = make_params(samples[i % len(samples)])
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            'plan': plan,
+            'full_scan': full_scans(plan),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+        }
+    return results
+
+
+def measure_bulk_load(conn, statements):
+    """세트의 인덱스를 단 복사 테이블에 facilities 전체를 넣는 시간 (ms)"""
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS bench_load")
+        conn.execute("CREATE TABLE bench_load AS SELECT * FROM facilities WHERE 0")
+        for sql in statements:
+            conn.execute(
+                re.sub(r'INDEX\s+(IF NOT EXISTS\s+)?(\w+)\s+ON\s+facilities\b', r'INDEX bench_\2 ON bench_load',
+                       sql, flags=re.I)
+            )
+    started = time.perf_counter()
+    with conn:
+        conn.execute("INSERT INTO bench_load SELECT * FROM facilities")
+    elapsed = (time.perf_counter() - started) * 1000
+    with conn:
+        conn.execute("DROP TABLE bench_load")
+    return round(elapsed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='쿼리 플랜 점검 및 지연시간 벤치마크')
+    parser.add_argument('--db', help='복사해서 쓸 로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--snapshot', help='마이그레이션으로 빈 DB 를 만들고 적재할 스냅샷 (JSON 또는 백업 CSV)')
+    parser.add_argument('--scale', type=int, default=1, help='facilities 복제 배수 (운영 규모 재현용, 기본: 1)')
+    parser.add_argument('--no-synthetic', action='store_true', help='상세/리뷰 합성 데이터 만들지 않음')
+    parser.add_argument('--sets', nargs='+', choices=list(INDEX_SETS), default=list(INDEX_SETS),
+                        help='비교할 인덱스 세트 (기본: 전체)')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS, help=f'쿼리별 반복 횟수 (기본: {ITERATIONS})')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔬 쿼리 플랜 점검 / 지연시간 벤치마크")
+    print("=" * 70)
+    print()
+
+    rng = random.Random(SEED)
+    work_dir = tempfile.mkdtemp(prefix='carejoa_audit_')
+    work_path = os.path.join(work_dir, 'audit.sqlite')
+
+    try:
+        conn, filled = prepare_database(args, work_path)
+        if args.scale > 1:
+            total = scale_facilities(conn, args.scale)
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM facilities").fetchone()[0]
+        synthetic = [] if args.no_synthetic else synthesize_related(conn, rng)
+        print(f"   facilities: {total:,}개" + (f" / 합성: {', '.join(synthetic)}" if synthetic else ''))
+
+        sample_rows = conn.execute(
+            "SELECT id, name, phone, sido, sigungu, facility_type, latitude, longitude FROM facilities "
+            "WHERE sido != '' AND sigungu != '' ORDER BY random() LIMIT 500"
+        ).fetchall()
+        samples = [dict(row) for row in sample_rows]
+        for sample in samples:
+            sample['phone'] = sample['phone'] or ''
+            sample['latitude'] = sample['latitude'] or 0.0
+            sample['longitude'] = sample['longitude'] or 0.0
+        if not samples:
+            print("❌ 측정할 시설 데이터가 없습니다.")
+            sys.exit(1)
+
+        redundant = find_redundant_indexes(conn, ['facilities', 'facility_details', 'facility_reviews'])
+        print()
+        print("🔁 중복/불필요 인덱스")
+        for table, name, reason in redundant:
+            print(f"   - {table}.{name}: {reason}")
+        if not redundant:
+            print("   없음")
+
+        current = [sql for _, _, sql in list_indexes(conn, 'facilities')]
+        report = {'facilities': total, 'synthetic': synthetic, 'snapshot_defaults': filled,
+                  'redundant_indexes': redundant, 'sets': {}}
+
+        for set_name in args.sets:
+            statements = current if INDEX_SETS[set_name] is None else INDEX_SETS[set_name]
+            apply_index_set(conn, statements)
+            queries = benchmark_queries(conn, samples, args.iterations, filled)
+            load_ms = measure_bulk_load(conn, statements)
+            report['sets'][set_name] = {'indexes': statements, 'bulk_load_ms': load_ms, 'queries': queries}
+
+            print()
+            print(f"📐 인덱스 세트: {set_name} ({len(statements)}개) / 대량 적재 {load_ms:,.1f}ms")
+            print(f"   {'쿼리':<34} {'p50':>8} {'p95':>8} {'p99':>8}  플랜")
+            for name, result in queries.items():
+                if 'skipped' in result:
+                    print(f"   {name:<34} {'건너뜀':>8}  ({result['skipped']})")
+                    continue
+                flag = '⚠️ FULL SCAN' if result['full_scan'] else ''
+                print(f"   {name:<34} {result['p50_ms']:>8.3f} {result['p95_ms']:>8.3f} {result['p99_ms']:>8.3f}  "
+                      f"{' / '.join(result['plan'])} {flag}")
+
+        if 'none' in report['sets']:
+            base_ms = report['sets']['none']['bulk_load_ms'] or 1
+            print()
+            print("✍️  대량 적재 비용 (인덱스 없음 대비)")
+            for set_name, result in report['sets'].items():
+                print(f"   {set_name:<10} {result['bulk_load_ms']:>10,.1f}ms  x{result['bulk_load_ms'] / base_ms:.2f}")
+
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"❌ 측정 실패: {e}")
+        sys.exit(1)
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print()
+        print(f"💾 결과 저장: {args.output}")
+
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
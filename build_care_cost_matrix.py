@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+요양비용 계산 결과 사전 계산 스크립트
+
+- ltc_grade_rates, facility_type_costs, voucher_amounts, additional_cost_items 를 한 번 읽어
+  등급 × 시설유형 × 바우처 모든 조합을 care_calculator_api.md 의 계산 로직으로 미리 계산
+- 결과를 care_cost_matrix 테이블(cost_key 한 번 조회)과
+  버전이 붙은 JSON 파일(앱이 한 번 읽어 메모리에 보관)로 저장
+- 요율 테이블 내용의 지문을 버전으로 사용해 바뀐 경우에만 재생성
+
+추가 비용 항목은 조합마다 더하기만 하면 되므로 항목별 금액 목록을 함께 저장한다.
+    최종 월 비용 = final_monthly_cost + Σ(선택한 추가 항목 monthly_cost)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from datetime import datetime, timezone
+
+from d1_common import BATCH_SIZE, build_insert, chunked, open_database, sql_literal
+
+JSON_PATH = 'public/static/care_cost_matrix.json'
+
+# 지문 계산에 쓰는 요율 테이블 조회 (계산에 영향을 주는 컬럼만, 순서 고정)
+RATE_QUERIES = {
+    'grades': """
+        SELECT grade_level, grade_number, copayment_rate, max_monthly_limit
+        FROM ltc_grade_rates ORDER BY grade_number, grade_level
+    """,
+    'facility_costs': """
+        SELECT facility_type, grade_level, base_monthly_cost, meal_cost, management_cost, total_cost
+        FROM facility_type_costs ORDER BY facility_type, grade_level
+    """,
+    'vouchers': """
+        SELECT voucher_type, grade_level, monthly_amount
+        FROM voucher_amounts ORDER BY voucher_type, grade_level
+    """,
+    'additional_items': """
+        SELECT id, item_name, item_category, monthly_cost
+        FROM additional_cost_items WHERE is_active = 1 ORDER BY id
+    """,
+}
+
+MATRIX_COLUMNS = [
+    'cost_key', 'grade_level', 'facility_type', 'voucher_type',
+    'copayment_rate', 'max_monthly_limit', 'base_cost', 'meal_cost', 'management_cost',
+    'total_facility_cost', 'voucher_amount', 'voucher_coverage', 'copayment_amount',
+    'final_monthly_cost', 'version'
+]
+
+
+def cost_key(grade_level, facility_type, voucher_type):
+    return f"{grade_level}|{facility_type}|{voucher_type}"
+
+
+def js_round(value):
+    """Math.round 와 같은 반올림 (0.5 는 올림)"""
+    return int(math.floor(value + 0.5))
+
+
+def load_rates(db):
+    return {name: db.query(sql) for name, sql in RATE_QUERIES.items()}
+
+
+def rates_version(rates):
+    """요율 테이블 내용 지문 → 버전 문자열"""
+    payload = json.dumps(rates, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def calculate(grade, facility_cost, voucher):
+    """care_calculator_api.md calculateCareCost() 의 추가 항목 제외 부분"""
+    total_facility_cost = facility_cost['total_cost']
+    voucher_coverage = min(voucher['monthly_amount'], total_facility_cost)
+    remaining = total_facility_cost - voucher_coverage
+    copayment_amount = js_round(remaining * (grade['copayment_rate'] / 100))
+    return {
+        'total_facility_cost': total_facility_cost,
+        'voucher_amount': voucher['monthly_amount'],
+        'voucher_coverage': voucher_coverage,
+        'copayment_amount': copayment_amount,
+        'final_monthly_cost': copayment_amount,
+    }
+
+
+def build_matrix(rates, version):
+    """요율 데이터 → care_cost_matrix 행(dict) 목록
+
+    시설 비용 또는 바우처가 없는 등급 조합(예: 요양병원 × 인지지원등급)은 만들지 않는다.
+    """
+    costs = {(row['facility_type'], row['grade_level']): row for row in rates['facility_costs']}
+    vouchers = {}
+    for row in rates['vouchers']:
+        vouchers.setdefault(row['grade_level'], []).append(row)
+    facility_types = sorted({row['facility_type'] for row in rates['facility_costs']})
+
+    rows = []
+    for grade in rates['grades']:
+        for facility_type in facility_types:
+            facility_cost = costs.get((facility_type, grade['grade_level']))
+            if facility_cost is None:
+                continue
+            for voucher in vouchers.get(grade['grade_level'], []):
+                rows.append({
+                    'cost_key': cost_key(grade['grade_level'], facility_type, voucher['voucher_type']),
+                    'grade_level': grade['grade_level'],
+                    'facility_type': facility_type,
+                    'voucher_type': voucher['voucher_type'],
+                    'copayment_rate': grade['copayment_rate'],
+                    'max_monthly_limit': grade['max_monthly_limit'],
+                    'base_cost': facility_cost['base_monthly_cost'],
+                    'meal_cost': facility_cost['meal_cost'] or 0,
+                    'management_cost': facility_cost['management_cost'] or 0,
+                    **calculate(grade, facility_cost, voucher),
+                    'version': version,
+                })
+    return rows
+
+
+def load_current_version(db):
+    rows = db.query("SELECT version FROM care_cost_matrix_versions WHERE name = 'current'")
+    return rows[0]['version'] if rows else None
+
+
+def load_json_version(json_path):
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+
+def build_statements(rows, version, additional_items):
+    """새 조합 upsert → 이번 버전에 없는 조합 삭제 → 현재 버전 기록"""
+    statements = []
+    for batch in chunked(rows, BATCH_SIZE):
+        statements.append(build_insert(
+            'care_cost_matrix', MATRIX_COLUMNS,
+            [tuple(row[c] for c in MATRIX_COLUMNS) for row in batch],
+            conflict=['cost_key'], update_columns=MATRIX_COLUMNS[1:]
+        ))
+    statements.append(f"DELETE FROM care_cost_matrix WHERE version != {sql_literal(version)}")
+    statements.append(build_insert(
+        'care_cost_matrix_versions', ['name', 'version', 'row_count', 'additional_items'],
+        [('current', version, len(rows), json.dumps(additional_items, ensure_ascii=False))],
+        conflict=['name'], update_columns=['version', 'row_count', 'additional_items']
+    ) + ", generated_at = CURRENT_TIMESTAMP")
+    return statements
+
+
+def write_matrix_json(json_path, rows, version, additional_items):
+    """앱 로드용 JSON: {version, columns, matrix: {cost_key: [값...]}, additional_items}"""
+    columns = MATRIX_COLUMNS[1:-1]
+    payload = {
+        'version': version,
+        'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'columns': columns,
+        'matrix': {row['cost_key']: [row[c] for c in columns] for row in rows},
+        'additional_items': additional_items,
+    }
+    directory = os.path.dirname(json_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, json_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='요양비용 계산 결과 사전 계산')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--remote', action='store_true', help='Production D1 요율로 계산하고 반영')
+    parser.add_argument('--json', default=JSON_PATH, help=f'JSON 출력 경로 (기본: {JSON_PATH})')
+    parser.add_argument('--no-json', action='store_true', help='JSON 파일은 만들지 않음')
+    parser.add_argument('--force', action='store_true', help='요율이 그대로여도 다시 생성')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧮 요양비용 계산 결과 사전 계산")
+    print("=" * 70)
+    print()
+
+    db = open_database(remote=args.remote, db_path=args.db)
+    print(f"   대상: {db.label}")
+
+    try:
+        rates = load_rates(db)
+        version = rates_version(rates)
+        current_version = load_current_version(db)
+        json_version = None if args.no_json else load_json_version(args.json)
+
+        table_fresh = current_version == version
+        json_fresh = args.no_json or json_version == version
+        if table_fresh and json_fresh and not args.force:
+            print(f"   ✅ 요율 변경 없음 (버전 {version}) - 건너뜀")
+            return
+
+        rows = build_matrix(rates, version)
+        if not rows:
+            print("⚠️  계산할 조합이 없습니다. 요율 테이블을 확인하세요.")
+            sys.exit(1)
+
+        additional_items = [
+            {'id': item['id'], 'item_name': item['item_name'],
+             'item_category': item['item_category'], 'monthly_cost': item['monthly_cost']}
+            for item in rates['additional_items']
+        ]
+        print(f"   요율 버전: {current_version or '-'} → {version}")
+        print(f"   조합: {len(rows):,}개, 추가 항목: {len(additional_items):,}개")
+
+        if args.force or not table_fresh:
+            if not db.execute_all(build_statements(rows, version, additional_items)):
+                print("❌ care_cost_matrix 반영 실패")
+                sys.exit(1)
+            print("   ✅ care_cost_matrix 반영 완료")
+
+        if not args.no_json and (args.force or not json_fresh):
+            write_matrix_json(args.json, rows, version, additional_items)
+            print(f"   ✅ JSON 저장: {args.json}")
+    except Exception as e:
+        print(f"❌ 사전 계산 실패: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
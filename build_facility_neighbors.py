@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+시설별 최근접 시설 테이블(facility_neighbors) 생성 스크립트
+
+- 시설 좌표를 3차원 단위벡터로 바꿔 KD-tree 구성 (현거리는 대원거리와 단조 관계)
+- 시설마다, 이웃 시설 유형마다 상위 K개를 미리 계산
+- facility_neighbor_state 와 비교하여 좌표/유형이 바뀐 시설 주변만 다시 계산
+- --push 옵션으로 아직 Production D1에 반영되지 않은 시설의 이웃 목록만 반영
+
+로컬 계산과 Production 반영은 따로 기록한다. facility_neighbor_push_state 에 대상 D1 별로
+시설마다 반영한 이웃 목록의 지문을 두고, 시설 묶음마다 DELETE + INSERT 를 한 번의 호출로 보낸 뒤
+성공한 묶음만 갱신한다 (전체 삭제 없이 교체하므로 실패해도 Production 이 비지 않고 다음 --push 에서 이어감).
+Production 의 facilities.id 는 로컬과 다르므로 기준 시설과 이웃 모두 facility_key 로 찾은
+Production id 로 바꿔 보내고, Production 에 없는 이웃은 빼고 순위를 다시 매긴다.
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import sys
+import time
+
+from d1_common import (
+    BATCH_DELAY, DATABASE_NAME, build_insert, chunked, connect_local, execute_remote, map_facility_ids, query_remote,
+    sql_literal
+)
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_K = 10
+
+ROW_BATCH_SIZE = 300
+ID_BATCH_SIZE = 500
+PUSH_FACILITY_BATCH_SIZE = 20  # 한 번의 wrangler 호출로 교체할 시설 수 (시설당 이웃 최대 K × 유형 수 행)
+
+# 대상 D1 별 반영 상태 (로컬 전용, Production 에는 만들지 않음)
+#   facility_id 는 Production facilities.id, fingerprint 는 반영한 이웃 목록의 지문
+PUSH_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facility_neighbor_push_state (
+  target TEXT NOT NULL,
+  facility_id INTEGER NOT NULL,
+  fingerprint TEXT NOT NULL,
+  pushed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (target, facility_id)
+);
+"""
+
+
+def has_valid_coordinates(latitude, longitude):
+    """파싱 실패 시 0.0 으로 들어간 좌표 제외"""
+    if not latitude or not longitude:
+        return False
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def to_unit_vector(latitude, longitude):
+    phi = math.radians(latitude)
+    lam = math.radians(longitude)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+def _dist2(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class KDTree:
+    """3차원 KD-tree (최근접 K개 / 반경 검색)"""
+
+    def __init__(self, points):
+        # points: [(vector, facility_id), ...]
+        self.size = len(points)
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (
+            points[mid], axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1)
+        )
+
+    def nearest(self, target, k, exclude=None):
+        """가까운 순서의 [(현거리², facility_id), ...]"""
+        heap = []
+
+        def visit(node):
+            if node is None:
+                return
+            (point, facility_id), axis, left, right = node
+
+            if facility_id != exclude:
+                d2 = _dist2(point, target)
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, -facility_id))
+                elif (-d2, -facility_id) > heap[0]:
+                    heapq.heapreplace(heap, (-d2, -facility_id))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff <= -heap[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return sorted((-d2, -neg_id) for d2, neg_id in heap)
+
+    def within(self, target, radius):
+        """현거리 radius 이내의 facility_id 목록"""
+        r2 = radius * radius
+        found = []
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (point, facility_id), axis, left, right = node
+            if _dist2(point, target) <= r2:
+                found.append(facility_id)
+            diff = target[axis] - point[axis]
+            if diff <= radius:
+                stack.append(left)
+            if diff >= -radius:
+                stack.append(right)
+
+        return found
+
+
+def load_facilities(conn):
+    """{facility_id: (facility_type, latitude, longitude)} (좌표 없는 시설 제외)"""
+    facilities = {}
+    for row in conn.execute("SELECT id, facility_type, latitude, longitude FROM facilities"):
+        if has_valid_coordinates(row['latitude'], row['longitude']):
+            facilities[row['id']] = (row['facility_type'], row['latitude'], row['longitude'])
+    return facilities
+
+
+def load_state(conn):
+    return {
+        row['facility_id']: (row['facility_type'], row['latitude'], row['longitude'])
+        for row in conn.execute(
+            "SELECT facility_id, facility_type, latitude, longitude FROM facility_neighbor_state"
+        )
+    }
+
+
+def find_affected(conn, facilities, vectors, dirty, removed, k):
+    """다시 계산해야 하는 기준 시설 집합
+
+    1. 좌표/유형이 바뀐 시설 자신
+    2. 바뀐/삭제된 시설을 이웃 목록에 가지고 있던 시설
+    3. 바뀐 시설의 새 위치가 기존 상위 K개 안에 들어오는 시설
+    """
+    affected = set(dirty)
+
+    for ids in chunked(sorted(dirty | removed), ID_BATCH_SIZE):
+        placeholders = ','.join('?' * len(ids))
+        for row in conn.execute(
+            f"SELECT DISTINCT facility_id FROM facility_neighbors WHERE neighbor_id IN ({placeholders})", ids
+        ):
+            affected.add(row['facility_id'])
+
+    # 유형별 K번째 거리 (목록이 K개 미만이면 어떤 변경이든 영향을 받음)
+    kth_distance = {}
+    for row in conn.execute("""
+        SELECT facility_id, neighbor_type, COUNT(*) AS cnt, MAX(distance_km) AS max_km
+        FROM facility_neighbors
+        GROUP BY facility_id, neighbor_type
+    """):
+        if row['cnt'] >= k:
+            kth_distance[(row['facility_id'], row['neighbor_type'])] = row['max_km']
+
+    all_tree = KDTree([(vec, fid) for fid, vec in vectors.items()])
+    dirty_types = {facilities[fid][0] for fid in dirty if fid in facilities}
+
+    for facility_type in dirty_types:
+        saturated = {
+            fid: kth_distance[(fid, facility_type)]
+            for fid in facilities if (fid, facility_type) in kth_distance
+        }
+        affected |= set(facilities) - set(saturated)
+        if not saturated:
+            continue
+
+        radius = km_to_chord(max(saturated.values()))
+        for fid in dirty:
+            if fid not in facilities or facilities[fid][0] != facility_type:
+                continue
+            for candidate in all_tree.within(vectors[fid], radius):
+                if candidate == fid or candidate not in saturated:
+                    continue
+                distance = chord_to_km(math.sqrt(_dist2(vectors[candidate], vectors[fid])))
+                # distance_km 는 소수 셋째 자리로 반올림되어 저장됨
+                if distance <= saturated[candidate] + 0.001:
+                    affected.add(candidate)
+
+    # 2번에서 함께 삭제된 시설이 들어올 수 있음 → 남아 있는 시설만 (삭제된 시설 행은 removed 로 지움)
+    affected &= set(facilities)
+    return affected
+
+
+def compute_neighbors(facility_ids, vectors, type_trees, k):
+    """기준 시설별 (facility_id, neighbor_type, rank, neighbor_id, distance_km) 행"""
+    rows = []
+    for facility_id in sorted(facility_ids):
+        target = vectors[facility_id]
+        for facility_type, tree in sorted(type_trees.items()):
+            for rank, (d2, neighbor_id) in enumerate(tree.nearest(target, k, exclude=facility_id), start=1):
+                distance = round(chord_to_km(math.sqrt(d2)), 3)
+                rows.append((facility_id, facility_type, rank, neighbor_id, distance))
+    return rows
+
+
+def update_neighbors(conn, k=DEFAULT_K, full=False):
+    """로컬 DB의 최근접 시설 테이블을 증분 갱신
+
+    반환값: (다시 계산한 시설 ID, 삭제된 시설 ID, 새 행 목록)
+    """
+    facilities = load_facilities(conn)
+    state = {} if full else load_state(conn)
+    full = full or not state
+
+    dirty = {fid for fid, value in facilities.items() if state.get(fid) != value}
+    removed = set(state) - set(facilities)
+
+    vectors = {fid: to_unit_vector(lat, lng) for fid, (_, lat, lng) in facilities.items()}
+
+    by_type = {}
+    for fid, (facility_type, _, _) in facilities.items():
+        by_type.setdefault(facility_type, []).append((vectors[fid], fid))
+    type_trees = {facility_type: KDTree(points) for facility_type, points in by_type.items()}
+
+    if full:
+        affected = set(facilities)
+    else:
+        affected = find_affected(conn, facilities, vectors, dirty, removed, k)
+
+    rows = compute_neighbors(affected, vectors, type_trees, k)
+
+    with conn:
+        if full:
+            conn.execute("DELETE FROM facility_neighbors")
+            conn.execute("DELETE FROM facility_neighbor_state")
+        else:
+            for ids in chunked(sorted(affected | removed), ID_BATCH_SIZE):
+                placeholders = ','.join('?' * len(ids))
+                conn.execute(f"DELETE FROM facility_neighbors WHERE facility_id IN ({placeholders})", ids)
+            for ids in chunked(sorted(removed), ID_BATCH_SIZE):
+                placeholders = ','.join('?' * len(ids))
+                conn.execute(f"DELETE FROM facility_neighbor_state WHERE facility_id IN ({placeholders})", ids)
+
+        conn.executemany("""
+            INSERT INTO facility_neighbors (facility_id, neighbor_type, rank, neighbor_id, distance_km)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        conn.executemany("""
+            INSERT INTO facility_neighbor_state (facility_id, facility_type, latitude, longitude)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(facility_id) DO UPDATE SET
+                facility_type = excluded.facility_type,
+                latitude = excluded.latitude,
+                longitude = excluded.longitude,
+                updated_at = CURRENT_TIMESTAMP
+        """, [(fid,) + facilities[fid] for fid in sorted(dirty)])
+
+    return sorted(affected), sorted(removed), rows
+
+
+def remote_neighbor_rows(conn, id_map):
+    """로컬 이웃 행 → {Production 기준 시설 id: [(neighbor_type, rank, Production 이웃 id, distance_km)]}
+
+    연결된 시설은 이웃이 없어도 빈 목록으로 포함한다 (Production 의 이전 행을 지우기 위해).
+    """
+    grouped = {remote_id: [] for remote_id in id_map.values()}
+    ranks = {}
+    for row in conn.execute("""
+        SELECT facility_id, neighbor_type, neighbor_id, distance_km
+        FROM facility_neighbors ORDER BY facility_id, neighbor_type, rank
+    """):
+        remote_id = id_map.get(row['facility_id'])
+        neighbor_id = id_map.get(row['neighbor_id'])
+        if remote_id is None or neighbor_id is None:
+            continue
+        key = (remote_id, row['neighbor_type'])
+        ranks[key] = ranks.get(key, 0) + 1
+        grouped[remote_id].append((row['neighbor_type'], ranks[key], neighbor_id, row['distance_km']))
+    return grouped
+
+
+def neighbors_fingerprint(rows):
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def build_push_statements(batch):
+    """[(Production id, 이웃 행 목록)] → 기준 시설의 이웃 행을 지우고 다시 넣는 SQL 문 목록"""
+    id_list = ', '.join(sql_literal(remote_id) for remote_id, _ in batch)
+    statements = [f"DELETE FROM facility_neighbors WHERE facility_id IN ({id_list})"]
+    rows = [(remote_id,) + tuple(row) for remote_id, neighbor_rows in batch for row in neighbor_rows]
+    for chunk in chunked(rows, ROW_BATCH_SIZE):
+        statements.append(build_insert(
+            'facility_neighbors',
+            ['facility_id', 'neighbor_type', 'rank', 'neighbor_id', 'distance_km'],
+            chunk,
+            conflict=['facility_id', 'neighbor_type', 'rank'],
+            update_columns=['neighbor_id', 'distance_km']
+        ))
+    return statements
+
+
+def push_neighbors(conn, target=DATABASE_NAME, batch_size=PUSH_FACILITY_BATCH_SIZE, delay=BATCH_DELAY):
+    """반영되지 않은 시설의 이웃 목록을 Production 에 반영 → (반영 시설 수, 실패 시설 수)
+
+    반영 상태에는 있지만 더 이상 연결되지 않는 시설은 Production 에서 삭제된 경우에만 지운다
+    (로컬에서 이름/주소만 바뀌어 아직 연결되지 않는 시설은 Production 에 반영될 때까지 그대로 둠).
+    처음 반영하는 대상은 연결되지 않는 기준 시설의 기존 행을 모두 지운다.
+    """
+    with conn:
+        conn.executescript(PUSH_STATE_SCHEMA)
+    remote_ids = set()
+    id_map = map_facility_ids(conn, target, remote_ids)
+    grouped = remote_neighbor_rows(conn, id_map)
+    pushed_state = {
+        row['facility_id']: row['fingerprint']
+        for row in conn.execute(
+            "SELECT facility_id, fingerprint FROM facility_neighbor_push_state WHERE target = ?", (target,)
+        )
+    }
+
+    work = []
+    for remote_id, rows in sorted(grouped.items()):
+        fp = neighbors_fingerprint(rows)
+        if pushed_state.get(remote_id) != fp:
+            work.append((remote_id, rows, fp))
+    stale = set(pushed_state) - remote_ids
+    if not pushed_state:
+        # 처음 반영하는 대상: 반영 상태 없이 들어간 이전 행(로컬 id 로 보낸 행 등)도 정리
+        rows, _ = query_remote("SELECT DISTINCT facility_id FROM facility_neighbors", database=target)
+        stale = {row['facility_id'] for row in rows}
+    work += [(remote_id, [], None) for remote_id in sorted(stale - set(grouped))]
+
+    pushed = failed = 0
+    total = (len(work) + batch_size - 1) // batch_size
+    for i, batch in enumerate(chunked(work, batch_size), start=1):
+        statements = build_push_statements([(remote_id, rows) for remote_id, rows, _ in batch])
+        success, error = execute_remote(';\n'.join(statements), database=target)
+        if not success:
+            print(f"   [{i:3d}/{total}] 최근접 시설 ❌ {error}")
+            failed += len(batch)
+        else:
+            print(f"   [{i:3d}/{total}] 최근접 시설 ✅ {len(batch)}개 시설")
+            pushed += len(batch)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO facility_neighbor_push_state (target, facility_id, fingerprint, pushed_at) "
+                    "VALUES (?, ?, ?, CURRENT_TIMESTAMP) ON CONFLICT(target, facility_id) DO UPDATE SET "
+                    "fingerprint = excluded.fingerprint, pushed_at = CURRENT_TIMESTAMP",
+                    [(target, remote_id, fp) for remote_id, _, fp in batch if fp is not None]
+                )
+                conn.executemany(
+                    "DELETE FROM facility_neighbor_push_state WHERE target = ? AND facility_id = ?",
+                    [(target, remote_id) for remote_id, _, fp in batch if fp is None]
+                )
+        if i < total:
+            time.sleep(delay)
+    return pushed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='시설별 최근접 시설 테이블 생성')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help=f'유형별 이웃 수 (기본: {DEFAULT_K})')
+    parser.add_argument('--full', action='store_true', help='전체 재계산')
+    parser.add_argument('--push', action='store_true', help='반영되지 않은 시설을 Production D1에 반영')
+    parser.add_argument('--database', default=DATABASE_NAME, help=f'--push 대상 D1 (기본: {DATABASE_NAME})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📍 시설별 최근접 시설 테이블 생성")
+    print("=" * 70)
+    print()
+
+    conn = connect_local(args.db)
+    try:
+        full = args.full or not conn.execute("SELECT 1 FROM facility_neighbor_state LIMIT 1").fetchone()
+        affected_ids, removed_ids, rows = update_neighbors(conn, k=args.k, full=full)
+    except Exception as e:
+        conn.close()
+        print(f"❌ 최근접 시설 계산 실패: {e}")
+        sys.exit(1)
+
+    print(f"   {'전체' if full else '증분'} 계산")
+    print(f"   다시 계산한 시설: {len(affected_ids):,}개")
+    print(f"   삭제된 시설: {len(removed_ids):,}개")
+    print(f"   생성된 이웃 행: {len(rows):,}개")
+
+    if args.push:
+        print()
+        print(f"📤 {args.database} 에 반영되지 않은 시설 반영 중...")
+        try:
+            pushed, failed = push_neighbors(conn, args.database)
+        except RuntimeError as e:
+            print(f"❌ Production 시설 목록 조회 실패: {e}")
+            sys.exit(1)
+        finally:
+            conn.close()
+        print(f"   반영: {pushed:,}개 시설, 실패: {failed:,}개 시설 (다음 --push 에서 다시 보냄)")
+        if failed:
+            sys.exit(1)
+    else:
+        conn.close()
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+시설명/주소 검색 인덱스(facility_search_terms) 생성 스크립트
+
+- 한글 음절 2-gram, 시설명 초성(한 글자 + 2-gram), 정규화 토큰을 미리 계산
+- 시설명+주소 지문(fingerprint)을 비교하여 변경된 시설만 증분 갱신
+- --push 옵션으로 아직 Production D1에 반영되지 않은 시설만 반영
+
+로컬 색인 갱신과 Production 반영은 따로 기록한다. facility_search_push_state 에
+대상 D1 별로 "반영된 지문"을 두고, 배치가 성공한 시설만 앞으로 옮기므로
+반영이 실패하거나 --push 없이 색인만 갱신한 경우(import_csv_local.py 등)에도
+다음 --push 에서 밀린 시설을 다시 보낸다. Production 의 facilities.id 는 로컬과 다르므로
+facility_key(정규화한 시설명+주소)로 Production id 를 찾아 그 id 로 색인 행을 보낸다.
+
+검색 측은 query_terms() 와 같은 규칙으로 검색어를 분해한 뒤
+facility_search_terms 를 조회하고, 후보 시설에 대해서만 LIKE 로 최종 확인한다.
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import time
+import unicodedata
+
+from d1_common import (
+    BATCH_DELAY, DATABASE_NAME, build_insert, chunked, connect_local, execute_remote, map_facility_ids, query_remote,
+    sql_literal
+)
+
+# 한글 음절 범위 / 초성 목록
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+CHOSUNG = [
+    'ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ',
+    'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ'
+]
+
+# 괄호 꼬리표: '느루요양병원(강남)', '(번동)', '[본관]'
+PARENTHETICAL_RE = re.compile(r'\s*[\(\[（【][^\)\]）】]*[\)\]）】]?')
+TOKEN_SPLIT_RE = re.compile(r'[\s,·/]+')
+NON_WORD_RE = re.compile(r'[^0-9a-z가-힣ㄱ-ㅎ]')
+
+# Production 반영 시 한 문장에 담을 행 수 (색인 행은 짧으므로 시설보다 크게)
+TERM_BATCH_SIZE = 500
+ID_BATCH_SIZE = 500
+PUSH_FACILITY_BATCH_SIZE = 50  # 한 번의 wrangler 호출로 교체할 시설 수 (시설당 색인 약 40행, --command 길이 제한)
+
+# 색인 규칙 버전 (지문에 포함 → 규칙이 바뀌면 다음 증분 실행에서 전체가 다시 색인됨)
+INDEX_VERSION = 2
+
+# 대상 D1 별 반영 상태 (로컬 전용, Production 에는 만들지 않음)
+#   facility_id 는 Production facilities.id, fingerprint 는 반영한 색인의 지문
+PUSH_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facility_search_push_state (
+  target TEXT NOT NULL,
+  facility_id INTEGER NOT NULL,
+  fingerprint TEXT NOT NULL,
+  pushed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (target, facility_id)
+);
+"""
+
+
+def is_hangul_syllable(char):
+    return HANGUL_BASE <= ord(char) <= HANGUL_LAST
+
+
+def normalize_text(text):
+    """NFC 정규화, 괄호 꼬리표 제거, 소문자화, 공백 정리"""
+    text = unicodedata.normalize('NFC', text or '')
+    text = PARENTHETICAL_RE.sub(' ', text)
+    return ' '.join(text.lower().split())
+
+
+def normalize_tokens(text):
+    """정규화 토큰 목록 (구두점 제거, 빈 토큰 제외)"""
+    tokens = []
+    for token in TOKEN_SPLIT_RE.split(normalize_text(text)):
+        token = NON_WORD_RE.sub('', token)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def hangul_bigrams(text):
+    """공백을 제거한 문자열의 한글 음절 2-gram 집합"""
+    compact = ''.join(normalize_tokens(text))
+    return {
+        compact[i:i + 2]
+        for i in range(len(compact) - 1)
+        if is_hangul_syllable(compact[i]) and is_hangul_syllable(compact[i + 1])
+    }
+
+
+def chosung_string(text):
+    """한글 음절은 초성으로, 초성 자모는 그대로 남긴 문자열"""
+    result = []
+    for char in ''.join(normalize_tokens(text)):
+        if is_hangul_syllable(char):
+            result.append(CHOSUNG[(ord(char) - HANGUL_BASE) // 588])
+        elif 'ㄱ' <= char <= 'ㅎ':
+            result.append(char)
+    return ''.join(result)
+
+
+def chosung_bigrams(text):
+    initials = chosung_string(text)
+    return {initials[i:i + 2] for i in range(len(initials) - 1)}
+
+
+def chosung_terms(text):
+    """초성 한 글자 + 초성 2-gram (한 글자 초성 검색어 'ㅎ' 도 완전 일치로 조회)"""
+    return set(chosung_string(text)) | chosung_bigrams(text)
+
+
+def extract_terms(name, address):
+    """시설 한 곳의 (term, kind, field) 집합"""
+    terms = set()
+
+    for term in hangul_bigrams(name):
+        terms.add((term, 'bigram', 'name'))
+    for term in chosung_terms(name):
+        terms.add((term, 'chosung', 'name'))
+    for term in normalize_tokens(name):
+        terms.add((term, 'token', 'name'))
+
+    for term in hangul_bigrams(address):
+        terms.add((term, 'bigram', 'address'))
+    for term in normalize_tokens(address):
+        terms.add((term, 'token', 'address'))
+
+    return terms
+
+
+def query_terms(query):
+    """검색어를 조회용 (kind, terms) 로 분해
+
+    초성만 입력한 경우 chosung (한 글자면 초성 한 글자 term), 그 외에는 bigram 을 사용하고
+    한 글자 검색어는 token 완전 일치로 처리한다.
+    """
+    compact = ''.join(normalize_tokens(query))
+    if compact and all('ㄱ' <= c <= 'ㅎ' for c in compact):
+        return 'chosung', sorted(chosung_bigrams(compact)) or [compact]
+
+    bigrams = sorted(hangul_bigrams(query))
+    if bigrams:
+        return 'bigram', bigrams
+    return 'token', [compact] if compact else []
+
+
+def fingerprint(name, address):
+    raw = f"{INDEX_VERSION}\x1f{name or ''}\x1f{address or ''}".encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def find_changes(conn, full=False):
+    """변경/신규 시설과 삭제된 시설 ID 계산
+
+    반환값: (changed, removed) — changed 는 {facility_id: (name, address, fingerprint)}
+    """
+    indexed = {} if full else {
+        row['facility_id']: row['fingerprint']
+        for row in conn.execute("SELECT facility_id, fingerprint FROM facility_search_state")
+    }
+
+    changed = {}
+    seen = set()
+    for row in conn.execute("SELECT id, name, address FROM facilities"):
+        seen.add(row['id'])
+        fp = fingerprint(row['name'], row['address'])
+        if indexed.get(row['id']) != fp:
+            changed[row['id']] = (row['name'], row['address'], fp)
+
+    if full:
+        existing = {r[0] for r in conn.execute("SELECT facility_id FROM facility_search_state")}
+        removed = sorted(existing - seen)
+    else:
+        removed = sorted(set(indexed) - seen)
+
+    return changed, removed
+
+
+def update_search_index(conn, full=False):
+    """로컬 DB의 검색 인덱스를 증분 갱신
+
+    반환값: (changed_ids, removed_ids, 새로 만든 색인 행 목록)
+    """
+    changed, removed = find_changes(conn, full=full)
+    stale_ids = sorted(changed) + removed
+
+    rows = []
+    for facility_id, (name, address, _) in changed.items():
+        for term, kind, field in extract_terms(name, address):
+            rows.append((term, kind, field, facility_id))
+
+    with conn:
+        if full:
+            conn.execute("DELETE FROM facility_search_terms")
+            conn.execute("DELETE FROM facility_search_state")
+        else:
+            for ids in chunked(stale_ids, ID_BATCH_SIZE):
+                placeholders = ','.join('?' * len(ids))
+                conn.execute(f"DELETE FROM facility_search_terms WHERE facility_id IN ({placeholders})", ids)
+                conn.execute(f"DELETE FROM facility_search_state WHERE facility_id IN ({placeholders})", ids)
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO facility_search_terms (term, kind, field, facility_id) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.executemany(
+            "INSERT INTO facility_search_state (facility_id, fingerprint) VALUES (?, ?)",
+            [(facility_id, fp) for facility_id, (_, _, fp) in changed.items()]
+        )
+
+    return sorted(changed), removed, rows
+
+
+def plan_push(conn, target, id_map, remote_ids):
+    """반영할 시설 계산
+
+    반환값: (send, remove, unmapped)
+      send   — {Production id: (로컬 id, 지문)} 반영된 지문과 다른 시설
+      remove — 반영돼 있지만 Production 에서 삭제된 시설 id
+               (로컬에서 이름/주소만 바뀌어 아직 연결되지 않는 시설은 Production 에 반영될 때까지 그대로 둠,
+                처음 반영하는 대상은 연결되지 않는 시설의 기존 색인 행 전체)
+      unmapped — Production 에서 찾지 못한 로컬 시설 수
+    """
+    pushed = {
+        row['facility_id']: row['fingerprint']
+        for row in conn.execute("SELECT facility_id, fingerprint FROM facility_search_push_state WHERE target = ?",
+                                (target,))
+    }
+    desired = {}
+    unmapped = 0
+    for row in conn.execute("SELECT facility_id, fingerprint FROM facility_search_state ORDER BY facility_id"):
+        remote_id = id_map.get(row['facility_id'])
+        if remote_id is None:
+            unmapped += 1
+            continue
+        # 여러 로컬 시설이 같은 Production 시설로 연결되면 앞의 것만 사용
+        desired.setdefault(remote_id, (row['facility_id'], row['fingerprint']))
+
+    send = {remote_id: value for remote_id, value in desired.items() if pushed.get(remote_id) != value[1]}
+    stale = set(pushed) - remote_ids
+    if not pushed:
+        # 처음 반영하는 대상: 반영 상태 없이 들어간 이전 행(로컬 id 로 보낸 행 등)도 정리
+        rows, _ = query_remote("SELECT DISTINCT facility_id FROM facility_search_terms", database=target)
+        stale = {row['facility_id'] for row in rows}
+    remove = sorted(stale - set(desired))
+    return send, remove, unmapped
+
+
+def build_push_statements(conn, batch):
+    """[(Production id, 로컬 id)] → 색인 행을 지우고 다시 넣는 SQL 문 목록 (한 번의 호출로 실행)"""
+    remote_ids = ', '.join(sql_literal(remote_id) for remote_id, _ in batch)
+    statements = [f"DELETE FROM facility_search_terms WHERE facility_id IN ({remote_ids})"]
+
+    local_to_remote = {local_id: remote_id for remote_id, local_id in batch if local_id is not None}
+    rows = []
+    for ids in chunked(sorted(local_to_remote), ID_BATCH_SIZE):
+        placeholders = ','.join('?' * len(ids))
+        for row in conn.execute(
+            f"SELECT term, kind, field, facility_id FROM facility_search_terms WHERE facility_id IN ({placeholders})",
+            ids
+        ):
+            rows.append((row['term'], row['kind'], row['field'], local_to_remote[row['facility_id']]))
+
+    for terms in chunked(rows, TERM_BATCH_SIZE):
+        statements.append(build_insert(
+            'facility_search_terms', ['term', 'kind', 'field', 'facility_id'], terms,
+            conflict=['term', 'kind', 'field', 'facility_id']
+        ))
+    return statements
+
+
+def push_search_index(conn, target=DATABASE_NAME, batch_size=PUSH_FACILITY_BATCH_SIZE, delay=BATCH_DELAY):
+    """반영되지 않은 시설의 색인을 Production 에 반영 → (반영 시설 수, 실패 시설 수, 연결 안 된 시설 수)
+
+    시설 묶음마다 DELETE + INSERT 를 한 번의 호출로 보내고, 성공한 묶음만 반영 상태를 갱신한다.
+    """
+    with conn:
+        conn.executescript(PUSH_STATE_SCHEMA)
+    remote_ids = set()
+    id_map = map_facility_ids(conn, target, remote_ids)
+    send, remove, unmapped = plan_push(conn, target, id_map, remote_ids)
+
+    work = [(remote_id, local_id, fp) for remote_id, (local_id, fp) in sorted(send.items())]
+    work += [(remote_id, None, None) for remote_id in remove]
+    pushed = failed = 0
+    total = (len(work) + batch_size - 1) // batch_size
+    for i, batch in enumerate(chunked(work, batch_size), start=1):
+        statements = build_push_statements(conn, [(remote_id, local_id) for remote_id, local_id, _ in batch])
+        success, error = execute_remote(';\n'.join(statements), database=target)
+        if not success:
+            print(f"   [{i:3d}/{total}] 검색 인덱스 ❌ {error}")
+            failed += len(batch)
+        else:
+            print(f"   [{i:3d}/{total}] 검색 인덱스 ✅ {len(batch)}개 시설")
+            pushed += len(batch)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO facility_search_push_state (target, facility_id, fingerprint, pushed_at) "
+                    "VALUES (?, ?, ?, CURRENT_TIMESTAMP) ON CONFLICT(target, facility_id) DO UPDATE SET "
+                    "fingerprint = excluded.fingerprint, pushed_at = CURRENT_TIMESTAMP",
+                    [(target, remote_id, fp) for remote_id, local_id, fp in batch if local_id is not None]
+                )
+                conn.executemany(
+                    "DELETE FROM facility_search_push_state WHERE target = ? AND facility_id = ?",
+                    [(target, remote_id) for remote_id, local_id, _ in batch if local_id is None]
+                )
+        if i < total:
+            time.sleep(delay)
+    return pushed, failed, unmapped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='시설 검색 인덱스 생성')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--full', action='store_true', help='전체 재색인')
+    parser.add_argument('--push', action='store_true', help='반영되지 않은 시설을 Production D1에 반영')
+    parser.add_argument('--database', default=DATABASE_NAME, help=f'--push 대상 D1 (기본: {DATABASE_NAME})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔎 시설 검색 인덱스 생성")
+    print("=" * 70)
+    print()
+
+    conn = connect_local(args.db)
+    try:
+        changed_ids, removed_ids, rows = update_search_index(conn, full=args.full)
+    except Exception as e:
+        conn.close()
+        print(f"❌ 인덱스 생성 실패: {e}")
+        sys.exit(1)
+
+    print(f"   변경/신규 시설: {len(changed_ids):,}개")
+    print(f"   삭제된 시설: {len(removed_ids):,}개")
+    print(f"   생성된 색인 행: {len(rows):,}개")
+
+    if args.push:
+        print()
+        print(f"📤 {args.database} 에 반영되지 않은 시설 반영 중...")
+        try:
+            pushed, failed, unmapped = push_search_index(conn, args.database)
+        except RuntimeError as e:
+            print(f"❌ Production 시설 목록 조회 실패: {e}")
+            sys.exit(1)
+        finally:
+            conn.close()
+        print(f"   반영: {pushed:,}개 시설, 실패: {failed:,}개 시설 (다음 --push 에서 다시 보냄)")
+        if unmapped:
+            print(f"   ⚠️  Production 에서 찾지 못한 시설 {unmapped:,}개 (업로드 후 다시 --push)")
+        if failed:
+            sys.exit(1)
+    else:
+        conn.close()
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+로컬 D1(miniflare SQLite) / Production D1 공용 헬퍼
+
+배치 작업 스크립트들이 같은 경로, 같은 업로드 방식(wrangler d1 execute)을
+사용하도록 한 곳에 모아둔 모듈
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import time
+import unicodedata
+
+# 로컬 D1 데이터베이스 경로
+LOCAL_DB_PATH = os.environ.get(
+    'LOCAL_DB_PATH',
+    '/home/user/webapp/.wrangler/state/v3/d1/miniflare-D1DatabaseObject/f984b4a70fef7a895996004e43b002e0b8452a7bd9984138a20f069c8ef2a773.sqlite'
+)
+
+# Cloudflare 설정
+WEBAPP_DIR = '/home/user/webapp'
+CLOUDFLARE_API_TOKEN = os.environ.get('CLOUDFLARE_API_TOKEN', '')
+DATABASE_NAME = os.environ.get('D1_DATABASE_NAME', 'carejoa-production')
+
+# 배치 업로드 기본값 (기존 스크립트와 동일)
+BATCH_SIZE = 100
+BATCH_DELAY = 0.5
+
+# Production 시설 목록을 읽을 때 한 번에 가져올 행 수
+REMOTE_PAGE_SIZE = 5000
+
+# 공공데이터 파일 인코딩 후보 (기존 스크립트와 동일한 순서)
+ENCODINGS = ['utf-8-sig', 'cp949', 'euc-kr']
+
+# 백업 CSV(create_backup.cjs / export_backup.cjs) 헤더 → facilities 컬럼
+BACKUP_CSV_COLUMNS = {
+    'ID': 'id', '시설유형': 'facility_type', '시설명': 'name', '우편번호': 'postal_code',
+    '주소': 'address', '전화번호': 'phone', '위도': 'latitude', '경도': 'longitude',
+    '시도': 'sido', '시군구': 'sigungu', '비고': 'notes'
+}
+
+# 시설 키 정규화: 공백/구두점 제거, 주소의 괄호 꼬리표 '(번동)' 제거
+KEY_STRIP_RE = re.compile(r'[^0-9a-zA-Z가-힣()]')
+ADDRESS_SUFFIX_RE = re.compile(r'\([^)]*\)')
+
+
+def connect_local(db_path=None):
+    """로컬 SQLite 연결 (Row 팩토리 사용)"""
+    conn = sqlite3.connect(db_path or LOCAL_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def detect_encoding(file_path):
+    """첫 줄에 한글 헤더가 제대로 읽히는 인코딩 반환 (기본값 cp949)"""
+    for encoding in ENCODINGS:
+        try:
+            with open(file_path, 'r', encoding=encoding) as f:
+                first_line = f.readline()
+            if '시설' in first_line or '기관' in first_line or 'ID' in first_line:
+                return encoding
+        except (UnicodeDecodeError, OSError):
+            continue
+    return 'cp949'
+
+
+def normalize_name(name):
+    """시설명 비교용 정규화 ('느루 요양병원(강남)' → '느루요양병원(강남)')"""
+    text = unicodedata.normalize('NFC', str(name or ''))
+    return KEY_STRIP_RE.sub('', text).lower()
+
+
+def normalize_address(address):
+    """주소 비교용 정규화 (괄호 꼬리표와 공백/구두점 제거)"""
+    text = unicodedata.normalize('NFC', str(address or ''))
+    return KEY_STRIP_RE.sub('', ADDRESS_SUFFIX_RE.sub('', text)).lower()
+
+
+def facility_key(name, address):
+    """원본 파일과 DB 사이에서 시설을 식별하는 정규화 키"""
+    return f"{normalize_name(name)}|{normalize_address(address)}"
+
+
+def add_to_facility_key_index(index, facility_id, name, address, sido, sigungu):
+    """시설 한 곳을 (facility_key 인덱스, 보조 인덱스) 에 추가"""
+    by_key, by_region = index
+    by_key.setdefault(facility_key(name, address), facility_id)
+
+    region_key = (normalize_name(name), sido or '', sigungu or '')
+    by_region[region_key] = None if region_key in by_region else facility_id
+
+
+def build_facility_key_index(conn):
+    """facilities 한 번 스캔으로 키 → facility_id 캐시 생성
+
+    반환값: (facility_key 인덱스, (시설명, 시도, 시군구) 보조 인덱스)
+    보조 인덱스는 주소 표기가 다른 경우를 위한 것으로, 같은 지역에
+    동명 시설이 있으면 None 으로 표시해 잘못 연결되지 않게 한다.
+    """
+    index = ({}, {})
+    for row in conn.execute("SELECT id, name, address, sido, sigungu FROM facilities"):
+        add_to_facility_key_index(index, *row)
+    return index
+
+
+def iter_remote_facilities(database=None, page_size=REMOTE_PAGE_SIZE):
+    """Production facilities 의 (id, name, address, sido, sigungu) 를 id 순으로 나눠 읽기"""
+    last_id = 0
+    while True:
+        rows, _ = query_remote(
+            f"SELECT id, name, address, sido, sigungu FROM facilities "
+            f"WHERE id > {int(last_id)} ORDER BY id LIMIT {int(page_size)}",
+            database=database
+        )
+        for row in rows:
+            yield row['id'], row['name'], row['address'], row['sido'], row['sigungu']
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+
+def build_remote_facility_key_index(database=None):
+    """Production facilities 로 build_facility_key_index() 와 같은 구조 생성
+
+    업로드 스크립트들은 id 없이 INSERT 하므로 Production id 는 로컬 id 와 다르다.
+    로컬 시설을 Production 행과 연결할 때는 이 인덱스로 facility_key 를 거쳐 찾는다.
+    """
+    index = ({}, {})
+    for row in iter_remote_facilities(database):
+        add_to_facility_key_index(index, *row)
+    return index
+
+
+def map_facility_ids(conn, database=None, remote_ids=None):
+    """로컬 facilities.id → Production facilities.id (facility_key 로 연결)
+
+    같은 키의 시설이 여러 개면 양쪽 모두 id 순서대로 짝지어 한 Production 행에 몰리지 않게 하고,
+    Production 에 없는 시설(아직 업로드 전)은 결과에서 빠진다.
+    remote_ids 에 set 을 넘기면 읽은 Production id 전체를 채운다.
+    """
+    index = ({}, {})
+    by_key = {}
+    for row in iter_remote_facilities(database):
+        if remote_ids is not None:
+            remote_ids.add(row[0])
+        add_to_facility_key_index(index, *row)
+        by_key.setdefault(facility_key(row[1], row[2]), []).append(row[0])
+
+    id_map = {}
+    fallback = []
+    for row in conn.execute("SELECT id, name, address, sido, sigungu FROM facilities ORDER BY id"):
+        candidates = by_key.get(facility_key(row[1], row[2]))
+        if candidates:
+            id_map[row[0]] = candidates.pop(0)
+        else:
+            fallback.append(row)
+
+    # 주소 표기가 달라 키로 못 찾은 시설은 (시설명, 시도, 시군구) 로 한 번 더 (이미 연결된 행 제외)
+    used = set(id_map.values())
+    for row in fallback:
+        remote_id = index[1].get((normalize_name(row[1]), row[3] or '', row[4] or '')) if row[3] and row[4] else None
+        if remote_id is not None and remote_id not in used:
+            id_map[row[0]] = remote_id
+            used.add(remote_id)
+    return id_map
+
+
+def resolve_facility_id(index, name, address, sido='', sigungu=''):
+    """build_facility_key_index() 결과로 facility_id 조회 (없으면 None)"""
+    by_key, by_region = index
+    facility_id = by_key.get(facility_key(name, address))
+    if facility_id is None and sido and sigungu:
+        facility_id = by_region.get((normalize_name(name), sido, sigungu))
+    return facility_id
+
+
+def iter_json_array(file_path, chunk_size=1 << 16):
+    """최상위 JSON 배열의 원소를 하나씩 반환 (파일 전체를 메모리에 올리지 않음)
+
+    wrangler --json 출력처럼 [{"results": [...]}] 로 감싼 경우는
+    read_snapshot() 에서 처리한다.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            pos = 0
+
+            while True:
+                # 공백, 구분자 건너뛰기
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError('JSON 배열 형식이 아닙니다')
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # 원소가 청크 경계에 걸침 → 더 읽기
+                if end >= len(buffer) and chunk:
+                    break  # 숫자 등이 경계에서 잘렸을 수 있음 → 더 읽고 다시 해석
+                yield item
+                pos = end
+
+            buffer = buffer[pos:]
+            if not chunk:
+                return
+
+
+def read_snapshot(file_path):
+    """스냅샷 파일의 행(dict)을 하나씩 반환
+
+    - JSON 배열: [{...}, ...] (백업 JSON, write_snapshot() 결과)
+    - wrangler --json 출력: [{"results": [...]}]
+    - 백업 CSV: ID,시설유형,시설명,... (한글 헤더를 컬럼명으로 변환)
+    """
+    if file_path.lower().endswith('.csv'):
+        encoding = detect_encoding(file_path)
+        with open(file_path, 'r', encoding=encoding, errors='ignore', newline='') as f:
+            for record in csv.DictReader(f):
+                yield {
+                    BACKUP_CSV_COLUMNS.get(k.strip(), k.strip()): v
+                    for k, v in record.items() if k
+                }
+        return
+
+    for item in iter_json_array(file_path):
+        if isinstance(item, dict) and isinstance(item.get('results'), list):
+            yield from item['results']
+        else:
+            yield item
+
+
+class SnapshotWriter:
+    """JSON 배열 스냅샷을 한 행씩 기록 (write_snapshot() 과 같은 형식)
+
+    sync() 로 지금까지 기록한 행을 디스크에 확정할 수 있어
+    원본 삭제 전에 보관본을 먼저 남겨야 하는 작업에서 사용
+    """
+
+    def __init__(self, file_path):
+        self.file = open(file_path, 'w', encoding='utf-8')
+        self.file.write('[')
+        self.count = 0
+
+    def write(self, row):
+        self.file.write(',\n  ' if self.count else '\n  ')
+        self.file.write(json.dumps(dict(row), ensure_ascii=False))
+        self.count += 1
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.write('\n]\n' if self.count else ']\n')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_snapshot(file_path, rows):
+    """행(dict) 이터러블을 JSON 배열 스냅샷으로 저장 (한 행씩 기록)
+
+    반환값: 기록한 행 수
+    """
+    with SnapshotWriter(file_path) as writer:
+        for row in rows:
+            writer.write(row)
+    return writer.count
+
+
+def sql_literal(value):
+    """Python 값을 SQL 리터럴 문자열로 변환"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def chunked(items, size):
+    """리스트를 size 단위로 나누어 반환"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def sql_values(rows):
+    """행 목록 → VALUES 절 본문 "(...), (...)" """
+    return ', '.join(
+        '(' + ', '.join(sql_literal(v) for v in row) + ')' for row in rows
+    )
+
+
+def build_insert(table, columns, rows, conflict=None, update_columns=None):
+    """다중 VALUES INSERT 문 생성
+
+    conflict 가 주어지면 ON CONFLICT(...) DO UPDATE 로 upsert 문을 만들고,
+    update_columns 가 비어 있으면 DO NOTHING 으로 처리한다.
+    """
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {sql_values(rows)}"
+
+    if conflict:
+        if update_columns:
+            updates = ', '.join(f"{c} = excluded.{c}" for c in update_columns)
+            sql += f" ON CONFLICT({', '.join(conflict)}) DO UPDATE SET {updates}"
+        else:
+            sql += f" ON CONFLICT({', '.join(conflict)}) DO NOTHING"
+
+    return sql
+
+
+def _run_wrangler(sql, database=None, timeout=120, as_json=False):
+    cmd = ['npx', 'wrangler', 'd1', 'execute', database or DATABASE_NAME, '--remote']
+    if as_json:
+        cmd.append('--json')
+    cmd += ['--command', sql]
+
+    return subprocess.run(
+        cmd,
+        cwd=WEBAPP_DIR,
+        env={
+            'CLOUDFLARE_API_TOKEN': CLOUDFLARE_API_TOKEN,
+            'PATH': '/usr/local/bin:/usr/bin:/bin',
+            'HOME': '/home/user'
+        },
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
+
+def execute_remote(sql, database=None, timeout=120):
+    """Production D1에 SQL 실행 (wrangler d1 execute --remote)
+
+    반환값: (성공 여부, 에러 메시지)
+    """
+    try:
+        result = _run_wrangler(sql, database=database, timeout=timeout)
+
+        if result.returncode == 0:
+            return True, ''
+        return False, result.stderr[:200]
+
+    except subprocess.TimeoutExpired:
+        return False, '타임아웃'
+    except Exception as e:
+        return False, str(e)
+
+
+def query_remote(sql, database=None, timeout=120):
+    """Production D1 조회 (wrangler --json 출력 파싱)
+
+    반환값: (마지막 문장의 결과 행 목록, 실행된 모든 문장의 meta 목록)
+    실패 시 RuntimeError
+    """
+    try:
+        result = _run_wrangler(sql, database=database, timeout=timeout, as_json=True)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError('타임아웃')
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[:200] or result.stdout[:200])
+
+    data = json.loads(result.stdout or '[]')
+    if not data:
+        return [], []
+    return data[-1].get('results', []), [item.get('meta', {}) for item in data]
+
+
+class LocalDatabase:
+    """로컬 SQLite (로컬 D1 / 스냅샷 DB)"""
+
+    def __init__(self, db_path=None):
+        self.conn = connect_local(db_path)
+        self.label = '로컬 D1'
+
+    def query(self, sql):
+        return [dict(row) for row in self.conn.execute(sql)]
+
+    def execute(self, sql):
+        """단일 문 실행 → 변경된 행 수"""
+        with self.conn:
+            return self.conn.execute(sql).rowcount
+
+    def execute_all(self, statements):
+        """여러 문을 하나의 트랜잭션으로 실행"""
+        with self.conn:
+            for sql in statements:
+                self.conn.execute(sql)
+        return True
+
+    def close(self):
+        self.conn.close()
+
+
+class RemoteDatabase:
+    """Production D1 (wrangler d1 execute --remote)"""
+
+    def __init__(self, database=None):
+        self.database = database or DATABASE_NAME
+        self.label = f'D1 {self.database}'
+
+    def query(self, sql):
+        rows, _ = query_remote(sql, database=self.database)
+        return rows
+
+    def execute(self, sql):
+        """단일 문 실행 → 변경된 행 수"""
+        _, metas = query_remote(sql, database=self.database)
+        return sum(meta.get('changes', 0) for meta in metas)
+
+    def execute_all(self, statements):
+        """여러 문을 한 번의 wrangler 호출로 실행 (중간 실패 시 이후 문은 실행되지 않음)"""
+        if not statements:
+            return True
+        success, error = execute_remote(';\n'.join(statements), database=self.database)
+        if not success:
+            print(f"\n      ❌ 에러: {error}")
+        return success
+
+    def close(self):
+        pass
+
+
+def open_database(remote=False, db_path=None, database=None):
+    """--remote 여부에 따라 LocalDatabase / RemoteDatabase 반환"""
+    if remote:
+        return RemoteDatabase(database)
+    return LocalDatabase(db_path)
+
+
+def execute_remote_batches(statements, label='배치', database=None, delay=BATCH_DELAY):
+    """SQL 문 목록을 순서대로 Production D1에 실행하고 진행률 출력
+
+    statements 는 이미 배치 크기로 묶인 SQL 문 리스트
+    반환값: (성공 문 수, 실패 문 수)
+    """
+    total = len(statements)
+    success_count = 0
+    fail_count = 0
+
+    for i, sql in enumerate(statements, start=1):
+        print(f"   [{i:3d}/{total}] {label}", end=' ', flush=True)
+
+        success, error = execute_remote(sql, database=database)
+
+        if success:
+            print("✅")
+            success_count += 1
+        else:
+            print(f"❌ {error}")
+            fail_count += 1
+
+        # API 제한 방지
+        if i < total:
+            time.sleep(delay)
+
+    return success_count, fail_count
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+공공데이터 원본 파일 두 판 비교 (외부 정렬 + 병합 조인)
+
+- 이전 판 / 새 판 파일(csv, xlsx, json, sqlite, local)을 facility_pipeline 과 같은
+  방식으로 읽고 정규화한 뒤 시설 키(facility_key) 기준으로 외부 정렬
+  (--run-size 행씩 정렬해 임시 파일에 쓰고 heapq.merge 로 합침 → 메모리 사용량 일정)
+- 정렬된 두 스트림을 병합 조인해 추가 / 삭제 / 변경(필드별 이전값 → 새값) 레코드 출력
+- 결과를 JSON Lines 파일로 저장하고, 원하면 facilities 최소 반영 SQL 파일 생성
+  또는 Production D1 에 바로 반영
+
+같은 파일 안에서 같은 시설 키가 여러 번 나오면 앞에 나온 행만 사용한다
+(facility_pipeline 의 multi 소스와 동일).
+
+예)
+    python3 diff_releases.py 최종요양시설18708_250901.csv 최종요양시설18708_251017.csv --output diff.jsonl
+    python3 diff_releases.py local 최종요양시설18708_251017.csv --sql update.sql
+    python3 diff_releases.py old.csv new.csv --push
+"""
+
+import argparse
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from d1_common import BATCH_DELAY, BATCH_SIZE, build_insert, facility_key, query_remote, sql_literal
+from facility_pipeline import FACILITY_COLUMNS, SOURCE_READERS, normalize_facility, parse_source_spec
+
+RUN_SIZE = 50_000           # 한 번에 메모리에서 정렬할 행 수
+COORDINATE_TOLERANCE = 1e-6  # 좌표는 이 차이 이하면 같은 값으로 봄
+
+
+# ---------------------------------------------------------------------------
+# 외부 정렬: 정렬된 런 파일 → heapq.merge
+# ---------------------------------------------------------------------------
+
+def write_run(run, tmp_dir, index):
+    """(키, 순번, 시설) 목록을 정렬해 JSON Lines 런 파일로 저장"""
+    run.sort(key=lambda item: (item[0], item[1]))
+    path = os.path.join(tmp_dir, f"run_{index:05d}.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in run:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write('\n')
+    return path
+
+
+def iter_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield tuple(json.loads(line))
+
+
+def sorted_release(spec, tmp_dir, label, run_size=RUN_SIZE, db_path=None):
+    """원본 파일 → 시설 키 순서의 (키, 시설) 스트림 + 통계 dict
+
+    통계는 스트림을 끝까지 읽은 뒤에 완성된다 (duplicate 는 병합 중에 센다).
+    """
+    kind, path = parse_source_spec(spec)
+    if kind == 'multi':
+        raise ValueError("여러 파일(multi) 소스는 비교할 수 없습니다. 파일을 하나씩 지정하세요")
+
+    stats = {'read': 0, 'invalid': 0, 'duplicate': 0, 'runs': 0}
+    run_paths = []
+    run = []
+    for seq, record in enumerate(SOURCE_READERS[kind](path or db_path)):
+        stats['read'] += 1
+        facility = normalize_facility(record)
+        if facility is None:
+            stats['invalid'] += 1
+            continue
+        run.append((facility_key(facility['name'], facility['address']), seq, facility))
+        if len(run) >= run_size:
+            run_paths.append(write_run(run, tmp_dir, len(run_paths)))
+            run = []
+    if run:
+        run_paths.append(write_run(run, tmp_dir, len(run_paths)))
+    stats['runs'] = len(run_paths)
+    print(f"   {label}: {stats['read']:,}행 → 정렬 런 {len(run_paths):,}개 (필수값 누락 {stats['invalid']:,}개)",
+          flush=True)
+
+    def merged():
+        previous = None
+        for key, _, facility in heapq.merge(*(iter_run(p) for p in run_paths), key=lambda item: (item[0], item[1])):
+            if key == previous:
+                stats['duplicate'] += 1
+                continue
+            previous = key
+            yield key, facility
+
+    return merged(), stats
+
+
+# ---------------------------------------------------------------------------
+# 병합 조인
+# ---------------------------------------------------------------------------
+
+def field_changes(old, new):
+    """{컬럼: [이전값, 새값]} (좌표는 허용 오차 이내면 같은 값)"""
+    changes = {}
+    for column in FACILITY_COLUMNS:
+        before, after = old[column], new[column]
+        if column in ('latitude', 'longitude'):
+            if abs(before - after) <= COORDINATE_TOLERANCE:
+                continue
+        elif before == after:
+            continue
+        changes[column] = [before, after]
+    return changes
+
+
+def diff_streams(old_stream, new_stream):
+    """키 순서로 정렬된 두 스트림 → {'op', 'key', 'record', 'previous'?, 'changes'?} 를 하나씩 반환"""
+    done = object()
+    old_item = next(old_stream, done)
+    new_item = next(new_stream, done)
+    while old_item is not done or new_item is not done:
+        if new_item is done or (old_item is not done and old_item[0] < new_item[0]):
+            yield {'op': 'removed', 'key': old_item[0], 'record': old_item[1]}
+            old_item = next(old_stream, done)
+        elif old_item is done or new_item[0] < old_item[0]:
+            yield {'op': 'added', 'key': new_item[0], 'record': new_item[1]}
+            new_item = next(new_stream, done)
+        else:
+            changes = field_changes(old_item[1], new_item[1])
+            if changes:
+                yield {'op': 'changed', 'key': new_item[0], 'record': new_item[1],
+                       'previous': old_item[1], 'changes': changes}
+            old_item = next(old_stream, done)
+            new_item = next(new_stream, done)
+
+
+# ---------------------------------------------------------------------------
+# 최소 반영 SQL
+# ---------------------------------------------------------------------------
+
+def match_condition(facility):
+    """이전 판 값으로 facilities 행 지정 (적재 시 시설명/주소는 정규화된 값 그대로 저장됨)"""
+    return f"name = {sql_literal(facility['name'])} AND address = {sql_literal(facility['address'])}"
+
+
+class UpdateWriter:
+    """변경 레코드를 batch_size 개씩 SQL 로 만들어 파일 기록 / Production D1 반영
+
+    추가는 다중 VALUES INSERT 한 문, 삭제·변경은 레코드마다 DELETE / UPDATE 한 문.
+    Production 반영 시 문장별 meta 의 changes 를 확인해, 이전 판 시설명+주소와 같은 행이 없어
+    아무 행도 바뀌지 않은 삭제·변경은 성공이 아니라 unmatched 로 세고 unmatched_path 에 기록한다.
+    """
+
+    def __init__(self, sql_path=None, push=False, database=None, batch_size=BATCH_SIZE, delay=BATCH_DELAY,
+                 unmatched_path=None):
+        self.file = open(sql_path, 'w', encoding='utf-8') if sql_path else None
+        self.unmatched_file = open(unmatched_path, 'w', encoding='utf-8') if unmatched_path else None
+        self.push = push
+        self.database = database
+        self.batch_size = batch_size
+        self.delay = delay
+        self.added = []
+        self.statements = []
+        self.entries = []          # statements 와 같은 순서의 삭제·변경 레코드
+        self.pending = 0
+        self.success = 0
+        self.failed = 0
+        self.unmatched = 0
+        self.unmatched_samples = []
+
+    def write(self, entry):
+        if entry['op'] == 'added':
+            self.added.append(tuple(entry['record'][c] for c in FACILITY_COLUMNS))
+        elif entry['op'] == 'removed':
+            self.statements.append(f"DELETE FROM facilities WHERE {match_condition(entry['record'])}")
+            self.entries.append(entry)
+        else:
+            updates = ', '.join(f"{column} = {sql_literal(values[1])}" for column, values in entry['changes'].items())
+            self.statements.append(
+                f"UPDATE facilities SET {updates}, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE {match_condition(entry['previous'])}"
+            )
+            self.entries.append(entry)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        statements = self.statements
+        if self.added:
+            statements.append(build_insert('facilities', FACILITY_COLUMNS, self.added))
+        if self.file:
+            self.file.write(';\n'.join(statements) + ';\n')
+        if self.push:
+            try:
+                _, metas = query_remote(';\n'.join(statements), database=self.database)
+            except RuntimeError as e:
+                self.failed += self.pending
+                print(f"\n      ❌ 에러: {e}")
+            else:
+                unmatched = [entry for entry, meta in zip(self.entries, metas) if meta.get('changes') == 0]
+                for entry in unmatched:
+                    self.record_unmatched(entry)
+                self.success += self.pending - len(unmatched)
+            time.sleep(self.delay)
+        self.added = []
+        self.statements = []
+        self.entries = []
+        self.pending = 0
+
+    def record_unmatched(self, entry):
+        self.unmatched += 1
+        record = entry.get('previous', entry['record'])
+        if len(self.unmatched_samples) < 5:
+            self.unmatched_samples.append(f"{entry['op']} {record['name']} ({record['address']})")
+        if self.unmatched_file:
+            self.unmatched_file.write(json.dumps(entry, ensure_ascii=False))
+            self.unmatched_file.write('\n')
+
+    def close(self):
+        self.flush()
+        if self.file:
+            self.file.close()
+        if self.unmatched_file:
+            self.unmatched_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='공공데이터 원본 파일 두 판 비교')
+    parser.add_argument('old', help='이전 판: csv/xlsx/json/sqlite 경로 또는 local (종류:경로 형식도 가능)')
+    parser.add_argument('new', help='새 판: csv/xlsx/json/sqlite 경로 또는 local')
+    parser.add_argument('--db', help='local 소스 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--output', help='비교 결과 JSON Lines 저장 경로')
+    parser.add_argument('--sql', help='facilities 최소 반영 SQL 저장 경로 (wrangler d1 execute --file 로 실행 가능)')
+    parser.add_argument('--push', action='store_true', help='변경분을 Production D1 facilities 에 바로 반영')
+    parser.add_argument('--database', help='--push 대상 D1 (기본: carejoa-production)')
+    parser.add_argument('--unmatched', help='--push 때 Production 에서 행을 찾지 못한 삭제/변경 레코드 저장 경로 (JSON Lines)')
+    parser.add_argument('--run-size', type=int, default=RUN_SIZE,
+                        help=f'외부 정렬 런 크기 (행 수, 기본: {RUN_SIZE:,})')
+    parser.add_argument('--tmp-dir', help='정렬 런 임시 파일 위치 (기본: 시스템 임시 폴더)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'SQL 배치 크기 (기본: {BATCH_SIZE})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔍 공공데이터 원본 비교")
+    print("=" * 70)
+    print(f"   이전 판: {args.old}")
+    print(f"   새 판: {args.new}")
+    print()
+
+    started = time.time()
+    tmp_dir = tempfile.mkdtemp(prefix='carejoa_diff_', dir=args.tmp_dir)
+    counts = {'added': 0, 'removed': 0, 'changed': 0}
+    changed_fields = {}
+    output = None
+    writer = None
+    try:
+        streams = {}
+        for name, spec, label in (('old', args.old, '이전 판'), ('new', args.new, '새 판')):
+            run_dir = os.path.join(tmp_dir, name)
+            os.makedirs(run_dir)
+            streams[name] = sorted_release(spec, run_dir, label, args.run_size, args.db)
+        (old_stream, old_stats), (new_stream, new_stats) = streams['old'], streams['new']
+
+        output = open(args.output, 'w', encoding='utf-8') if args.output else None
+        if args.sql or args.push:
+            writer = UpdateWriter(args.sql, push=args.push, database=args.database, batch_size=args.batch_size,
+                                  unmatched_path=args.unmatched if args.push else None)
+
+        for entry in diff_streams(old_stream, new_stream):
+            counts[entry['op']] += 1
+            for column in entry.get('changes', {}):
+                changed_fields[column] = changed_fields.get(column, 0) + 1
+            if output:
+                output.write(json.dumps(entry, ensure_ascii=False))
+                output.write('\n')
+            if writer:
+                writer.write(entry)
+        if writer:
+            writer.close()
+    except (OSError, ValueError) as e:
+        print(f"❌ 비교 실패: {e}")
+        sys.exit(1)
+    finally:
+        if output:
+            output.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print()
+    print("=" * 70)
+    print(f"✅ 완료! ({time.time() - started:.1f}초)")
+    print("=" * 70)
+    print(f"   중복 시설 키: 이전 판 {old_stats['duplicate']:,}개 / 새 판 {new_stats['duplicate']:,}개 (앞 행 사용)")
+    print(f"   ➕ 추가: {counts['added']:,}개")
+    print(f"   ➖ 삭제: {counts['removed']:,}개")
+    print(f"   ✏️  변경: {counts['changed']:,}개")
+    for column, count in sorted(changed_fields.items(), key=lambda item: -item[1]):
+        print(f"      - {column}: {count:,}개")
+    if args.output:
+        print(f"   💾 결과: {args.output}")
+    if args.sql:
+        print(f"   💾 SQL: {args.sql}")
+    if writer and args.push:
+        print(f"   📤 Production 반영: 성공 {writer.success:,}개, 실패 {writer.failed:,}개, "
+              f"대상 행 없음 {writer.unmatched:,}개")
+        if writer.unmatched:
+            print("   ⚠️  이전 판 시설명+주소와 같은 Production 행이 없어 반영되지 않은 삭제/변경:")
+            for sample in writer.unmatched_samples:
+                print(f"      - {sample}")
+            if args.unmatched:
+                print(f"   💾 대상 행 없음 목록: {args.unmatched}")
+        if writer.failed:
+            sys.exit(1)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+시설 데이터 파이프라인 실행기 (읽기 → 정규화 → 저장 단계 동시 진행)
+
+import_csv_local.py, upload_csv_to_production.py, import_excel_to_db.py,
+sync_to_production.py, sync_db_to_production.py 가 각각 하던 일을 하나의 CLI 로 처리
+
+- 소스: csv, xlsx, sqlite(로컬 D1), json(백업/스냅샷),
+  multi(폴더/글롭의 여러 CSV·XLSX 를 프로세스 풀로 병렬 파싱해 하나로 합침)
+- 싱크: local(로컬 SQLite), d1(Production D1), snapshot(JSON 스냅샷) - 여러 개 지정 가능
+- 단계마다 스레드 하나, 단계 사이는 크기가 정해진 큐로 연결
+  → 업로드가 느리면 큐가 차서 읽기/정규화가 기다리고(backpressure),
+    전체 시간은 단계 합이 아니라 가장 느린 단계 시간에 가까워짐
+
+예)
+    python3 facility_pipeline.py --source 최종요양시설.csv --sink local --sink d1
+    python3 facility_pipeline.py --source 요양시설.xlsx --sink d1 --replace
+    python3 facility_pipeline.py --source local --sink d1 --sink snapshot:backup.json
+    python3 facility_pipeline.py --source '공공데이터/*.csv' --sink local --replace
+"""
+
+import argparse
+import collections
+import csv
+import glob
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from build_search_index import update_search_index
+from d1_common import (
+    BACKUP_CSV_COLUMNS, BATCH_DELAY, BATCH_SIZE, DATABASE_NAME, SnapshotWriter,
+    build_insert, connect_local, detect_encoding, execute_remote, facility_key, read_snapshot
+)
+
+FACILITY_COLUMNS = [
+    'facility_type', 'name', 'postal_code', 'address', 'phone',
+    'latitude', 'longitude', 'sido', 'sigungu'
+]
+
+QUEUE_SIZE = 8            # 단계 사이 큐에 쌓아 둘 최대 배치 수
+STAGE_DONE = object()     # 스트림 끝 표시
+
+
+# ---------------------------------------------------------------------------
+# 소스: 원본 레코드(dict)를 하나씩 반환
+# ---------------------------------------------------------------------------
+
+def iter_csv_source(path):
+    """시설 CSV (ID,시설유형,시설명,우편번호,주소,전화번호,위도,경도,시도,시군구)
+
+    헤더를 알아볼 수 없으면 기존 스크립트와 같은 위치(1~9번째 열)로 읽는다.
+    """
+    encoding = detect_encoding(path)
+    with open(path, 'r', encoding=encoding, errors='ignore', newline='') as f:
+        reader = csv.reader(f)
+        header = [BACKUP_CSV_COLUMNS.get(h.strip(), h.strip()) for h in next(reader, [])]
+        by_header = 'name' in header and 'address' in header
+
+        for parts in reader:
+            if by_header:
+                yield dict(zip(header, parts))
+            elif len(parts) >= 10:
+                yield dict(zip(FACILITY_COLUMNS, parts[1:10]))
+
+
+def iter_xlsx_source(path):
+    """요양시설 Excel (시설유형, 시설명, 우편번호, 주소, 위도, 경도) - 시도/시군구는 주소에서"""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        next(rows, None)
+        for row in rows:
+            if not row or not row[0]:
+                continue
+            values = [('' if v is None else v) for v in (tuple(row) + (None,) * 6)[:6]]
+            yield {
+                'facility_type': values[0], 'name': values[1], 'postal_code': values[2],
+                'address': values[3], 'latitude': values[4], 'longitude': values[5],
+            }
+    finally:
+        wb.close()
+
+
+def iter_sqlite_source(path):
+    """로컬 D1(또는 SQLite 파일)의 facilities"""
+    conn = connect_local(path)
+    try:
+        for row in conn.execute(f"SELECT id, {', '.join(FACILITY_COLUMNS)} FROM facilities ORDER BY id"):
+            yield dict(row)
+    finally:
+        conn.close()
+
+
+def iter_json_source(path):
+    """백업 JSON / wrangler --json 출력 / write_snapshot() 스냅샷"""
+    return read_snapshot(path)
+
+
+SOURCE_READERS = {
+    'csv': iter_csv_source,
+    'xlsx': iter_xlsx_source,
+    'sqlite': iter_sqlite_source,
+    'json': iter_json_source,
+}
+
+SOURCE_EXTENSIONS = {
+    '.csv': 'csv', '.xlsx': 'xlsx', '.json': 'json',
+    '.sqlite': 'sqlite', '.sqlite3': 'sqlite', '.db': 'sqlite',
+}
+
+# 여러 파일 적재(multi)에서 폴더를 지정했을 때 읽을 확장자
+MULTI_FILE_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def parse_source_spec(spec):
+    """'csv:경로', '경로.csv', 'local', '폴더/', '*.csv' → (종류, 경로)"""
+    if spec == 'local':
+        return 'sqlite', None
+    kind, sep, path = spec.partition(':')
+    if sep and (kind in SOURCE_READERS or kind == 'multi'):
+        return kind, path or None
+    if os.path.isdir(spec) or glob.has_magic(spec):
+        return 'multi', spec
+    kind = SOURCE_EXTENSIONS.get(os.path.splitext(spec)[1].lower())
+    if kind is None:
+        raise ValueError(f"소스 종류를 알 수 없습니다: {spec}")
+    return kind, spec
+
+
+# ---------------------------------------------------------------------------
+# 정규화: 원본 레코드 → facilities 행 dict (필수값 없으면 None)
+# ---------------------------------------------------------------------------
+
+def clean_text(value):
+    return str(value if value is not None else '').strip().strip('"').strip()
+
+
+def to_coordinate(value):
+    try:
+        return float(clean_text(value) or 0)
+    except ValueError:
+        return 0.0
+
+
+def normalize_facility(record, keep_ids=False):
+    facility = {column: clean_text(record.get(column)) for column in FACILITY_COLUMNS}
+    facility['latitude'] = to_coordinate(record.get('latitude'))
+    facility['longitude'] = to_coordinate(record.get('longitude'))
+
+    if not facility['name'] or not facility['address']:
+        return None
+
+    # Excel 처럼 시도/시군구 열이 없으면 주소 앞 두 토큰 사용
+    if not facility['sido'] or not facility['sigungu']:
+        parts = facility['address'].split()
+        facility['sido'] = facility['sido'] or (parts[0] if parts else '')
+        facility['sigungu'] = facility['sigungu'] or (parts[1] if len(parts) > 1 else '')
+    if not facility['sido'] or not facility['sigungu']:
+        return None
+
+    if keep_ids:
+        try:
+            facility['id'] = int(record.get('id'))
+        except (TypeError, ValueError):
+            return None
+    return facility
+
+
+# ---------------------------------------------------------------------------
+# 여러 파일 적재: 파일마다 별도 프로세스에서 파싱 + 정규화, 시설 키로 중복 제거
+# ---------------------------------------------------------------------------
+
+def expand_source_files(pattern):
+    """폴더(바로 아래 CSV/XLSX) 또는 글롭 → 정렬된 파일 목록"""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        paths = [p for p in paths if p.lower().endswith(MULTI_FILE_EXTENSIONS)]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def parse_source_file(path):
+    """프로세스 풀 작업: 파일 하나 → (경로, 정규화된 시설 목록, 필수값 누락 수)"""
+    kind = SOURCE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    facilities = []
+    invalid = 0
+    for record in SOURCE_READERS[kind](path):
+        facility = normalize_facility(record)
+        if facility is None:
+            invalid += 1
+        else:
+            facilities.append(facility)
+    return path, facilities, invalid
+
+
+def iter_multi_file_source(pattern, workers=None):
+    """여러 원본 파일을 병렬로 파싱해 하나의 레코드 스트림으로 합침
+
+    - 파일 단위로 프로세스 풀에 나눠 파싱 (전체 시간 ≈ 가장 큰 파일 파싱 시간)
+    - 한 번에 워커 수만큼만 파일을 맡겨 두고, 앞 파일을 다 내보내면 다음 파일을 맡김
+      → 메모리에 올라가는 파싱 결과는 (워커 수 + 1)개 파일 분량까지
+        (executor.map 은 모든 파일을 한꺼번에 맡겨 결과가 소비 속도와 관계없이 쌓임)
+    - 결과는 파일 이름 순서로 합치며, 같은 시설(facility_key)은 앞선 파일의 행만 사용
+    - 파일별 id 는 서로 의미가 없으므로 --keep-ids 와 함께 쓰지 않는다
+    """
+    paths = expand_source_files(pattern)
+    if not paths:
+        raise FileNotFoundError(f"읽을 파일이 없습니다: {pattern}")
+
+    workers = workers or os.cpu_count() or 1
+    remaining = iter(paths)
+    window = collections.deque()
+    seen = set()
+    duplicates = 0
+    invalid = 0
+    # 읽기 스테이지 스레드에서 시작하므로 fork 대신 spawn 으로 워커 생성
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        for path in itertools.islice(remaining, workers):
+            window.append(executor.submit(parse_source_file, path))
+        try:
+            while window:
+                path, facilities, file_invalid = window.popleft().result()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    window.append(executor.submit(parse_source_file, next_path))
+
+                invalid += file_invalid
+                kept = 0
+                for facility in facilities:
+                    key = facility_key(facility['name'], facility['address'])
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    kept += 1
+                    yield facility
+                print(f"   📄 {os.path.basename(path)}: {len(facilities):,}개 중 {kept:,}개 적재", flush=True)
+        finally:
+            # 중간에 멈추면(파이프라인 중단) 아직 시작 안 한 파일은 파싱하지 않음
+            for future in window:
+                future.cancel()
+
+    print(f"   📚 파일 {len(paths):,}개 / 시설 {len(seen):,}개 "
+          f"(중복 시설 {duplicates:,}개, 필수값 누락 {invalid:,}개 제외)", flush=True)
+
+
+# ---------------------------------------------------------------------------
+# 싱크: open() → write(배치) → close()
+# ---------------------------------------------------------------------------
+
+def facility_columns(keep_ids):
+    return (['id'] if keep_ids else []) + FACILITY_COLUMNS
+
+
+def facility_insert(columns, batch):
+    """배치 INSERT 문 (id 를 유지하면 id 기준 upsert)"""
+    keyed = columns[0] == 'id'
+    return build_insert(
+        'facilities', columns, [tuple(f[c] for c in columns) for f in batch],
+        conflict=['id'] if keyed else None,
+        update_columns=columns[1:] if keyed else None
+    )
+
+
+class LocalSink:
+    """로컬 SQLite facilities (끝까지 성공하면 검색 인덱스 증분 갱신)
+
+    --replace 이면 기존 행 삭제부터 마지막 배치까지 한 트랜잭션으로 묶어 close() 에서 커밋한다.
+    """
+
+    def __init__(self, db_path=None, replace=False, keep_ids=False):
+        self.db_path = db_path
+        self.replace = replace
+        self.columns = facility_columns(keep_ids)
+        self.label = f"local:{db_path or '로컬 D1'}"
+        self.conn = None
+
+    def open(self):
+        self.conn = connect_local(self.db_path)
+        if self.replace:
+            # 삭제와 적재를 한 트랜잭션으로 → 끝까지 성공해야 커밋 (중간에 멈추면 기존 데이터 유지)
+            self.conn.execute("DELETE FROM facilities")
+
+    def write(self, batch):
+        self.conn.execute(facility_insert(self.columns, batch))
+        if not self.replace:
+            self.conn.commit()
+        return True
+
+    def close(self, completed=True):
+        try:
+            if not completed:
+                self.conn.rollback()
+                if self.replace:
+                    print("   ⚠️  중단되어 기존 facilities 를 그대로 둡니다 (삭제/적재 롤백)")
+                return
+            self.conn.commit()
+            changed_ids, removed_ids, _ = update_search_index(self.conn)
+            print(f"   ✅ 검색 인덱스 갱신 (변경 {len(changed_ids):,}개, 삭제 {len(removed_ids):,}개)")
+        finally:
+            self.conn.close()
+
+
+class D1Sink:
+    """Production D1 facilities (wrangler d1 execute, 배치마다 BATCH_DELAY 대기)"""
+
+    def __init__(self, database=None, replace=False, keep_ids=False, delay=BATCH_DELAY):
+        self.database = database or DATABASE_NAME
+        self.replace = replace
+        self.columns = facility_columns(keep_ids)
+        self.delay = delay
+        self.label = f"d1:{self.database}"
+
+    def open(self):
+        if self.replace:
+            success, error = execute_remote("DELETE FROM facilities", database=self.database)
+            if not success:
+                raise RuntimeError(f"기존 데이터 삭제 실패: {error}")
+
+    def write(self, batch):
+        success, error = execute_remote(facility_insert(self.columns, batch), database=self.database)
+        if not success:
+            print(f"\n      ❌ 에러: {error}")
+        time.sleep(self.delay)
+        return success
+
+    def close(self, completed=True):
+        pass
+
+
+class SnapshotSink:
+    """JSON 배열 스냅샷 (read_snapshot() 으로 다시 읽을 수 있음)"""
+
+    def __init__(self, path, keep_ids=False):
+        self.path = path
+        self.columns = facility_columns(keep_ids)
+        self.label = f"snapshot:{path}"
+        self.writer = None
+
+    def open(self):
+        self.writer = SnapshotWriter(self.path)
+
+    def write(self, batch):
+        for facility in batch:
+            self.writer.write({c: facility[c] for c in self.columns})
+        return True
+
+    def close(self, completed=True):
+        self.writer.close()
+
+
+def build_sink(spec, replace=False, keep_ids=False, db_path=None):
+    """'local[:경로]', 'd1[:DB이름]', 'snapshot:경로' → 싱크 객체"""
+    kind, _, target = spec.partition(':')
+    if kind == 'local':
+        return LocalSink(target or db_path, replace=replace, keep_ids=keep_ids)
+    if kind == 'd1':
+        return D1Sink(target or None, replace=replace, keep_ids=keep_ids)
+    if kind == 'snapshot' and target:
+        return SnapshotSink(target, keep_ids=keep_ids)
+    raise ValueError(f"싱크 형식을 알 수 없습니다: {spec}")
+
+
+# ---------------------------------------------------------------------------
+# 파이프라인 실행
+# ---------------------------------------------------------------------------
+
+class Pipeline:
+    """소스 스레드 → 정규화 스레드 → 싱크별 스레드 (크기 제한 큐로 연결)
+
+    한 단계에서 예외가 나면(파일 없음, 기존 데이터 삭제 실패 등) abort 이벤트로 나머지 단계를 멈추고,
+    싱크는 close(completed=False) 로 닫는다 (local 싱크는 커밋 전 변경을 롤백).
+    싱크의 배치 실패(write() 가 False)는 실패 건수로만 세고 계속 진행한다.
+    """
+
+    def __init__(self, records, sinks, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, keep_ids=False):
+        self.records = records
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.keep_ids = keep_ids
+        self.raw_queue = queue.Queue(maxsize=queue_size)
+        self.sink_queues = [queue.Queue(maxsize=queue_size) for _ in sinks]
+        self.abort = threading.Event()
+        self.errors = []
+        self.stats = {'read': 0, 'invalid': 0, 'normalized': 0,
+                      'written': [0] * len(sinks), 'failed': [0] * len(sinks)}
+        self.busy = {}
+
+    def _put(self, q, item):
+        while not self.abort.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self.abort.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        return STAGE_DONE
+
+    def _stage(self, name, func):
+        def run():
+            try:
+                func()
+            except Exception as e:
+                self.errors.append(f"{name}: {e}")
+                self.abort.set()
+        return threading.Thread(target=run, name=name, daemon=True)
+
+    def _read(self):
+        busy = 0.0
+        batch = []
+        started = time.time()
+        for record in self.records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                busy += time.time() - started
+                if not self._put(self.raw_queue, batch):
+                    return
+                started = time.time()
+                self.stats['read'] += len(batch)
+                batch = []
+        busy += time.time() - started
+        self.stats['read'] += len(batch)
+        self.busy['읽기'] = busy
+        if batch:
+            self._put(self.raw_queue, batch)
+        self._put(self.raw_queue, STAGE_DONE)
+
+    def _fan_out(self, batch):
+        return all(self._put(q, batch) for q in self.sink_queues)
+
+    def _normalize(self):
+        busy = 0.0
+        pending = []
+        while True:
+            raw = self._get(self.raw_queue)
+            if raw is STAGE_DONE:
+                break
+            started = time.time()
+            for record in raw:
+                facility = normalize_facility(record, self.keep_ids)
+                if facility is None:
+                    self.stats['invalid'] += 1
+                else:
+                    pending.append(facility)
+            busy += time.time() - started
+
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                self.stats['normalized'] += len(batch)
+                if not self._fan_out(batch):
+                    return
+        if pending:
+            self.stats['normalized'] += len(pending)
+            self._fan_out(pending)
+        self.busy['정규화'] = busy
+        self._fan_out(STAGE_DONE)
+
+    def _write(self, index):
+        # SQLite 연결은 만든 스레드에서만 쓸 수 있으므로 open/close 도 싱크 스레드에서
+        sink = self.sinks[index]
+        sink_queue = self.sink_queues[index]
+        busy = 0.0
+        completed = False
+        sink.open()
+        try:
+            while True:
+                batch = self._get(sink_queue)
+                if batch is STAGE_DONE:
+                    break
+                started = time.time()
+                if sink.write(batch):
+                    self.stats['written'][index] += len(batch)
+                else:
+                    self.stats['failed'][index] += len(batch)
+                busy += time.time() - started
+                print(f"   {sink.label}: {self.stats['written'][index]:,}개 반영", flush=True)
+            # _get() 은 abort 때도 STAGE_DONE 을 돌려주므로 여기서 한 번 더 확인
+            completed = not self.abort.is_set()
+        finally:
+            sink.close(completed)
+        self.busy[sink.label] = busy
+
+    def run(self):
+        threads = [self._stage('읽기', self._read), self._stage('정규화', self._normalize)]
+        threads += [self._stage(sink.label, lambda i=i: self._write(i)) for i, sink in enumerate(self.sinks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='시설 데이터 파이프라인 (소스 → 정규화 → 싱크)')
+    parser.add_argument('--source', required=True,
+                        help="소스: csv:경로, xlsx:경로, json:경로, sqlite:경로, local, "
+                             "multi:폴더|글롭 (확장자/폴더/글롭으로 추론 가능)")
+    parser.add_argument('--sink', action='append', required=True,
+                        help="싱크 (여러 번 지정 가능): local[:경로], d1[:DB이름], snapshot:경로")
+    parser.add_argument('--db', help='local 소스/싱크 기본 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--replace', action='store_true', help='local/d1 싱크의 기존 facilities 를 비우고 적재')
+    parser.add_argument('--keep-ids', action='store_true', help='소스의 id 를 유지해 id 기준 upsert')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'배치 크기 (기본: {BATCH_SIZE})')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f'단계 사이 큐 크기 (배치 수, 기본: {QUEUE_SIZE})')
+    parser.add_argument('--workers', type=int, help='multi 소스 파싱 프로세스 수 (기본: CPU 코어 수)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🚀 시설 데이터 파이프라인")
+    print("=" * 70)
+
+    try:
+        kind, path = parse_source_spec(args.source)
+        if kind == 'multi':
+            if args.keep_ids:
+                raise ValueError("multi 소스는 --keep-ids 를 지원하지 않습니다")
+            records = iter_multi_file_source(path, workers=args.workers)
+        else:
+            records = SOURCE_READERS[kind](path or args.db)
+        sinks = [build_sink(spec, replace=args.replace, keep_ids=args.keep_ids, db_path=args.db)
+                 for spec in args.sink]
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"   소스: {kind}:{path or '로컬 D1'}")
+    for sink in sinks:
+        print(f"   싱크: {sink.label}")
+    print()
+
+    started = time.time()
+    pipeline = Pipeline(records, sinks, batch_size=args.batch_size,
+                        queue_size=args.queue_size, keep_ids=args.keep_ids)
+    stats = pipeline.run()
+    elapsed = time.time() - started
+
+    print()
+    print("=" * 70)
+    print("❌ 중단됨" if pipeline.errors else "✅ 완료!")
+    print("=" * 70)
+    for error in pipeline.errors:
+        print(f"   ❌ {error}")
+    print(f"   읽은 레코드: {stats['read']:,}개 (필수값 누락 {stats['invalid']:,}개)")
+    for i, sink in enumerate(sinks):
+        print(f"   {sink.label}: 성공 {stats['written'][i]:,}개, 실패 {stats['failed'][i]:,}개")
+    print(f"   전체 {elapsed:.1f}초 / 단계별 작업 시간: "
+          + ', '.join(f"{name} {seconds:.1f}초" for name, seconds in pipeline.busy.items()))
+    print()
+
+    if pipeline.errors or any(stats['failed']):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+정원/현원(공실) 데이터를 facility_realtime_capacity 에 반영하는 스크립트
+
+- 공공데이터포털 월간 덤프(CSV 또는 API 응답 XML)를 한 행씩 스트리밍으로 읽음
+- 시설명+주소 정규화 키 캐시로 facility_id 연결
+- 공실 = 정원 - 현원 (음수는 0)
+- 기존 값과 달라진 시설만 배치 upsert (로컬 D1, --push 시 Production D1)
+- --push 시 Production 행은 facility_key 로 찾은 Production facilities.id 로 기록
+  (업로드 스크립트들이 id 없이 INSERT 해 로컬 id 와 다름, Production 에 없는 시설은 건너뜀)
+
+시설 직접 입력(facility_input) 값은 공공데이터보다 우선하므로
+--source public_api 실행에서는 덮어쓰지 않는다.
+"""
+
+import argparse
+import csv
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from d1_common import (
+    BATCH_SIZE, build_facility_key_index, build_insert, connect_local,
+    detect_encoding, execute_remote, map_facility_ids, resolve_facility_id, sql_literal
+)
+
+# 원본 컬럼명 후보 (CSV 헤더 / API XML 태그)
+FIELD_ALIASES = {
+    'name': ['기관명', '시설명', '장기요양기관명', 'adminNm', 'longTermAdminNm'],
+    'address': ['주소', '소재지', '소재지주소', '도로명주소', 'addr', 'adminAddr'],
+    'sido': ['시도', '시도명', 'siDoNm'],
+    'sigungu': ['시군구', '시군구명', 'siGunGuNm'],
+    'total_beds': ['정원', '정원수', 'totPer', 'maxPerCnt'],
+    'occupied_beds': ['현원', '현원수', 'nowPer', 'nowPerCnt'],
+    'waiting_list_count': ['대기인원', '대기자수', 'waitPer', 'waitPerCnt'],
+}
+
+CAPACITY_COLUMNS = ['total_beds', 'occupied_beds', 'available_beds', 'waiting_list_count']
+UPSERT_COLUMNS = ['facility_id'] + CAPACITY_COLUMNS + ['data_source', 'last_synced_at']
+
+SOURCE_PRIORITY = {'public_api': 0, 'manual': 1, 'facility_input': 2}
+
+
+def pick(record, field):
+    for alias in FIELD_ALIASES[field]:
+        value = record.get(alias)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def to_int(value):
+    try:
+        return int(float(str(value).replace(',', '')))
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_csv_records(file_path):
+    encoding = detect_encoding(file_path)
+    with open(file_path, 'r', encoding=encoding, errors='ignore', newline='') as f:
+        for record in csv.DictReader(f):
+            yield {k.strip(): v for k, v in record.items() if k}
+
+
+def iter_xml_records(file_path):
+    """API 응답 XML의 <item> 단위 스트리밍 파싱 (여러 페이지를 이어 붙인 파일도 허용)"""
+    for _, elem in ET.iterparse(file_path, events=('end',)):
+        if elem.tag == 'item':
+            yield {child.tag: (child.text or '').strip() for child in elem}
+            elem.clear()
+
+
+def iter_records(file_path):
+    if file_path.lower().endswith('.xml'):
+        return iter_xml_records(file_path)
+    return iter_csv_records(file_path)
+
+
+def parse_capacity(record):
+    """원본 레코드 → (이름, 주소, 시도, 시군구, 정원, 현원, 공실, 대기) / 정원·현원 없으면 None"""
+    total = to_int(pick(record, 'total_beds'))
+    occupied = to_int(pick(record, 'occupied_beds'))
+    if total is None or occupied is None:
+        return None
+
+    # 대기 인원 열이 없는 덤프는 None → 기존 값 유지
+    waiting = to_int(pick(record, 'waiting_list_count'))
+    available = max(0, total - occupied)
+
+    return (
+        pick(record, 'name'), pick(record, 'address'),
+        pick(record, 'sido'), pick(record, 'sigungu'),
+        total, occupied, available, waiting
+    )
+
+
+def load_current_capacity(conn):
+    """{facility_id: (정원, 현원, 공실, 대기, data_source)}"""
+    return {
+        row['facility_id']: (
+            row['total_beds'], row['occupied_beds'], row['available_beds'],
+            row['waiting_list_count'], row['data_source']
+        )
+        for row in conn.execute(f"""
+            SELECT facility_id, {', '.join(CAPACITY_COLUMNS)}, data_source
+            FROM facility_realtime_capacity
+        """)
+    }
+
+
+def build_upsert_statements(batch, source):
+    """배치 → upsert 문 목록
+
+    - 대기 인원이 없는 행은 waiting_list_count 를 빼고 보내 기존 값을 유지 (신규 행은 기본값 0)
+    - 이번 source 보다 우선순위가 높은 기존 행(예: facility_input)은 DO UPDATE 의 WHERE 로 보호
+      → 로컬 확인과 관계없이 Production 에서도 덮어쓰지 않음
+    """
+    protected = [name for name, priority in SOURCE_PRIORITY.items()
+                 if priority > SOURCE_PRIORITY.get(source, 0)]
+    guard = ''
+    if protected:
+        guard = (" WHERE COALESCE(facility_realtime_capacity.data_source, '') NOT IN ("
+                 + ', '.join(sql_literal(name) for name in protected) + ')')
+
+    groups = {}
+    for row in batch:
+        columns = UPSERT_COLUMNS if row[4] is not None else [c for c in UPSERT_COLUMNS if c != 'waiting_list_count']
+        values = row if row[4] is not None else row[:4] + row[5:]
+        groups.setdefault(tuple(columns), []).append(values)
+
+    return [
+        build_insert(
+            'facility_realtime_capacity', list(columns), rows,
+            conflict=['facility_id'], update_columns=list(columns[1:])
+        ) + guard
+        for columns, rows in groups.items()
+    ]
+
+
+def flush_batch(conn, batch, source, id_map=None):
+    """변경분 배치를 (id_map 이 있으면 Production에 먼저) 반영한 뒤 로컬에 기록
+
+    id_map 은 로컬 → Production facilities.id (--push 일 때만).
+    Production 실패 시 로컬에도 쓰지 않아 다음 실행에서 다시 변경분으로 잡힌다.
+    """
+    if id_map is not None:
+        remote_batch = [(id_map[row[0]],) + tuple(row[1:]) for row in batch]
+        success, error = execute_remote(';\n'.join(build_upsert_statements(remote_batch, source)))
+        if not success:
+            print(f"\n      ❌ 에러: {error}")
+            return False
+
+    with conn:
+        for sql in build_upsert_statements(batch, source):
+            conn.execute(sql)
+    return True
+
+
+def ingest_capacity(conn, file_path, source='public_api', push=False, batch_size=BATCH_SIZE):
+    """덤프 파일을 스트리밍으로 읽어 변경된 시설만 upsert
+
+    반환값: 처리 통계 dict
+    """
+    index = build_facility_key_index(conn)
+    id_map = map_facility_ids(conn) if push else None
+    current = load_current_capacity(conn)
+    synced_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    stats = {'read': 0, 'invalid': 0, 'unmatched': 0, 'duplicate': 0, 'not_in_production': 0,
+             'unchanged': 0, 'protected': 0, 'written': 0, 'failed': 0}
+    unmatched_samples = []
+    seen = set()
+    batch = []
+
+    for record in iter_records(file_path):
+        stats['read'] += 1
+
+        parsed = parse_capacity(record)
+        if parsed is None:
+            stats['invalid'] += 1
+            continue
+
+        name, address, sido, sigungu, *values = parsed
+        facility_id = resolve_facility_id(index, name, address, sido, sigungu)
+        if facility_id is None:
+            stats['unmatched'] += 1
+            if len(unmatched_samples) < 5:
+                unmatched_samples.append(name)
+            continue
+
+        # 같은 덤프 안의 중복 행은 첫 행만 사용
+        if facility_id in seen:
+            stats['duplicate'] += 1
+            continue
+        seen.add(facility_id)
+
+        # Production 에 아직 없는 시설은 로컬에도 쓰지 않음 (업로드 후 다음 실행에서 변경분으로 잡힘)
+        if id_map is not None and facility_id not in id_map:
+            stats['not_in_production'] += 1
+            continue
+
+        existing = current.get(facility_id)
+        if existing is not None:
+            if SOURCE_PRIORITY.get(existing[4], 0) > SOURCE_PRIORITY.get(source, 0):
+                stats['protected'] += 1
+                continue
+            same_waiting = values[3] is None or existing[3] == values[3]
+            if tuple(existing[:3]) == tuple(values[:3]) and same_waiting and existing[4] == source:
+                stats['unchanged'] += 1
+                continue
+
+        batch.append((facility_id, *values, source, synced_at))
+
+        if len(batch) >= batch_size:
+            if flush_batch(conn, batch, source, id_map):
+                stats['written'] += len(batch)
+            else:
+                stats['failed'] += len(batch)
+            batch = []
+            print(f"   처리 {stats['read']:,}행 / 반영 {stats['written']:,}개", flush=True)
+
+    if batch:
+        if flush_batch(conn, batch, source, id_map):
+            stats['written'] += len(batch)
+        else:
+            stats['failed'] += len(batch)
+
+    stats['unmatched_samples'] = unmatched_samples
+    return stats
+
+
+def log_collection(conn, source, stats, elapsed_ms, push):
+    """data_collection_logs 에 실행 기록 (로컬 + push 시 Production)"""
+    status = 'failed' if stats['failed'] else 'success'
+    row = (
+        'public_data_portal' if source == 'public_api' else source,
+        'fetch_capacity', status, stats['written'], None, elapsed_ms
+    )
+    columns = ['source', 'action', 'status', 'records_processed', 'error_message', 'execution_time_ms']
+
+    with conn:
+        conn.execute(
+            f"INSERT INTO data_collection_logs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            row
+        )
+    if push:
+        execute_remote(build_insert('data_collection_logs', columns, [row]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='정원/현원 데이터 증분 반영')
+    parser.add_argument('file', help='공공데이터 덤프 (CSV 또는 XML)')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--source', default='public_api', choices=sorted(SOURCE_PRIORITY),
+                        help='데이터 출처 (기본: public_api)')
+    parser.add_argument('--push', action='store_true', help='변경분을 Production D1에도 반영')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🛏️  정원/현원 데이터 증분 반영")
+    print("=" * 70)
+    print()
+
+    started = time.time()
+    try:
+        conn = connect_local(args.db)
+        stats = ingest_capacity(conn, args.file, source=args.source, push=args.push)
+        elapsed_ms = int((time.time() - started) * 1000)
+        log_collection(conn, args.source, stats, elapsed_ms, args.push)
+        conn.close()
+    except Exception as e:
+        print(f"❌ 반영 실패: {e}")
+        sys.exit(1)
+
+    print()
+    print("=" * 70)
+    print("✅ 완료!")
+    print("=" * 70)
+    print(f"   읽은 행: {stats['read']:,}개")
+    print(f"   변경 반영: {stats['written']:,}개")
+    print(f"   변경 없음: {stats['unchanged']:,}개")
+    print(f"   시설 입력 우선(건너뜀): {stats['protected']:,}개")
+    print(f"   시설 매칭 실패: {stats['unmatched']:,}개 {stats['unmatched_samples']}")
+    print(f"   덤프 내 중복 행(첫 행 사용): {stats['duplicate']:,}개")
+    if args.push:
+        print(f"   Production 에 없는 시설(건너뜀): {stats['not_in_production']:,}개")
+    print(f"   정원/현원 누락: {stats['invalid']:,}개")
+    if stats['failed']:
+        print(f"   ❌ 업로드 실패: {stats['failed']:,}개")
+        sys.exit(1)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,9 @@ CSV 파일을 로컬 D1 데이터베이스에 임포트하는 스크립트
 import sqlite3
 import sys
 
+from build_search_index import update_search_index
+from d1_common import facility_key
+
 # 파일 경로
 CSV_FILE = '/home/user/webapp/최종요양시설18708_251017.csv'
 LOCAL_DB_PATH = '/home/user/webapp/.wrangler/state/v3/d1/miniflare-D1DatabaseObject/f984b4a70fef7a895996004e43b002e0b8452a7bd9984138a20f069c8ef2a773.sqlite'
@@ -95,17 +98,40 @@ def import_to_local_db(facilities):
         conn = sqlite3.connect(LOCAL_DB_PATH)
         cursor = conn.cursor()
         
-        # 기존 데이터 삭제
-        cursor.execute("DELETE FROM facilities")
-        print("   ✅ 기존 데이터 삭제 완료")
+        # 기존 행은 시설 키(정규화한 시설명+주소)로 찾아 id 를 유지한 채 갱신
+        # (전체 삭제 후 다시 넣으면 id 가 모두 바뀌어 검색 인덱스 등 id 기준 데이터가 전부 다시 만들어짐)
+        existing = {}
+        for row in cursor.execute("SELECT id, name, address FROM facilities ORDER BY id"):
+            existing.setdefault(facility_key(row[1], row[2]), []).append(row[0])
+        
+        updates = []
+        inserts = []
+        for facility in facilities:
+            ids = existing.get(facility_key(facility[1], facility[3]))
+            if ids:
+                updates.append(facility + (ids.pop(0),))
+            else:
+                inserts.append(facility)
+        stale_ids = [(i,) for ids in existing.values() for i in ids]
         
-        # 배치 삽입
+        cursor.executemany("""
+            UPDATE facilities SET facility_type = ?, name = ?, postal_code = ?, address = ?, phone = ?,
+                latitude = ?, longitude = ?, sido = ?, sigungu = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, updates)
         cursor.executemany("""
             INSERT INTO facilities (facility_type, name, postal_code, address, phone, latitude, longitude, sido, sigungu)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, facilities)
+        """, inserts)
+        cursor.executemany("DELETE FROM facilities WHERE id = ?", stale_ids)
         
         conn.commit()
+        print(f"   ✅ 갱신 {len(updates):,}개 / 추가 {len(inserts):,}개 / 삭제 {len(stale_ids):,}개")
+        
+        # 검색 인덱스 증분 갱신 (변경된 시설만)
+        conn.row_factory = sqlite3.Row
+        changed_ids, removed_ids, _ = update_search_index(conn)
+        print(f"   ✅ 검색 인덱스 갱신 (변경 {len(changed_ids):,}개, 삭제 {len(removed_ids):,}개)")
         
         # 확인
         cursor.execute("SELECT COUNT(*) FROM facilities")
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+facility_details 대량 적재 스크립트 (generated_details.json → facility_details)
+
+- JSON 배열을 통째로 읽지 않고 항목 단위로 스트리밍 파싱 (iter_json_array)
+- 키 이름을 facility_details 컬럼으로 매핑 (admissionTypes → admission_types 등)
+  하고 컬럼 종류(JSON 배열/객체, 정수, 등급, 여부, 텍스트)별로 값 검증
+- 배치 upsert 를 로컬 D1 에 반영, --push 시 시설 업로드와 같은
+  wrangler d1 execute 경로로 Production D1 에도 반영
+  (facility_id 는 로컬 id 이므로 facility_key 로 Production id 에 연결해서 보내고,
+  Production 에 아직 없는 시설은 로컬에도 쓰지 않고 건너뜀)
+
+값이 없거나(null) 검증에 실패한 필드는 기존 값을 덮어쓰지 않는다.
+같은 facility_id 가 여러 번 나오면 뒤에 나온 항목이 우선한다
+(/api/admin/bulk-insert-details 와 동일).
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+from d1_common import (
+    BATCH_DELAY, BATCH_SIZE, build_insert, connect_local, execute_remote, iter_json_array,
+    map_facility_ids
+)
+
+DEFAULT_FILE = 'migrations/generated_details.json'
+
+# facility_details 컬럼 → 값 종류 (0014, 0017, 0019 스키마)
+DETAIL_COLUMNS = {
+    'services': 'json_list',
+    'specialties': 'json_list',
+    'room_types': 'json_list',
+    'amenities': 'json_list',
+    'medical_equipment': 'json_list',
+    'admission_types': 'json_list',
+    'specialized_care': 'json_list',
+    'operating_hours': 'json_object',
+    'additional_costs': 'json_object',
+    'heating_grade': 'grade',
+    'cooling_grade': 'grade',
+    'meal_quality': 'grade',
+    'staff_count': 'int',
+    'doctor_count': 'int',
+    'nurse_count': 'int',
+    'care_worker_count': 'int',
+    'average_cost_min': 'int',
+    'average_cost_max': 'int',
+    'monthly_cost': 'int',
+    'deposit': 'int',
+    'daily_cost': 'int',
+    'total_beds': 'int',
+    'available_beds': 'int',
+    'short_term_available': 'flag',
+    'night_care_available': 'flag',
+    'weekend_care_available': 'flag',
+    'description': 'text',
+    'notes': 'text',
+    'min_stay_period': 'text',
+    'updated_by': 'text',
+}
+
+GRADES = ('excellent', 'good', 'average')
+
+CAMEL_RE = re.compile(r'(?<=[a-z0-9])([A-Z])')
+
+
+def column_name(key):
+    """admissionTypes → admission_types"""
+    return CAMEL_RE.sub(r'_\1', key).lower()
+
+
+def parse_facility_id(value):
+    try:
+        facility_id = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return facility_id if facility_id > 0 else None
+
+
+def convert_value(kind, value):
+    """값 종류별 변환 → SQL 에 넣을 값 / 잘못된 값이면 ValueError"""
+    if kind in ('json_list', 'json_object'):
+        if isinstance(value, str):
+            value = json.loads(value)
+        expected = list if kind == 'json_list' else dict
+        if not isinstance(value, expected):
+            raise ValueError(kind)
+        if kind == 'json_list':
+            value = [str(v).strip() for v in value if v is not None and str(v).strip()]
+        return json.dumps(value, ensure_ascii=False)
+
+    if kind == 'int':
+        if isinstance(value, bool):
+            raise ValueError(kind)
+        number = int(float(str(value).replace(',', '')))
+        if number < 0:
+            raise ValueError(kind)
+        return number
+
+    if kind == 'flag':
+        if isinstance(value, str):
+            value = value.strip().lower() in ('1', 'true', 'y', 'yes', '가능')
+        return 1 if value else 0
+
+    if kind == 'grade':
+        grade = str(value).strip().lower()
+        if grade not in GRADES:
+            raise ValueError(kind)
+        return grade
+
+    return str(value).strip()
+
+
+def map_record(record, stats):
+    """JSON 항목 → (facility_id, {컬럼: 값}) / facility_id 가 잘못되면 None"""
+    if not isinstance(record, dict):
+        return None
+    facility_id = parse_facility_id(record.get('facility_id', record.get('facilityId')))
+    if facility_id is None:
+        return None
+
+    values = {}
+    for key, value in record.items():
+        column = column_name(key)
+        if column == 'facility_id':
+            continue
+        kind = DETAIL_COLUMNS.get(column)
+        if kind is None:
+            stats['unknown_fields'][key] = stats['unknown_fields'].get(key, 0) + 1
+            continue
+        if value is None or value == '':
+            continue
+        try:
+            values[column] = convert_value(kind, value)
+        except (TypeError, ValueError):
+            stats['invalid_fields'][column] = stats['invalid_fields'].get(column, 0) + 1
+
+    return facility_id, values
+
+
+def build_batch_statements(batch, updated_at):
+    """배치 → upsert 문 목록 (컬럼 구성이 같은 행끼리 한 문장)
+
+    묶으면서 문장 순서가 바뀌므로 같은 facility_id 는 배치 안에서 먼저 하나로 합친다
+    (뒤 항목 우선, 뒤 항목에 없는 필드는 앞 항목 값 유지 - 따로 upsert 한 것과 같은 결과).
+    """
+    merged = {}
+    for facility_id, values in batch:
+        merged.setdefault(facility_id, {}).update(values)
+
+    groups = {}
+    for facility_id, values in merged.items():
+        columns = tuple(sorted(values))
+        groups.setdefault(columns, []).append(
+            (facility_id, *(values[c] for c in columns), updated_at)
+        )
+
+    statements = []
+    for columns, rows in groups.items():
+        all_columns = ['facility_id', *columns, 'updated_at']
+        statements.append(build_insert(
+            'facility_details', all_columns, rows,
+            conflict=['facility_id'], update_columns=all_columns[1:]
+        ))
+    return statements
+
+
+def flush_batch(conn, batch, updated_at, id_map=None):
+    """배치를 (id_map 이 있으면 Production에 먼저) 반영한 뒤 로컬에 기록 → 성공 여부
+
+    id_map 은 로컬 → Production facilities.id (--push 일 때만).
+    """
+    if id_map is not None:
+        remote_batch = [(id_map[facility_id], values) for facility_id, values in batch]
+        success, error = execute_remote(';\n'.join(build_batch_statements(remote_batch, updated_at)))
+        if not success:
+            print(f"\n      ❌ 에러: {error}")
+            return False
+        time.sleep(BATCH_DELAY)
+
+    with conn:
+        for sql in build_batch_statements(batch, updated_at):
+            conn.execute(sql)
+    return True
+
+
+def load_details(conn, file_path, push=False, batch_size=BATCH_SIZE, updated_by='auto_generator',
+                 check_facilities=True):
+    """JSON 을 스트리밍으로 읽어 배치 upsert → 처리 통계 dict"""
+    known_ids = None
+    if check_facilities:
+        known_ids = {row[0] for row in conn.execute("SELECT id FROM facilities")}
+    id_map = map_facility_ids(conn) if push else None
+
+    updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    stats = {'read': 0, 'invalid': 0, 'unknown_facility': 0, 'not_in_production': 0, 'duplicate': 0,
+             'written': 0, 'failed': 0, 'unknown_fields': {}, 'invalid_fields': {}}
+    seen = set()
+    batch = []
+
+    for record in iter_json_array(file_path):
+        stats['read'] += 1
+
+        mapped = map_record(record, stats)
+        if mapped is None:
+            stats['invalid'] += 1
+            continue
+
+        facility_id, values = mapped
+        if known_ids is not None and facility_id not in known_ids:
+            stats['unknown_facility'] += 1
+            continue
+        # Production 에 없는 시설은 로컬에도 쓰지 않음 (시설 업로드 후 다시 실행하면 반영됨)
+        if id_map is not None and facility_id not in id_map:
+            stats['not_in_production'] += 1
+            continue
+        if facility_id in seen:
+            stats['duplicate'] += 1
+        seen.add(facility_id)
+
+        if updated_by and 'updated_by' not in values:
+            values['updated_by'] = updated_by
+        batch.append((facility_id, values))
+
+        if len(batch) >= batch_size:
+            if flush_batch(conn, batch, updated_at, id_map):
+                stats['written'] += len(batch)
+            else:
+                stats['failed'] += len(batch)
+            batch = []
+            print(f"   처리 {stats['read']:,}개 / 반영 {stats['written']:,}개", flush=True)
+
+    if batch:
+        if flush_batch(conn, batch, updated_at, id_map):
+            stats['written'] += len(batch)
+        else:
+            stats['failed'] += len(batch)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='facility_details 대량 적재')
+    parser.add_argument('file', nargs='?', default=DEFAULT_FILE, help=f'상세정보 JSON (기본: {DEFAULT_FILE})')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--push', action='store_true', help='Production D1에도 반영')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'배치 크기 (기본: {BATCH_SIZE})')
+    parser.add_argument('--updated-by', default='auto_generator', help='updated_by 기본값 (기본: auto_generator)')
+    parser.add_argument('--skip-facility-check', action='store_true',
+                        help='로컬 facilities 에 없는 facility_id 도 적재 (--push 시에는 Production 에 연결되는 시설만)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📋 facility_details 대량 적재")
+    print("=" * 70)
+    print(f"   파일: {args.file}")
+    print()
+
+    started = time.time()
+    try:
+        conn = connect_local(args.db)
+        stats = load_details(
+            conn, args.file, push=args.push, batch_size=args.batch_size,
+            updated_by=args.updated_by, check_facilities=not args.skip_facility_check
+        )
+        conn.close()
+    except Exception as e:
+        print(f"❌ 적재 실패: {e}")
+        sys.exit(1)
+
+    print()
+    print("=" * 70)
+    print(f"✅ 완료! ({time.time() - started:.1f}초)")
+    print("=" * 70)
+    print(f"   읽은 항목: {stats['read']:,}개")
+    print(f"   반영: {stats['written']:,}개 (중복 facility_id {stats['duplicate']:,}개, 뒤 항목 우선)")
+    print(f"   facility_id 오류: {stats['invalid']:,}개")
+    print(f"   없는 시설: {stats['unknown_facility']:,}개")
+    if args.push:
+        print(f"   Production 에 없는 시설(건너뜀): {stats['not_in_production']:,}개")
+    if stats['invalid_fields']:
+        print(f"   ⚠️  값 검증 실패 필드: {stats['invalid_fields']}")
+    if stats['unknown_fields']:
+        print(f"   ⚠️  스키마에 없는 필드: {stats['unknown_fields']}")
+    if stats['failed']:
+        print(f"   ❌ 업로드 실패: {stats['failed']:,}개")
+        sys.exit(1)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+-- Migration: 시설명/주소 검색 인덱스 테이블
+-- 목적: LIKE '%...%' 풀스캔 대신 부분 문자열/초성 검색을 인덱스 조회로 처리
+-- 생성: build_search_index.py (임포트 시 변경된 시설만 증분 갱신)
+
+-- 1. 검색어 → 시설 역색인
+--    kind: 'bigram'  한글 음절 2-gram (부분 문자열 검색)
+--          'chosung' 시설명 초성 2-gram (예: 'ㅎㅂ')
+--          'token'   괄호 꼬리표를 제거한 정규화 토큰 (완전 일치)
+--    field: 'name', 'address'
+CREATE TABLE IF NOT EXISTS facility_search_terms (
+  term TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  field TEXT NOT NULL,
+  facility_id INTEGER NOT NULL,
+  PRIMARY KEY (term, kind, field, facility_id)
+) WITHOUT ROWID;
+
+-- 시설 단위 삭제/재색인용
+CREATE INDEX IF NOT EXISTS idx_facility_search_terms_facility ON facility_search_terms(facility_id);
+
+-- 2. 색인 상태 (시설명+주소 지문, 변경 감지용)
+CREATE TABLE IF NOT EXISTS facility_search_state (
+  facility_id INTEGER PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  indexed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 조회 예시 (검색어 '행복요양' → 2-gram '행복', '복요', '요양' 모두 포함한 시설)
+-- SELECT facility_id FROM facility_search_terms
+-- WHERE kind = 'bigram' AND field = 'name' AND term IN ('행복', '복요', '요양')
+-- GROUP BY facility_id HAVING COUNT(DISTINCT term) = 3;
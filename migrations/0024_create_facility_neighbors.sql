@@ -0,0 +1,32 @@
+-- Migration: 시설별 최근접 시설 테이블
+-- 목적: 긴급 전원/대체 시설 추천에서 "가까운 X 유형 시설" 을 좌표 스캔 없이 조회
+-- 생성: build_facility_neighbors.py (좌표가 바뀐 시설 주변만 증분 갱신)
+
+-- 1. 시설별, 이웃 유형별 상위 K개 최근접 시설
+CREATE TABLE IF NOT EXISTS facility_neighbors (
+  facility_id INTEGER NOT NULL,          -- 기준 시설
+  neighbor_type TEXT NOT NULL,           -- 이웃 시설 유형 (요양병원, 요양원, 재가복지센터, 주야간보호)
+  rank INTEGER NOT NULL,                 -- 1 = 가장 가까움
+  neighbor_id INTEGER NOT NULL,          -- 이웃 시설
+  distance_km REAL NOT NULL,             -- 대원거리 (km)
+  PRIMARY KEY (facility_id, neighbor_type, rank)
+) WITHOUT ROWID;
+
+-- 이웃으로 참조된 시설이 이동/삭제되었을 때 영향 범위 조회용
+CREATE INDEX IF NOT EXISTS idx_facility_neighbors_neighbor ON facility_neighbors(neighbor_id);
+
+-- 2. 마지막으로 반영한 좌표/유형 (변경 감지용)
+CREATE TABLE IF NOT EXISTS facility_neighbor_state (
+  facility_id INTEGER PRIMARY KEY,
+  facility_type TEXT NOT NULL,
+  latitude REAL NOT NULL,
+  longitude REAL NOT NULL,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 조회 예시 (시설 123 주변 공실 있는 요양원 5곳)
+-- SELECT n.neighbor_id, n.distance_km, c.available_beds
+-- FROM facility_neighbors n
+-- JOIN facility_realtime_capacity c ON c.facility_id = n.neighbor_id
+-- WHERE n.facility_id = 123 AND n.neighbor_type = '요양원' AND c.available_beds > 0
+-- ORDER BY n.rank LIMIT 5;
@@ -0,0 +1,46 @@
+-- Migration: 이벤트 로그 → 통계 테이블 증분 집계
+-- 목적: 통계 화면이 원본 이벤트 테이블 대신 미리 집계된 작은 행을 읽도록 함
+-- 생성: rollup_stats.py
+
+-- 1. 원본 테이블별 집계 워터마크 (정렬 컬럼 값 + id 로 keyset 위치 기록)
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  source_table TEXT PRIMARY KEY,
+  last_value TEXT,                       -- 정렬 컬럼 값 (id 정렬이면 NULL)
+  last_id INTEGER NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. 시설별 일별 통계 (user_matching_feedback 집계)
+CREATE TABLE IF NOT EXISTS facility_daily_stats (
+  facility_id INTEGER NOT NULL,
+  stat_date TEXT NOT NULL,               -- YYYY-MM-DD
+  shown_count INTEGER DEFAULT 0,         -- 추천 목록 노출
+  clicked_count INTEGER DEFAULT 0,       -- 조회/클릭
+  quote_request_count INTEGER DEFAULT 0, -- 견적 요청
+  final_selection_count INTEGER DEFAULT 0,
+  feedback_count INTEGER DEFAULT 0,      -- 만족도 응답 수
+  satisfaction_sum INTEGER DEFAULT 0,
+  satisfaction_avg REAL DEFAULT 0.0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (facility_id, stat_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_facility_daily_stats_date ON facility_daily_stats(stat_date);
+
+-- 3. 데이터 수집 작업 일별 통계 (data_collection_logs 집계)
+CREATE TABLE IF NOT EXISTS data_collection_daily_stats (
+  source TEXT NOT NULL,
+  action TEXT NOT NULL,
+  stat_date TEXT NOT NULL,
+  run_count INTEGER DEFAULT 0,
+  success_count INTEGER DEFAULT 0,
+  failed_count INTEGER DEFAULT 0,
+  records_processed INTEGER DEFAULT 0,
+  execution_time_ms_sum INTEGER DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (source, action, stat_date)
+);
+
+-- 4. 증분 스캔용 인덱스
+CREATE INDEX IF NOT EXISTS idx_matching_feedback_activity ON user_matching_feedback(last_activity_at, id);
+CREATE INDEX IF NOT EXISTS idx_facility_reviews_updated ON facility_reviews(updated_at, id);
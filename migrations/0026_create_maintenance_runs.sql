@@ -0,0 +1,23 @@
+-- Migration: 만료/누적 테이블 정기 정리
+-- 목적: 청크 단위 삭제가 시간 컬럼 인덱스를 타도록 하고, 테이블별 마지막 실행 기록
+-- 생성: run_maintenance.py
+
+-- 1. 테이블별 정리 실행 기록 (주기 판단용)
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+  table_name TEXT PRIMARY KEY,
+  last_run_at DATETIME,
+  last_cutoff TEXT,                      -- 이 값보다 오래된 행을 정리
+  deleted_count INTEGER DEFAULT 0,       -- 마지막 실행 삭제 행 수
+  archived_count INTEGER DEFAULT 0,      -- 마지막 실행 보관 행 수
+  archive_file TEXT,
+  status TEXT,                           -- 'success', 'partial', 'failed'
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. 정리 대상 시간 컬럼 인덱스
+--    sessions.expires_at(0010 idx_sessions_expires_at), calculation_history.created_at(idx_calc_history_date)은
+--    기존 인덱스를 사용한다. 아래 세 테이블은 기존 마이그레이션(0004, 0020, 0022)에 quote_id / user_id /
+--    session_id / model 인덱스만 있어 created_at 인덱스를 여기서 처음 만든다 (IF NOT EXISTS).
+CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at ON chat_messages(created_at);
+CREATE INDEX IF NOT EXISTS idx_ai_user_sessions_created_at ON ai_user_sessions(created_at);
+CREATE INDEX IF NOT EXISTS idx_model_performance_logs_created_at ON model_performance_logs(created_at);
@@ -0,0 +1,34 @@
+-- Migration: 요양비용 계산 결과 사전 계산 테이블
+-- 목적: 계산기 요청이 요율 테이블 4개를 조인하지 않고 키 하나로 조회하도록 함
+-- 생성: build_care_cost_matrix.py (요율 테이블이 바뀐 경우에만 재생성)
+
+-- 1. 등급 × 시설유형 × 바우처 조합별 계산 결과
+CREATE TABLE IF NOT EXISTS care_cost_matrix (
+  cost_key TEXT PRIMARY KEY,              -- '1등급|요양병원|장기요양급여'
+  grade_level TEXT NOT NULL,
+  facility_type TEXT NOT NULL,
+  voucher_type TEXT NOT NULL,
+  copayment_rate REAL NOT NULL,
+  max_monthly_limit INTEGER,
+  base_cost INTEGER NOT NULL,
+  meal_cost INTEGER DEFAULT 0,
+  management_cost INTEGER DEFAULT 0,
+  total_facility_cost INTEGER NOT NULL,
+  voucher_amount INTEGER NOT NULL,
+  voucher_coverage INTEGER NOT NULL,      -- MIN(바우처, 시설 총 비용)
+  copayment_amount INTEGER NOT NULL,      -- (시설 총 비용 - 바우처 지원) × 본인부담률
+  final_monthly_cost INTEGER NOT NULL,    -- 추가 항목 제외 최종 월 비용
+  version TEXT NOT NULL,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_care_cost_matrix_grade_type ON care_cost_matrix(grade_level, facility_type);
+
+-- 2. 현재 사전 계산 버전 (요율 테이블 내용 지문)
+CREATE TABLE IF NOT EXISTS care_cost_matrix_versions (
+  name TEXT PRIMARY KEY,                  -- 'current'
+  version TEXT NOT NULL,
+  row_count INTEGER DEFAULT 0,
+  additional_items TEXT,                  -- JSON: [{id, item_name, monthly_cost}, ...]
+  generated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,18 @@
+-- Migration: 시도별 샤드 D1 을 위한 전역 시설 디렉터리
+-- 목적: 시설 행과 관련 테이블은 시도별 샤드 D1 에 두고,
+--       전역 D1 에는 "어느 시설이 어느 샤드에 있는지"만 두어 지역을 넘는 조회에 사용
+-- 생성: sync_shards.py (전역 D1 과 로컬 D1 양쪽에 같은 내용을 기록)
+
+CREATE TABLE IF NOT EXISTS facility_directory (
+  facility_id INTEGER PRIMARY KEY,       -- 로컬/샤드 공통 facilities.id
+  name TEXT NOT NULL,
+  facility_type TEXT,
+  sido TEXT,                             -- 정규화한 시도명 (서울 → 서울특별시)
+  sigungu TEXT,
+  shard TEXT NOT NULL,                   -- 샤드 D1 이름 (shard_map.json)
+  synced_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_facility_directory_shard ON facility_directory(shard);
+CREATE INDEX IF NOT EXISTS idx_facility_directory_region ON facility_directory(sido, sigungu);
+CREATE INDEX IF NOT EXISTS idx_facility_directory_name ON facility_directory(name);
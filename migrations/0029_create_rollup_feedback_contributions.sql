@@ -0,0 +1,17 @@
+-- Migration: 매칭 세션별 집계 기여분 기록
+-- 목적: user_matching_feedback 세션은 집계 후에도 활동이 이어질 수 있으므로(last_activity_at 갱신)
+--       세션마다 통계에 더한 값을 남겨 두고, 다시 집계될 때 차이만 반영 (중복 집계 방지)
+-- 생성: rollup_stats.py
+
+CREATE TABLE IF NOT EXISTS rollup_feedback_contributions (
+  feedback_id INTEGER NOT NULL,          -- user_matching_feedback.id
+  facility_id INTEGER NOT NULL,
+  stat_date TEXT NOT NULL,               -- 세션 created_at 기준 KST 날짜
+  shown_count INTEGER DEFAULT 0,
+  clicked_count INTEGER DEFAULT 0,
+  quote_request_count INTEGER DEFAULT 0,
+  final_selection_count INTEGER DEFAULT 0,
+  feedback_count INTEGER DEFAULT 0,
+  satisfaction_sum INTEGER DEFAULT 0,
+  PRIMARY KEY (feedback_id, facility_id)
+);
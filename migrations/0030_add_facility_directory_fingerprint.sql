@@ -0,0 +1,6 @@
+-- Migration: 샤드 디렉터리에 시설별 동기화 지문 추가
+-- 목적: 시설 행과 관련 테이블 행의 해시를 마지막으로 반영한 값과 비교해
+--       바뀌었거나 샤드를 옮긴 시설만 다시 보냄 (매번 전체 재전송 방지)
+-- 생성: sync_shards.py (비어 있으면 다음 동기화 때 다시 보냄)
+
+ALTER TABLE facility_directory ADD COLUMN fingerprint TEXT;
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+로컬 D1 변경분 캡처 + Production D1 자동 반영 (watch 모드)
+
+- --install: 로컬 DB 의 facilities 와 관련 테이블에 트리거를 달아
+  변경된 행의 키만 change_log 에 기록 (행 내용은 반영 시점에 다시 읽음)
+- 기본 실행: 밀린 변경분을 한 번 반영하고 종료
+- --watch: change_log 를 계속 확인하며 몇 초 안에 작은 배치로 반영
+
+반영 위치(ack)는 대상 DB 별로 change_log_acks 에 기록하며 Production 반영이
+성공한 뒤에만 전진한다. 중간에 멈춰도 ack 이후 변경분부터 다시 보내고,
+같은 키는 "현재 행 upsert / 없으면 delete" 로 보내므로 다시 보내도 결과가 같다.
+
+트리거는 로컬 전용이다 (마이그레이션으로 Production 에 적용하지 않음).
+
+기존 업로드 스크립트들은 id 없이 INSERT 해 로컬 id 와 Production id 가 다르다.
+로컬 facilities.id → Production facilities.id 는 facility_key 로 연결해
+change_log_id_map 에 대상 DB 별로 저장해 두고 (--install 때 전체, 이후 모르는 id 만 추가),
+로컬에서 지워지거나 이름이 바뀐 시설도 저장된 매핑으로 같은 Production 행을 가리킨다
+(facilities.id 는 AUTOINCREMENT 라 지운 로컬 id 가 다시 쓰이지 않으므로 매핑은 지우지 않음).
+- 로컬에서 새로 생긴 시설은 id 없이 INSERT 한 뒤 돌려받은 Production id 를 매핑에 추가
+- 삭제는 매핑된 Production id 한 건씩만 (매핑이 없으면 보내지 않고 건너뜀)
+- Production 에서 직접 관리하는 값은 덮어쓰지 않음
+  (facility_settings 는 캡처하지 않고, 시설 직접 입력/수동 정원 값은 공공데이터 값으로 바꾸지 않음)
+Production 을 id 없이 다시 적재했다면 --refresh-map 으로 매핑을 새로 만든다.
+"""
+
+import argparse
+import sys
+import time
+
+from d1_common import (
+    DATABASE_NAME, build_insert, chunked, connect_local, execute_remote, facility_key,
+    map_facility_ids, query_remote, sql_literal
+)
+from import_capacity_data import SOURCE_PRIORITY
+
+# 캡처 대상 테이블: key = 로컬 facilities.id 를 담은 컬럼 (Production 으로 보낼 때 매핑),
+# exclude = 로컬/Production 에서 값이 다를 수 있어 보내지 않는 컬럼
+CAPTURE_TABLES = {
+    'facilities': {'key': 'id', 'exclude': []},
+    'facility_details': {'key': 'facility_id', 'exclude': []},
+    'facility_realtime_capacity': {'key': 'facility_id', 'exclude': ['id']},
+}
+
+# 예전에 캡처했지만 Production 이 주인인 테이블 (--install 때 트리거 제거)
+RETIRED_TABLES = ['facility_settings']
+
+CHANGELOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS change_log (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  table_name TEXT NOT NULL,
+  row_key INTEGER NOT NULL,
+  op TEXT NOT NULL,                      -- 'upsert', 'delete'
+  changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS change_log_acks (
+  target TEXT PRIMARY KEY,               -- 반영 대상 D1 이름
+  last_seq INTEGER NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS change_log_id_map (
+  target TEXT NOT NULL,                  -- 반영 대상 D1 이름
+  local_id INTEGER NOT NULL,             -- 로컬 facilities.id
+  remote_id INTEGER NOT NULL,            -- Production facilities.id
+  mapped_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (target, local_id)
+);
+"""
+
+BATCH_CHANGES = 200       # 한 번에 읽을 change_log 행 수
+POLL_SECONDS = 2          # --watch 확인 주기
+MAX_BACKOFF_SECONDS = 60  # 반영 실패 시 최대 대기
+
+
+def trigger_names(table):
+    return [f"trg_change_log_{table}_{event}" for event in ('insert', 'update', 'delete')]
+
+
+def trigger_statements(table, key):
+    """INSERT/UPDATE/DELETE 트리거 (키가 바뀌는 UPDATE 는 이전 키 delete 도 기록)"""
+    insert_name, update_name, delete_name = trigger_names(table)
+    name = sql_literal(table)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {insert_name} AFTER INSERT ON {table}
+BEGIN
+  INSERT INTO change_log (table_name, row_key, op) VALUES ({name}, NEW.{key}, 'upsert');
+END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {update_name} AFTER UPDATE ON {table}
+BEGIN
+  INSERT INTO change_log (table_name, row_key, op)
+    SELECT {name}, OLD.{key}, 'delete' WHERE OLD.{key} IS NOT NEW.{key};
+  INSERT INTO change_log (table_name, row_key, op) VALUES ({name}, NEW.{key}, 'upsert');
+END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {delete_name} AFTER DELETE ON {table}
+BEGIN
+  INSERT INTO change_log (table_name, row_key, op) VALUES ({name}, OLD.{key}, 'delete');
+END""",
+    ]
+
+
+def install(conn, tables):
+    with conn:
+        conn.executescript(CHANGELOG_SCHEMA)
+        for table in tables:
+            for sql in trigger_statements(table, CAPTURE_TABLES[table]['key']):
+                conn.execute(sql)
+        for table in RETIRED_TABLES:
+            for name in trigger_names(table):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def uninstall(conn, tables):
+    with conn:
+        for table in tables:
+            for name in trigger_names(table):
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def current_seq(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+# ---------------------------------------------------------------------------
+# 로컬 id → Production id 매핑
+# ---------------------------------------------------------------------------
+
+def load_id_map(conn, target, local_ids=None):
+    """저장된 매핑 {로컬 id: Production id} (local_ids 를 주면 그 id 만)"""
+    if local_ids is None:
+        rows = conn.execute(
+            "SELECT local_id, remote_id FROM change_log_id_map WHERE target = ?", (target,)
+        ).fetchall()
+    else:
+        rows = []
+        for ids in chunked(sorted(local_ids), 500):
+            rows += conn.execute(
+                f"SELECT local_id, remote_id FROM change_log_id_map "
+                f"WHERE target = ? AND local_id IN ({', '.join('?' * len(ids))})",
+                (target, *ids)
+            ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def save_id_map(conn, target, pairs):
+    with conn:
+        conn.executemany("""
+            INSERT INTO change_log_id_map (target, local_id, remote_id, mapped_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(target, local_id) DO UPDATE SET
+                remote_id = excluded.remote_id, mapped_at = CURRENT_TIMESTAMP
+        """, [(target, local_id, remote_id) for local_id, remote_id in pairs])
+
+
+def refresh_id_map(conn, target, rebuild=False):
+    """Production facilities 를 읽어 매핑 보충 → 새로 매핑한 시설 수
+
+    기본은 아직 매핑이 없는 로컬 시설만 추가하고, 이미 다른 로컬 id 가 쓰는 Production id 는 건너뛴다
+    (로컬에서 이름이 바뀐 시설도 처음 매핑을 그대로 유지).
+    rebuild 이면 대상의 매핑을 지우고 현재 로컬 시설 기준으로 다시 만든다.
+    """
+    if rebuild:
+        with conn:
+            conn.execute("DELETE FROM change_log_id_map WHERE target = ?", (target,))
+    known = load_id_map(conn, target)
+    used = set(known.values())
+    pairs = []
+    for local_id, remote_id in map_facility_ids(conn, database=target).items():
+        if local_id in known or remote_id in used:
+            continue
+        used.add(remote_id)
+        pairs.append((local_id, remote_id))
+    save_id_map(conn, target, pairs)
+    return len(pairs)
+
+
+def insert_new_facilities(conn, target, local_ids):
+    """Production 에 없는 로컬 시설을 id 없이 INSERT → [(로컬 id, Production id)]
+
+    돌려받은 행은 facility_key 로 로컬 행과 짝짓는다 (같은 키는 id 순서대로).
+    """
+    columns = [c for c in table_columns(conn, 'facilities') if c != 'id']
+    rows = conn.execute(
+        f"SELECT id, {', '.join(columns)} FROM facilities "
+        f"WHERE id IN ({', '.join('?' * len(local_ids))}) ORDER BY id",
+        sorted(local_ids)
+    ).fetchall()
+    if not rows:
+        return []
+
+    inserted, _ = query_remote(
+        build_insert('facilities', columns, [tuple(row)[1:] for row in rows]) + " RETURNING id, name, address",
+        database=target
+    )
+    by_key = {}
+    for row in sorted(inserted, key=lambda r: r['id']):
+        by_key.setdefault(facility_key(row['name'], row['address']), []).append(row['id'])
+    return [
+        (row['id'], by_key[facility_key(row['name'], row['address'])].pop(0))
+        for row in rows
+        if by_key.get(facility_key(row['name'], row['address']))
+    ]
+
+
+# ---------------------------------------------------------------------------
+# 변경분 반영
+# ---------------------------------------------------------------------------
+
+def load_ack(conn, target):
+    row = conn.execute("SELECT last_seq FROM change_log_acks WHERE target = ?", (target,)).fetchone()
+    return row[0] if row is not None else 0
+
+
+def save_ack(conn, target, last_seq):
+    with conn:
+        conn.execute("""
+            INSERT INTO change_log_acks (target, last_seq, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(target) DO UPDATE SET last_seq = excluded.last_seq, updated_at = CURRENT_TIMESTAMP
+        """, (target, last_seq))
+
+
+def prune_acknowledged(conn):
+    """모든 대상이 반영한 change_log 행 삭제"""
+    with conn:
+        conn.execute("""
+            DELETE FROM change_log
+            WHERE seq <= (SELECT COALESCE(MIN(last_seq), 0) FROM change_log_acks)
+        """)
+
+
+def read_changes(conn, after_seq, limit):
+    """ack 이후 변경분 → (마지막 seq, {(테이블, 키): 마지막 op}) - 같은 행은 하나로 합침"""
+    rows = conn.execute(
+        "SELECT seq, table_name, row_key, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+        (after_seq, limit)
+    ).fetchall()
+    if not rows:
+        return after_seq, {}
+
+    coalesced = {}
+    for seq, table, row_key, op in rows:
+        if table in CAPTURE_TABLES:
+            coalesced[(table, row_key)] = op
+    return rows[-1][0], coalesced
+
+
+def table_columns(conn, table):
+    exclude = set(CAPTURE_TABLES[table]['exclude'])
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in exclude]
+
+
+def capacity_guard(source):
+    """이 source 보다 우선순위가 높은 Production 정원 행은 건드리지 않는 조건 (import_capacity_data 와 동일)"""
+    protected = [name for name, priority in SOURCE_PRIORITY.items()
+                 if priority > SOURCE_PRIORITY.get(source, 0)]
+    if not protected:
+        return ''
+    return (" WHERE COALESCE(facility_realtime_capacity.data_source, '') NOT IN ("
+            + ', '.join(sql_literal(name) for name in protected) + ')')
+
+
+def upsert_statements(table, columns, rows):
+    """로컬 행(키는 이미 Production id) → upsert 문 목록"""
+    key = CAPTURE_TABLES[table]['key']
+    update_columns = [c for c in columns if c != key]
+    if table != 'facility_realtime_capacity':
+        return [build_insert(table, columns, rows, conflict=[key], update_columns=update_columns)]
+
+    by_source = {}
+    source_index = columns.index('data_source')
+    for row in rows:
+        by_source.setdefault(row[source_index], []).append(row)
+    return [
+        build_insert(table, columns, source_rows, conflict=[key], update_columns=update_columns)
+        + capacity_guard(source)
+        for source, source_rows in by_source.items()
+    ]
+
+
+def delete_statement(table, remote_ids):
+    key = CAPTURE_TABLES[table]['key']
+    sql = f"DELETE FROM {table} WHERE {key} IN ({', '.join(str(int(k)) for k in sorted(remote_ids))})"
+    if table == 'facility_realtime_capacity':
+        # 공공데이터보다 우선하는 값(시설 직접 입력, 수동)은 로컬 삭제로 지우지 않음
+        protected = [name for name, priority in SOURCE_PRIORITY.items() if priority > 0]
+        sql += (" AND COALESCE(data_source, '') NOT IN ("
+                + ', '.join(sql_literal(name) for name in protected) + ')')
+    return sql
+
+
+def build_push_statements(conn, coalesced, id_map):
+    """합쳐진 변경분 → (Production 에 보낼 SQL 문 목록, 매핑이 없어 건너뛴 키 수)
+
+    upsert 는 로컬의 현재 행을 읽어 키를 Production id 로 바꿔 보내고,
+    그 사이 삭제된 행은 delete 로 보낸다.
+    삭제는 관련 테이블 → facilities, upsert 는 facilities → 관련 테이블 순서.
+    """
+    by_table = {}
+    skipped = 0
+    for (table, row_key), op in coalesced.items():
+        if row_key not in id_map:
+            skipped += 1
+            continue
+        by_table.setdefault(table, {'upsert': set(), 'delete': set()})[op].add(row_key)
+
+    deletes = []
+    upserts = []
+    for table in CAPTURE_TABLES:
+        keys = by_table.get(table)
+        if keys is None:
+            continue
+        key = CAPTURE_TABLES[table]['key']
+        columns = table_columns(conn, table)
+        key_index = columns.index(key)
+
+        rows = []
+        if keys['upsert']:
+            placeholders = ', '.join('?' * len(keys['upsert']))
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE {key} IN ({placeholders}) ORDER BY {key}",
+                sorted(keys['upsert'])
+            ).fetchall()
+            found = {row[key] for row in rows}
+            keys['delete'] |= keys['upsert'] - found
+
+        if keys['delete']:
+            deletes.append(delete_statement(table, {id_map[k] for k in keys['delete']}))
+        if rows:
+            remote_rows = [
+                tuple(id_map[value] if i == key_index else value for i, value in enumerate(row))
+                for row in rows
+            ]
+            upserts += upsert_statements(table, columns, remote_rows)
+    return deletes[::-1] + upserts, skipped
+
+
+def push_once(conn, target, batch_changes=BATCH_CHANGES):
+    """ack 이후 변경분을 배치 단위로 모두 반영 → (반영 행 수, 성공 여부)"""
+    pushed = 0
+    refreshed = False
+    while True:
+        after_seq = load_ack(conn, target)
+        last_seq, coalesced = read_changes(conn, after_seq, batch_changes)
+        if last_seq == after_seq:
+            return pushed, True
+
+        facility_ids = {row_key for _, row_key in coalesced}
+        id_map = load_id_map(conn, target, facility_ids)
+        # 모르는 id 가 있으면 실행마다 한 번만 Production 을 다시 읽어 매핑 보충
+        if len(id_map) < len(facility_ids) and not refreshed:
+            added = refresh_id_map(conn, target)
+            refreshed = True
+            if added:
+                print(f"   🔗 {target} 매핑 {added:,}개 추가", flush=True)
+            id_map = load_id_map(conn, target, facility_ids)
+
+        new_ids = [row_key for (table, row_key), op in coalesced.items()
+                   if table == 'facilities' and op == 'upsert' and row_key not in id_map]
+        if new_ids:
+            try:
+                pairs = insert_new_facilities(conn, target, new_ids)
+            except RuntimeError as e:
+                print(f"   ❌ 새 시설 추가 실패 (seq {after_seq + 1}~{last_seq}): {e}")
+                return pushed, False
+            save_id_map(conn, target, pairs)
+            id_map.update(pairs)
+            if pairs:
+                print(f"   ➕ 새 시설 {len(pairs):,}개 추가", flush=True)
+
+        statements, skipped = build_push_statements(conn, coalesced, id_map)
+        if statements:
+            success, error = execute_remote(';\n'.join(statements), database=target)
+            if not success:
+                print(f"   ❌ 반영 실패 (seq {after_seq + 1}~{last_seq}): {error}")
+                return pushed, False
+
+        save_ack(conn, target, last_seq)
+        pushed += len(coalesced) - skipped
+        note = f" (Production 에 없는 시설 {skipped:,}행 건너뜀)" if skipped else ''
+        print(f"   ✅ seq {after_seq + 1}~{last_seq}: {len(coalesced) - skipped:,}행 반영{note}", flush=True)
+
+
+def watch(conn, target, batch_changes=BATCH_CHANGES, poll_seconds=POLL_SECONDS):
+    """change_log 를 계속 확인하며 반영 (실패하면 대기 시간을 늘려 재시도)"""
+    backoff = poll_seconds
+    while True:
+        pushed, ok = push_once(conn, target, batch_changes)
+        if ok:
+            if pushed:
+                prune_acknowledged(conn)
+            backoff = poll_seconds
+        else:
+            backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            print(f"   ⏳ {backoff}초 후 재시도")
+        time.sleep(backoff)
+
+
+def print_status(conn):
+    # 반영 끝난 행은 지워지므로 마지막 seq 는 AUTOINCREMENT 카운터에서 읽음
+    count = conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    last_seq = current_seq(conn)
+    print(f"   change_log: {count:,}행 (마지막 seq {last_seq:,})")
+    mapped = dict(conn.execute("SELECT target, COUNT(*) FROM change_log_id_map GROUP BY target").fetchall())
+    for row in conn.execute("SELECT target, last_seq, updated_at FROM change_log_acks ORDER BY target"):
+        print(f"   - {row[0]}: seq {row[1]:,}까지 반영 ({row[2]}) / 대기 {last_seq - row[1]:,} "
+              f"/ id 매핑 {mapped.get(row[0], 0):,}개")
+    triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    for table in CAPTURE_TABLES:
+        installed = all(name in triggers for name in trigger_names(table))
+        print(f"   {'✅' if installed else '⬜'} {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='로컬 D1 변경분 캡처 및 Production 자동 반영')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--database', default=DATABASE_NAME, help=f'반영 대상 D1 (기본: {DATABASE_NAME})')
+    parser.add_argument('--tables', nargs='+', choices=sorted(CAPTURE_TABLES), default=sorted(CAPTURE_TABLES),
+                        help='트리거 설치/제거 대상 (기본: 전체)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--install', action='store_true',
+                      help='change_log 와 트리거 설치 후 로컬 → Production id 매핑 생성')
+    mode.add_argument('--refresh-map', action='store_true',
+                      help='id 매핑을 지우고 다시 생성 (Production 을 id 없이 다시 적재한 뒤)')
+    mode.add_argument('--uninstall', action='store_true', help='트리거 제거 (change_log 는 유지)')
+    mode.add_argument('--status', action='store_true', help='캡처/반영 상태 출력')
+    mode.add_argument('--watch', action='store_true', help='상주하며 변경분을 계속 반영')
+    parser.add_argument('--batch-changes', type=int, default=BATCH_CHANGES,
+                        help=f'한 번에 반영할 change_log 행 수 (기본: {BATCH_CHANGES})')
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS,
+                        help=f'--watch 확인 주기 (초, 기본: {POLL_SECONDS})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔁 로컬 D1 변경분 → Production D1")
+    print("=" * 70)
+    print()
+
+    conn = connect_local(args.db)
+    try:
+        if args.install or args.refresh_map:
+            install(conn, args.tables if args.install else [])
+            if args.install:
+                print(f"   ✅ 트리거 설치: {', '.join(args.tables)}")
+            mapped = refresh_id_map(conn, args.database, rebuild=args.refresh_map)
+            print(f"   ✅ {args.database} id 매핑 {mapped:,}개 추가")
+        elif args.uninstall:
+            uninstall(conn, args.tables)
+            print(f"   ✅ 트리거 제거: {', '.join(args.tables)}")
+        elif args.status:
+            print_status(conn)
+        elif args.watch:
+            print(f"   👀 {args.database} 로 반영 대기 중 (Ctrl+C 로 종료)")
+            watch(conn, args.database, args.batch_changes, args.interval)
+        else:
+            pushed, ok = push_once(conn, args.database, args.batch_changes)
+            if ok:
+                prune_acknowledged(conn)
+            print(f"   반영: {pushed:,}행")
+            if not ok:
+                sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⏹️  중단 (반영 위치는 저장됨)")
+    except Exception as e:
+        print(f"❌ 실패: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print()
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
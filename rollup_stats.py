@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+이벤트 로그 → 통계 테이블 증분 집계 스크립트
+
+- rollup_watermarks 에 기록된 위치 이후의 새 이벤트만 keyset 페이지로 읽음
+- 페이지 단위로 시설별/일별 카운터와 평균을 메모리에서 집계
+- 영향받은 집계 행만 upsert (집계 + 워터마크 갱신을 한 단위로 실행)
+- --retention-days 지정 시 집계가 끝난 오래된 원본 이벤트를 청크 단위로 삭제
+
+원본                     → 집계
+user_matching_feedback   → facility_daily_stats, facility_click_stats
+data_collection_logs     → data_collection_daily_stats
+facility_reviews         → facility_rating_stats (영향받은 시설만 재계산)
+
+user_matching_feedback 은 세션 동안 계속 갱신되므로 마지막 활동 후
+--settle-hours 가 지난(종료된) 세션만 집계하고, 세션별 기여분을
+rollup_feedback_contributions 에 남겨 그 뒤 활동으로 다시 읽히면 차이만 반영한다.
+facility_click_stats 는 이 스크립트만 갱신한다.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from d1_common import build_insert, chunked, open_database, sql_literal, sql_values
+
+PAGE_SIZE = 200
+SETTLE_HOURS = 24
+DELETE_CHUNK_SIZE = 500
+
+# 일별 통계 기준 시간대 (KST)
+TIMEZONE_OFFSET_HOURS = 9
+
+SOURCES = {
+    'user_matching_feedback': {
+        'order_column': 'last_activity_at',
+        'columns': ['id', 'created_at', 'last_activity_at', 'recommended_facilities', 'facilities_viewed',
+                    'quote_requested_facility_id', 'final_selected_facility_id', 'satisfaction_score'],
+        'settle': True,
+        'compact': True,
+    },
+    'data_collection_logs': {
+        'order_column': 'id',
+        'columns': ['id', 'created_at', 'source', 'action', 'status', 'records_processed', 'execution_time_ms'],
+        'settle': False,
+        'compact': True,
+    },
+    'facility_reviews': {
+        'order_column': 'updated_at',
+        'columns': ['id', 'updated_at', 'facility_id'],
+        'settle': False,
+        'compact': False,
+    },
+}
+
+# rollup_feedback_contributions 카운터 (feedback_contributions() 순서와 같음)
+CONTRIBUTION_COUNTERS = ['shown_count', 'clicked_count', 'quote_request_count', 'final_selection_count',
+                         'feedback_count', 'satisfaction_sum']
+
+RATING_COLUMNS = ['cleanliness', 'staff', 'food', 'facility', 'care', 'cost']
+
+
+def utc_timestamp(delta_hours=0):
+    moment = datetime.now(timezone.utc) - timedelta(hours=delta_hours)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def to_stat_date(timestamp):
+    """'YYYY-MM-DD HH:MM:SS' (UTC) → KST 날짜"""
+    try:
+        moment = datetime.strptime(str(timestamp)[:19], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return str(timestamp or '')[:10] or '1970-01-01'
+    return (moment + timedelta(hours=TIMEZONE_OFFSET_HOURS)).strftime('%Y-%m-%d')
+
+
+def parse_id_list(value):
+    """JSON 배열 문자열 → 시설 ID 목록 ([1, "2", {"id": 3}] 모두 허용)"""
+    if not value:
+        return []
+    try:
+        items = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+
+    ids = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get('facility_id', item.get('id'))
+        try:
+            ids.append(int(item))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# 워터마크 / keyset 페이지
+# ---------------------------------------------------------------------------
+
+def load_watermark(db, table):
+    rows = db.query(
+        f"SELECT last_value, last_id FROM rollup_watermarks WHERE source_table = {sql_literal(table)}"
+    )
+    if not rows:
+        return '', 0
+    return rows[0]['last_value'] or '', rows[0]['last_id'] or 0
+
+
+def watermark_statement(table, last_value, last_id):
+    return (
+        "INSERT INTO rollup_watermarks (source_table, last_value, last_id, updated_at) "
+        f"VALUES ({sql_literal(table)}, {sql_literal(last_value or None)}, {int(last_id)}, CURRENT_TIMESTAMP) "
+        "ON CONFLICT(source_table) DO UPDATE SET last_value = excluded.last_value, "
+        "last_id = excluded.last_id, updated_at = CURRENT_TIMESTAMP"
+    )
+
+
+def position_condition(order_column, last_value, last_id, after=True):
+    """워터마크 이후(after) 또는 이전(이미 집계된) 행 조건"""
+    if order_column == 'id':
+        return f"id > {int(last_id)}" if after else f"id <= {int(last_id)}"
+
+    column = f"COALESCE({order_column}, '')"
+    value = sql_literal(last_value)
+    if after:
+        return f"({column} > {value} OR ({column} = {value} AND id > {int(last_id)}))"
+    return f"({column} < {value} OR ({column} = {value} AND id <= {int(last_id)}))"
+
+
+def fetch_page(db, table, spec, watermark, settle_cutoff, page_size):
+    order_column = spec['order_column']
+    conditions = [position_condition(order_column, *watermark)]
+    if spec['settle'] and settle_cutoff:
+        conditions.append(f"COALESCE({order_column}, '') < {sql_literal(settle_cutoff)}")
+
+    order_by = 'id' if order_column == 'id' else f"COALESCE({order_column}, ''), id"
+    return db.query(f"""
+        SELECT {', '.join(spec['columns'])}
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order_by}
+        LIMIT {int(page_size)}
+    """)
+
+
+# ---------------------------------------------------------------------------
+# 집계기: 한 페이지의 이벤트 → upsert SQL 문 목록
+# ---------------------------------------------------------------------------
+
+def feedback_contributions(row):
+    """세션 한 건 → {facility_id: [노출, 클릭, 견적요청, 최종선택, 만족도 응답 수, 만족도 합]}"""
+    contributions = {}
+
+    def bump(facility_id, index, amount=1):
+        contributions.setdefault(int(facility_id), [0] * 6)[index] += amount
+
+    for facility_id in set(parse_id_list(row['recommended_facilities'])):
+        bump(facility_id, 0)
+    for facility_id in set(parse_id_list(row['facilities_viewed'])):
+        bump(facility_id, 1)
+    if row['quote_requested_facility_id']:
+        bump(row['quote_requested_facility_id'], 2)
+    if row['final_selected_facility_id']:
+        bump(row['final_selected_facility_id'], 3)
+        if row['satisfaction_score']:
+            bump(row['final_selected_facility_id'], 4)
+            bump(row['final_selected_facility_id'], 5, row['satisfaction_score'])
+    return contributions
+
+
+def rollup_matching_feedback(db, rows):
+    """세션별 기여분을 새로 계산해 이전 기여분(rollup_feedback_contributions)과의 차이만 반영
+
+    이미 집계된 세션에 활동이 이어져 다시 읽혀도 통계에 두 번 더해지지 않는다.
+    """
+    # 카운터 순서: 노출, 클릭, 견적요청, 최종선택, 만족도 응답 수, 만족도 합
+    daily = {}
+    totals = {}
+    last_shown = {}
+
+    def apply(facility_id, stat_date, counts, sign):
+        current = daily.setdefault((facility_id, stat_date), [0] * 6)
+        for index, amount in enumerate(counts):
+            current[index] += sign * amount
+        current_total = totals.setdefault(facility_id, [0] * 4)
+        for index in range(4):
+            current_total[index] += sign * counts[index]
+
+    id_list = ', '.join(str(int(row['id'])) for row in rows)
+    for row in db.query(f"""
+        SELECT facility_id, stat_date, {', '.join(CONTRIBUTION_COUNTERS)}
+        FROM rollup_feedback_contributions WHERE feedback_id IN ({id_list})
+    """):
+        apply(row['facility_id'], row['stat_date'], [row[c] or 0 for c in CONTRIBUTION_COUNTERS], -1)
+
+    contribution_rows = []
+    for row in rows:
+        stat_date = to_stat_date(row['created_at'])
+        for facility_id, counts in sorted(feedback_contributions(row).items()):
+            apply(facility_id, stat_date, counts, 1)
+            contribution_rows.append((row['id'], facility_id, stat_date, *counts))
+            if counts[0]:
+                last_shown[facility_id] = max(last_shown.get(facility_id, ''), stat_date)
+
+    daily = {key: counts for key, counts in daily.items() if any(counts)}
+    totals = {key: counts for key, counts in totals.items() if any(counts) or key in last_shown}
+
+    statements = []
+
+    daily_rows = [
+        (facility_id, stat_date, *counts, round(counts[5] / counts[4], 4) if counts[4] > 0 else 0.0)
+        for (facility_id, stat_date), counts in sorted(daily.items())
+    ]
+    for batch in chunked(daily_rows, PAGE_SIZE):
+        statements.append(f"""
+            INSERT INTO facility_daily_stats (facility_id, stat_date, shown_count, clicked_count,
+                quote_request_count, final_selection_count, feedback_count, satisfaction_sum, satisfaction_avg)
+            VALUES {sql_values(batch)}
+            ON CONFLICT(facility_id, stat_date) DO UPDATE SET
+                shown_count = shown_count + excluded.shown_count,
+                clicked_count = clicked_count + excluded.clicked_count,
+                quote_request_count = quote_request_count + excluded.quote_request_count,
+                final_selection_count = final_selection_count + excluded.final_selection_count,
+                feedback_count = feedback_count + excluded.feedback_count,
+                satisfaction_sum = satisfaction_sum + excluded.satisfaction_sum,
+                satisfaction_avg = CASE WHEN feedback_count + excluded.feedback_count > 0
+                    THEN (satisfaction_sum + excluded.satisfaction_sum) * 1.0 / (feedback_count + excluded.feedback_count)
+                    ELSE 0.0 END,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+
+    total_rows = []
+    for facility_id, (shown, clicked, quotes, finals) in sorted(totals.items()):
+        ctr = round(clicked / shown, 4) if shown > 0 else 0.0
+        cvr = round(quotes / clicked, 4) if clicked > 0 else 0.0
+        total_rows.append((facility_id, shown, clicked, quotes, finals, ctr, cvr, last_shown.get(facility_id)))
+    for batch in chunked(total_rows, PAGE_SIZE):
+        statements.append(f"""
+            INSERT INTO facility_click_stats (facility_id, shown_count, clicked_count, quote_request_count,
+                final_selection_count, click_through_rate, conversion_rate, last_shown_at)
+            VALUES {sql_values(batch)}
+            ON CONFLICT(facility_id) DO UPDATE SET
+                shown_count = shown_count + excluded.shown_count,
+                clicked_count = clicked_count + excluded.clicked_count,
+                quote_request_count = quote_request_count + excluded.quote_request_count,
+                final_selection_count = final_selection_count + excluded.final_selection_count,
+                click_through_rate = COALESCE((clicked_count + excluded.clicked_count) * 1.0
+                    / NULLIF(shown_count + excluded.shown_count, 0), 0.0),
+                conversion_rate = COALESCE((quote_request_count + excluded.quote_request_count) * 1.0
+                    / NULLIF(clicked_count + excluded.clicked_count, 0), 0.0),
+                last_shown_at = COALESCE(MAX(last_shown_at, excluded.last_shown_at), last_shown_at, excluded.last_shown_at),
+                updated_at = CURRENT_TIMESTAMP
+        """)
+
+    statements.append(f"DELETE FROM rollup_feedback_contributions WHERE feedback_id IN ({id_list})")
+    for batch in chunked(contribution_rows, PAGE_SIZE):
+        statements.append(build_insert(
+            'rollup_feedback_contributions',
+            ['feedback_id', 'facility_id', 'stat_date'] + CONTRIBUTION_COUNTERS, batch
+        ))
+
+    return statements
+
+
+def rollup_collection_logs(db, rows):
+    daily = {}
+    for row in rows:
+        key = (row['source'] or '', row['action'] or '', to_stat_date(row['created_at']))
+        counts = daily.setdefault(key, [0, 0, 0, 0, 0])
+        counts[0] += 1
+        counts[1] += 1 if row['status'] == 'success' else 0
+        counts[2] += 1 if row['status'] == 'failed' else 0
+        counts[3] += row['records_processed'] or 0
+        counts[4] += row['execution_time_ms'] or 0
+
+    statements = []
+    stat_rows = [key + tuple(counts) for key, counts in sorted(daily.items())]
+    for batch in chunked(stat_rows, PAGE_SIZE):
+        statements.append(f"""
+            INSERT INTO data_collection_daily_stats (source, action, stat_date, run_count, success_count,
+                failed_count, records_processed, execution_time_ms_sum)
+            VALUES {sql_values(batch)}
+            ON CONFLICT(source, action, stat_date) DO UPDATE SET
+                run_count = run_count + excluded.run_count,
+                success_count = success_count + excluded.success_count,
+                failed_count = failed_count + excluded.failed_count,
+                records_processed = records_processed + excluded.records_processed,
+                execution_time_ms_sum = execution_time_ms_sum + excluded.execution_time_ms_sum,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+    return statements
+
+
+def rollup_reviews(db, rows):
+    """리뷰가 추가/변경된 시설의 facility_rating_stats 를 승인 리뷰 기준으로 재계산"""
+    facility_ids = sorted({row['facility_id'] for row in rows if row['facility_id']})
+    if not facility_ids:
+        return []
+
+    id_list = ', '.join(str(int(i)) for i in facility_ids)
+    averages = ', '.join(f"AVG(rating_{c}) AS avg_{c}" for c in RATING_COLUMNS)
+    stats = {
+        row['facility_id']: row
+        for row in db.query(f"""
+            SELECT facility_id, COUNT(*) AS total_reviews, AVG(rating) AS average_rating,
+                   {averages}, MAX(created_at) AS last_review_date
+            FROM facility_reviews
+            WHERE status = 'approved' AND facility_id IN ({id_list})
+            GROUP BY facility_id
+        """)
+    }
+    distribution = {}
+    for row in db.query(f"""
+        SELECT facility_id, rating, COUNT(*) AS cnt
+        FROM facility_reviews
+        WHERE status = 'approved' AND facility_id IN ({id_list})
+        GROUP BY facility_id, rating
+    """):
+        distribution.setdefault(row['facility_id'], {})[str(row['rating'])] = row['cnt']
+
+    columns = ['facility_id', 'total_reviews', 'average_rating', 'rating_distribution'] + \
+        [f'avg_{c}' for c in RATING_COLUMNS] + ['last_review_date', 'updated_at']
+    now = utc_timestamp()
+
+    stat_rows = []
+    for facility_id in facility_ids:
+        row = stats.get(facility_id, {})
+        counts = {str(r): distribution.get(facility_id, {}).get(str(r), 0) for r in range(1, 6)}
+        stat_rows.append((
+            facility_id,
+            row.get('total_reviews', 0),
+            round(row.get('average_rating') or 0.0, 2),
+            json.dumps(counts),
+            *[round(row.get(f'avg_{c}') or 0.0, 2) for c in RATING_COLUMNS],
+            row.get('last_review_date'),
+            now
+        ))
+
+    return [
+        build_insert('facility_rating_stats', columns, batch,
+                     conflict=['facility_id'], update_columns=columns[1:])
+        for batch in chunked(stat_rows, PAGE_SIZE)
+    ]
+
+
+AGGREGATORS = {
+    'user_matching_feedback': rollup_matching_feedback,
+    'data_collection_logs': rollup_collection_logs,
+    'facility_reviews': rollup_reviews,
+}
+
+
+def rollup_source(db, table, settle_hours=SETTLE_HOURS, page_size=PAGE_SIZE):
+    """워터마크 이후 이벤트를 페이지 단위로 집계
+
+    반환값: (처리한 이벤트 수, 성공 여부)
+    """
+    spec = SOURCES[table]
+    aggregate = AGGREGATORS[table]
+    watermark = load_watermark(db, table)
+    settle_cutoff = utc_timestamp(settle_hours) if spec['settle'] else None
+    processed = 0
+
+    while True:
+        rows = fetch_page(db, table, spec, watermark, settle_cutoff, page_size)
+        if not rows:
+            break
+
+        last = rows[-1]
+        order_column = spec['order_column']
+        watermark = ('' if order_column == 'id' else (last[order_column] or ''), last['id'])
+
+        statements = aggregate(db, rows) + [watermark_statement(table, *watermark)]
+        if not db.execute_all(statements):
+            return processed, False
+
+        processed += len(rows)
+        print(f"   {table}: {processed:,}건 집계", flush=True)
+
+        if len(rows) < page_size:
+            break
+
+    return processed, True
+
+
+def compact_source(db, table, retention_days):
+    """집계가 끝난 원본 중 보존 기간이 지난 행을 청크 단위로 삭제 → 삭제 행 수"""
+    spec = SOURCES[table]
+    watermark = load_watermark(db, table)
+    cutoff = utc_timestamp(retention_days * 24)
+    covered = position_condition(spec['order_column'], *watermark, after=False)
+
+    deleted = 0
+    while True:
+        changes = db.execute(f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table}
+                WHERE created_at < {sql_literal(cutoff)} AND {covered}
+                ORDER BY id LIMIT {DELETE_CHUNK_SIZE}
+            )
+        """)
+        deleted += changes
+        if changes < DELETE_CHUNK_SIZE:
+            break
+
+    # 원본이 지워진 세션은 다시 집계될 일이 없으므로 기여분도 정리
+    while table == 'user_matching_feedback':
+        changes = db.execute(f"""
+            DELETE FROM rollup_feedback_contributions WHERE rowid IN (
+                SELECT c.rowid FROM rollup_feedback_contributions c
+                LEFT JOIN user_matching_feedback f ON f.id = c.feedback_id
+                WHERE f.id IS NULL LIMIT {DELETE_CHUNK_SIZE}
+            )
+        """)
+        if changes < DELETE_CHUNK_SIZE:
+            break
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='이벤트 로그 증분 집계')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--remote', action='store_true', help='Production D1에서 직접 집계')
+    parser.add_argument('--sources', nargs='+', choices=sorted(SOURCES), default=sorted(SOURCES),
+                        help='집계할 원본 테이블 (기본: 전체)')
+    parser.add_argument('--settle-hours', type=int, default=SETTLE_HOURS,
+                        help=f'매칭 세션 종료로 보는 마지막 활동 후 경과 시간 (기본: {SETTLE_HOURS})')
+    parser.add_argument('--retention-days', type=int, help='집계 후 원본 이벤트 보존 기간 (일)')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help=f'페이지 크기 (기본: {PAGE_SIZE})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📊 이벤트 로그 증분 집계")
+    print("=" * 70)
+    print()
+
+    db = open_database(remote=args.remote, db_path=args.db)
+    print(f"   대상: {db.label}")
+    failed = False
+
+    try:
+        for table in args.sources:
+            processed, ok = rollup_source(db, table, args.settle_hours, args.page_size)
+            print(f"   {'✅' if ok else '❌'} {table}: 새 이벤트 {processed:,}건")
+            failed = failed or not ok
+
+            if ok and args.retention_days and SOURCES[table]['compact']:
+                deleted = compact_source(db, table, args.retention_days)
+                print(f"   🗑️  {table}: 보존 기간 지난 원본 {deleted:,}건 삭제")
+    except Exception as e:
+        print(f"❌ 집계 실패: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print()
+    if failed:
+        print("❌ 일부 집계 실패 (워터마크는 성공한 페이지까지만 전진)")
+        sys.exit(1)
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
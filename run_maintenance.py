@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+만료/누적 테이블 정기 정리 스크립트
+
+- sessions, calculation_history, chat_messages, ai_user_sessions,
+  model_performance_logs 를 테이블별 정책(보존 기간, 보관 여부, 실행 주기)으로 정리
+- 시간 컬럼 인덱스 순서로 N행씩 잘라 rowid 목록으로 삭제 (한 문장당 최대 N행)
+  → Production D1 에서도 한 번에 큰 DELETE 를 날려 잠금/타임아웃이 나지 않음
+- 보관 대상 테이블은 삭제 전에 해당 청크를 스냅샷(JSON 배열)으로 먼저 기록
+- 마지막 실행 시각은 maintenance_runs 에 남기고 주기가 된 테이블만 처리
+
+cron 등에서 주기적으로 실행하거나 --loop 로 상주 실행한다.
+    python3 run_maintenance.py --remote             # 주기가 된 테이블만
+    python3 run_maintenance.py --remote --loop      # 10분마다 확인
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from d1_common import BATCH_DELAY, SnapshotWriter, open_database, sql_literal
+
+# 테이블별 정리 정책
+#   time_column: 정리 기준 시간 컬럼 (인덱스 필요, 0026 마이그레이션)
+#   iso_time: 시간 컬럼이 toISOString() 형식('2025-01-01T00:00:00.000Z')인지 여부
+#   retention_days: 시간 컬럼 기준 보존 기간 (sessions 는 만료 후 경과 일수)
+#   archive: 삭제 전 스냅샷 보관 여부
+#   interval_hours: 실행 주기
+POLICIES = {
+    'sessions': {
+        'time_column': 'expires_at', 'iso_time': True,
+        'retention_days': 0, 'archive': False, 'interval_hours': 1,
+    },
+    'calculation_history': {
+        'time_column': 'created_at', 'iso_time': False,
+        'retention_days': 180, 'archive': True, 'interval_hours': 24,
+    },
+    'chat_messages': {
+        'time_column': 'created_at', 'iso_time': False,
+        'retention_days': 365, 'archive': True, 'interval_hours': 24,
+    },
+    'ai_user_sessions': {
+        'time_column': 'created_at', 'iso_time': False,
+        'retention_days': 90, 'archive': True, 'interval_hours': 24,
+    },
+    'model_performance_logs': {
+        'time_column': 'created_at', 'iso_time': False,
+        'retention_days': 365, 'archive': True, 'interval_hours': 168,
+    },
+}
+
+CHUNK_SIZE = 500          # 한 DELETE 문이 지우는 최대 행 수
+MAX_CHUNKS = 200          # 한 번 실행에서 테이블당 최대 청크 수 (나머지는 다음 실행)
+CHECK_MINUTES = 10        # --loop 확인 주기
+ARCHIVE_DIR = 'archive'
+
+
+def format_time(moment, iso=False):
+    if iso:
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def parse_time(value):
+    try:
+        return datetime.strptime(str(value)[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def load_last_runs(db):
+    """{테이블: 마지막 실행 시각(datetime)}"""
+    return {
+        row['table_name']: parse_time(row['last_run_at'])
+        for row in db.query("SELECT table_name, last_run_at FROM maintenance_runs")
+    }
+
+
+def is_due(policy, last_run_at, now):
+    if last_run_at is None:
+        return True
+    return now - last_run_at >= timedelta(hours=policy['interval_hours'])
+
+
+def count_expired(db, table, policy, cutoff):
+    rows = db.query(
+        f"SELECT COUNT(*) AS cnt FROM {table} WHERE {policy['time_column']} < {sql_literal(cutoff)}"
+    )
+    return rows[0]['cnt'] if rows else 0
+
+
+def delete_chunk(db, table, policy, cutoff, chunk_size):
+    """보관 없이 정리: 인덱스 순서로 N행을 골라 삭제 → 삭제 행 수"""
+    column = policy['time_column']
+    return db.execute(f"""
+        DELETE FROM {table} WHERE rowid IN (
+            SELECT rowid FROM {table}
+            WHERE {column} < {sql_literal(cutoff)}
+            ORDER BY {column}, rowid LIMIT {chunk_size}
+        )
+    """)
+
+
+def archive_chunk(db, table, policy, cutoff, chunk_size, writer):
+    """보관 후 정리: N행을 읽어 스냅샷에 기록·확정한 뒤 같은 rowid 만 삭제
+
+    반환값: (보관 행 수, 삭제 행 수)
+    """
+    column = policy['time_column']
+    rows = db.query(f"""
+        SELECT rowid AS _rowid, * FROM {table}
+        WHERE {column} < {sql_literal(cutoff)}
+        ORDER BY {column}, rowid LIMIT {chunk_size}
+    """)
+    if not rows:
+        return 0, 0
+
+    rowids = []
+    for row in rows:
+        rowids.append(int(row.pop('_rowid')))
+        writer.write(row)
+    writer.sync()
+
+    deleted = db.execute(
+        f"DELETE FROM {table} WHERE rowid IN ({', '.join(str(r) for r in rowids)})"
+    )
+    return len(rows), deleted
+
+
+def archive_path(archive_dir, table, now):
+    """보관 스냅샷 경로 (같은 초에 다시 실행해도 기존 보관본을 덮어쓰지 않음)"""
+    base = os.path.join(archive_dir, f"{table}_{now.strftime('%Y%m%d_%H%M%S')}")
+    path, suffix = f"{base}.json", 1
+    while os.path.exists(path):
+        path, suffix = f"{base}_{suffix}.json", suffix + 1
+    return path
+
+
+def purge_table(db, table, policy, now, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS,
+                archive_dir=ARCHIVE_DIR, archive=True, delay=0):
+    """한 테이블 정리 → 결과 dict
+
+    청크 하나가 끝날 때마다 delay 초 쉬어 Production 쓰기 부하를 분산
+    """
+    cutoff = format_time(now - timedelta(days=policy['retention_days']), policy['iso_time'])
+    archive = archive and policy['archive']
+    result = {'cutoff': cutoff, 'deleted': 0, 'archived': 0, 'archive_file': None, 'status': 'success'}
+    writer = None
+
+    try:
+        for chunk_index in range(max_chunks):
+            if archive:
+                if writer is None:
+                    os.makedirs(archive_dir, exist_ok=True)
+                    result['archive_file'] = archive_path(archive_dir, table, now)
+                    writer = SnapshotWriter(result['archive_file'])
+                archived, deleted = archive_chunk(db, table, policy, cutoff, chunk_size, writer)
+                result['archived'] += archived
+                fetched = archived
+            else:
+                deleted = delete_chunk(db, table, policy, cutoff, chunk_size)
+                fetched = deleted
+            result['deleted'] += deleted
+
+            if fetched < chunk_size:
+                break
+            if chunk_index + 1 == max_chunks:
+                # 남은 행은 다음 실행에서 이어서 정리
+                result['status'] = 'partial'
+                break
+            print(f"   {table}: {result['deleted']:,}행 정리", flush=True)
+            if delay:
+                time.sleep(delay)
+    except Exception as e:
+        print(f"   ❌ {table}: {e}")
+        result['status'] = 'failed'
+    finally:
+        if writer is not None:
+            writer.close()
+            if writer.count == 0:
+                os.remove(result['archive_file'])
+                result['archive_file'] = None
+
+    return result
+
+
+def record_run(db, table, now, result):
+    """실행 결과 기록
+
+    partial(청크 한도에 걸려 남은 행이 있음)이면 last_run_at 을 옮기지 않아
+    주기(interval_hours)를 기다리지 않고 다음 실행에서 바로 이어서 정리한다.
+    """
+    last_run_at = None if result['status'] == 'partial' else format_time(now)
+    db.execute(f"""
+        INSERT INTO maintenance_runs
+            (table_name, last_run_at, last_cutoff, deleted_count, archived_count, archive_file, status, updated_at)
+        VALUES ({sql_literal(table)}, {sql_literal(last_run_at)}, {sql_literal(result['cutoff'])},
+                {result['deleted']}, {result['archived']}, {sql_literal(result['archive_file'])},
+                {sql_literal(result['status'])}, CURRENT_TIMESTAMP)
+        ON CONFLICT(table_name) DO UPDATE SET
+            last_run_at = COALESCE(excluded.last_run_at, maintenance_runs.last_run_at),
+            last_cutoff = excluded.last_cutoff,
+            deleted_count = excluded.deleted_count, archived_count = excluded.archived_count,
+            archive_file = excluded.archive_file, status = excluded.status,
+            updated_at = CURRENT_TIMESTAMP
+    """)
+
+
+def run_due(db, tables, args, delay):
+    """주기가 된 테이블 정리 → 실패 테이블 수"""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    last_runs = load_last_runs(db)
+    failures = 0
+
+    for table in tables:
+        policy = POLICIES[table]
+        if not args.force and not is_due(policy, last_runs.get(table), now):
+            continue
+
+        if args.dry_run:
+            cutoff = format_time(now - timedelta(days=policy['retention_days']), policy['iso_time'])
+            print(f"   {table}: {cutoff} 이전 {count_expired(db, table, policy, cutoff):,}행 정리 예정")
+            continue
+
+        result = purge_table(
+            db, table, policy, now,
+            chunk_size=args.chunk_size, max_chunks=args.max_chunks,
+            archive_dir=args.archive_dir, archive=not args.no_archive, delay=delay
+        )
+        icon = {'success': '✅', 'partial': '⏸️ ', 'failed': '❌'}[result['status']]
+        line = f"   {icon} {table}: {result['deleted']:,}행 삭제"
+        if result['archive_file']:
+            line += f" (보관 {result['archived']:,}행 → {result['archive_file']})"
+        print(line)
+
+        record_run(db, table, now, result)
+        if result['status'] == 'failed':
+            failures += 1
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='만료/누적 테이블 정기 정리')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--remote', action='store_true', help='Production D1 정리')
+    parser.add_argument('--tables', nargs='+', choices=sorted(POLICIES), default=sorted(POLICIES),
+                        help='정리할 테이블 (기본: 전체)')
+    parser.add_argument('--force', action='store_true', help='실행 주기와 관계없이 바로 정리')
+    parser.add_argument('--dry-run', action='store_true', help='정리 대상 행 수만 출력')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'DELETE 한 번에 지울 최대 행 수 (기본: {CHUNK_SIZE})')
+    parser.add_argument('--max-chunks', type=int, default=MAX_CHUNKS,
+                        help=f'한 번 실행에서 테이블당 최대 청크 수 (기본: {MAX_CHUNKS})')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help=f'보관 스냅샷 폴더 (기본: {ARCHIVE_DIR})')
+    parser.add_argument('--no-archive', action='store_true', help='보관 없이 삭제만')
+    parser.add_argument('--loop', action='store_true', help='상주하며 주기적으로 확인')
+    parser.add_argument('--check-minutes', type=int, default=CHECK_MINUTES,
+                        help=f'--loop 확인 주기 (분, 기본: {CHECK_MINUTES})')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧹 만료/누적 테이블 정기 정리")
+    print("=" * 70)
+    print()
+
+    db = open_database(remote=args.remote, db_path=args.db)
+    delay = BATCH_DELAY if args.remote else 0
+    print(f"   대상: {db.label}")
+
+    try:
+        while True:
+            failures = run_due(db, args.tables, args, delay)
+            if not args.loop:
+                break
+            time.sleep(args.check_minutes * 60)
+    except KeyboardInterrupt:
+        print("\n⏹️  중단")
+        failures = 0
+    except Exception as e:
+        print(f"❌ 정리 실패: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print()
+    if failures:
+        print(f"❌ {failures}개 테이블 정리 실패")
+        sys.exit(1)
+    print("✅ 완료!")
+
+
+if __name__ == '__main__':
+    main()
@@ -55,6 +55,9 @@ app.post('/generate-test-data', async (c) => {
       const satisfactionScore = finalSelectedFacility ? Math.floor(Math.random() * 3) + 3 : null;
       const matchingAccuracyScore = finalSelectedFacility ? Math.floor(Math.random() * 3) + 3 : null;
 
+      // 최근 30일 내 데이터 (끝난 세션으로 보고 마지막 활동 시각도 같게 → 집계 대기 시간이 바로 지남)
+      const daysAgo = Math.floor(Math.random() * 30);
+
       // user_matching_feedback 테이블에 삽입
       await DB.prepare(`
         INSERT INTO user_matching_feedback (
@@ -62,8 +65,8 @@ app.post('/generate-test-data', async (c) => {
           recommended_facilities, facilities_viewed,
           facilities_compared, quote_requested_facility_id,
           final_selected_facility_id, satisfaction_score,
-          matching_accuracy_score, created_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', '-' || ? || ' days'))
+          matching_accuracy_score, created_at, last_activity_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', '-' || ? || ' days'), datetime('now', '-' || ? || ' days'))
       `).bind(
         userId,
         sessionId,
@@ -75,39 +78,22 @@ app.post('/generate-test-data', async (c) => {
         finalSelectedFacility,
         satisfactionScore,
         matchingAccuracyScore,
-        Math.floor(Math.random() * 30) // 최근 30일 내 데이터
+        daysAgo,
+        daysAgo
       ).run();
 
-      // facility_click_stats 업데이트
-      for (const facilityId of recommendedFacilities) {
-        const isClicked = clickedFacilities.includes(facilityId);
-        const isSelected = facilityId === finalSelectedFacility;
-
-        await DB.prepare(`
-          INSERT INTO facility_click_stats (
-            facility_id, shown_count, clicked_count, 
-            final_selection_count
-          ) VALUES (?, 1, ?, ?)
-          ON CONFLICT(facility_id) DO UPDATE SET
-            shown_count = shown_count + 1,
-            clicked_count = clicked_count + ?,
-            final_selection_count = final_selection_count + ?,
-            click_through_rate = CAST(clicked_count AS REAL) / shown_count,
-            conversion_rate = CAST(quote_request_count AS REAL) / NULLIF(clicked_count, 0)
-        `).bind(
-          facilityId,
-          isClicked ? 1 : 0,
-          isSelected ? 1 : 0,
-          isClicked ? 1 : 0,
-          isSelected ? 1 : 0
-        ).run();
-      }
+      // facility_click_stats 는 rollup_stats.py 가 user_matching_feedback 에서 집계
+      // (여기서 직접 더하면 집계 때 같은 클릭이 두 번 반영됨)
     }
 
     return c.json({
       success: true,
       message: `${count}개의 테스트 데이터가 생성되었습니다.`,
-      generatedCount: count
+      generatedCount: count,
+      // 클릭 통계는 바로 바뀌지 않음 → 집계를 돌려야 반영됨
+      clickStatsUpdated: false,
+      clickStatsNote: 'facility_click_stats 는 rollup_stats.py 집계 후 반영됩니다. '
+        + '바로 확인하려면 python3 rollup_stats.py --remote --sources user_matching_feedback --settle-hours 0 을 실행하세요.'
     });
 
   } catch (error) {
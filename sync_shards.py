@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+시도별 샤드 D1 동기화 스크립트
+
+- shard_map.json 의 시도 → 샤드 D1 매핑으로 로컬 D1 의 시설과 관련 테이블 행을
+  해당 샤드 D1 에 upsert (샤드마다 별도 스레드로 병렬 업로드)
+- 전역 D1(carejoa-production)의 facility_directory 에 시설별 샤드를 기록해
+  지역을 넘는 조회(이름 검색, id → 샤드)는 디렉터리 한 곳에서 처리
+- 시도가 바뀌어 샤드를 옮긴 시설 / 로컬에서 삭제된 시설은 새 샤드 반영이 끝난 뒤에
+  이전 샤드에서 삭제하고, 삭제가 성공한 경우에만 디렉터리를 새 위치로 바꿈
+- 시설 행과 관련 테이블 행의 지문(해시)을 디렉터리에 함께 기록해 두고,
+  지문이 바뀌었거나 샤드를 옮긴 시설만 다시 보냄 (--full 이면 전체 재전송)
+
+샤드 D1 은 미리 만들어 두고 기존 마이그레이션을 그대로 적용한다.
+    npx wrangler d1 create carejoa-shard-capital
+    npx wrangler d1 migrations apply carejoa-shard-capital --remote
+
+facilities.id 는 로컬 D1 의 값을 그대로 쓰므로 샤드 사이에서도 겹치지 않는다.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from d1_common import BATCH_DELAY, BATCH_SIZE, build_insert, chunked, connect_local, execute_remote
+
+SHARD_MAP_PATH = 'shard_map.json'
+
+# 표준 시도명 → 데이터에 섞여 있는 다른 표기
+SIDO_ALIASES = {
+    '서울특별시': ['서울', '서울시'],
+    '부산광역시': ['부산', '부산시'],
+    '대구광역시': ['대구', '대구시'],
+    '인천광역시': ['인천', '인천시'],
+    '광주광역시': ['광주', '광주시', '전라도광주'],
+    '대전광역시': ['대전', '대전시'],
+    '울산광역시': ['울산', '울산시'],
+    '세종특별자치시': ['세종', '세종시'],
+    '경기도': ['경기'],
+    '강원특별자치도': ['강원', '강원도'],
+    '충청북도': ['충북'],
+    '충청남도': ['충남'],
+    '전북특별자치도': ['전북', '전라북도'],
+    '전라남도': ['전남'],
+    '경상북도': ['경북'],
+    '경상남도': ['경남'],
+    '제주특별자치도': ['제주', '제주도'],
+}
+SIDO_LOOKUP = {alias: name for name, aliases in SIDO_ALIASES.items() for alias in [name, *aliases]}
+
+# 샤드로 보내는 테이블 (순서대로 upsert, 삭제는 역순 - 다시 보낼 때 관련 행은 삭제 후 재삽입)
+#   filter: 시설 id 로 행을 고르는 컬럼, conflict: upsert 기준 컬럼,
+#   exclude: 로컬/샤드에서 값이 다를 수 있어 보내지 않는 컬럼
+SHARD_TABLES = {
+    'facilities': {'filter': 'id', 'conflict': 'id', 'exclude': []},
+    'facility_details': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': []},
+    'facility_settings': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': []},
+    'facility_realtime_capacity': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': ['id']},
+    'facility_availability': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': []},
+    'facility_click_stats': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': []},
+    'facility_ai_scores': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': ['id']},
+    'facility_rating_stats': {'filter': 'facility_id', 'conflict': 'facility_id', 'exclude': []},
+    'facility_reviews': {'filter': 'facility_id', 'conflict': 'id', 'exclude': []},
+}
+
+DIRECTORY_COLUMNS = ['facility_id', 'name', 'facility_type', 'sido', 'sigungu', 'shard', 'fingerprint']
+
+
+def normalize_sido(sido, address=''):
+    """시도 표기 통일 (서울 → 서울특별시), 비어 있으면 주소 첫 단어 사용"""
+    value = (sido or '').strip()
+    if not value and address:
+        value = address.split()[0] if address.split() else ''
+    return SIDO_LOOKUP.get(value, value)
+
+
+class ShardMap:
+    """shard_map.json: {"global": 전역 D1, "default": 기본 샤드, "shards": {샤드 D1: [시도...]}}"""
+
+    def __init__(self, global_database, default, shards):
+        self.global_database = global_database
+        self.default = default
+        self.shards = list(shards)
+        self.by_sido = {}
+        for shard, sidos in shards.items():
+            for sido in sidos:
+                name = normalize_sido(sido)
+                if self.by_sido.get(name, shard) != shard:
+                    raise ValueError(f"{name} 이(가) 여러 샤드에 지정됨: {self.by_sido[name]}, {shard}")
+                self.by_sido[name] = shard
+        if default not in self.shards:
+            raise ValueError(f"기본 샤드 {default} 가 shards 에 없습니다")
+
+    @classmethod
+    def load(cls, path=SHARD_MAP_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['global'], data['default'], data['shards'])
+
+    def shard_for(self, sido):
+        return self.by_sido.get(sido, self.default)
+
+
+def existing_tables(conn):
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in SHARD_TABLES if table in names]
+
+
+def table_columns(conn, table):
+    exclude = set(SHARD_TABLES[table]['exclude'])
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] not in exclude]
+
+
+def load_directory(conn):
+    """로컬 facility_directory (전역 D1 에 반영된 내용과 같음) → {facility_id: dict}"""
+    return {
+        row['facility_id']: dict(row)
+        for row in conn.execute(f"SELECT {', '.join(DIRECTORY_COLUMNS)} FROM facility_directory")
+    }
+
+
+def facility_fingerprints(conn, tables):
+    """시설 id → 샤드로 보내는 행 전체(시설 + 관련 테이블)의 해시"""
+    hashers = {}
+    for table in tables:
+        config = SHARD_TABLES[table]
+        columns = table_columns(conn, table)
+        for row in conn.execute(
+            f"SELECT {config['filter']}, {', '.join(columns)} FROM {table} "
+            f"ORDER BY {config['filter']}, {config['conflict']}"
+        ):
+            hasher = hashers.setdefault(row[0], hashlib.sha1())
+            hasher.update(json.dumps([table, *row[1:]], ensure_ascii=False, default=str).encode('utf-8'))
+    return {facility_id: hasher.hexdigest()[:16] for facility_id, hasher in hashers.items()}
+
+
+def plan_sync(conn, shard_map, full=False):
+    """로컬 시설 → (디렉터리 항목, 현재 디렉터리, 샤드별 {'upsert': [...], 'delete': [...]}, 기본 샤드로 간 시도)
+
+    upsert 는 디렉터리에 없거나, 샤드가 바뀌었거나, 지문이 달라진 시설만 (full 이면 전체).
+    """
+    fingerprints = facility_fingerprints(conn, existing_tables(conn))
+    entries = {}
+    unmapped = {}
+    for row in conn.execute("SELECT id, name, facility_type, sido, sigungu, address FROM facilities ORDER BY id"):
+        sido = normalize_sido(row['sido'], row['address'])
+        if sido not in shard_map.by_sido:
+            unmapped[sido] = unmapped.get(sido, 0) + 1
+        entries[row['id']] = {
+            'facility_id': row['id'], 'name': row['name'], 'facility_type': row['facility_type'],
+            'sido': sido, 'sigungu': row['sigungu'], 'shard': shard_map.shard_for(sido),
+            'fingerprint': fingerprints.get(row['id']),
+        }
+
+    directory = load_directory(conn)
+    plans = {shard: {'upsert': [], 'delete': []} for shard in shard_map.shards}
+    for facility_id, entry in entries.items():
+        current = directory.get(facility_id)
+        if full or current is None or current['shard'] != entry['shard'] \
+                or current['fingerprint'] != entry['fingerprint']:
+            plans[entry['shard']]['upsert'].append(facility_id)
+    for facility_id, current in directory.items():
+        entry = entries.get(facility_id)
+        if entry is None or entry['shard'] != current['shard']:
+            plans.setdefault(current['shard'], {'upsert': [], 'delete': []})['delete'].append(facility_id)
+    return entries, directory, plans, unmapped
+
+
+def upsert_statements(conn, tables, facility_ids, batch_size):
+    """시설 id 묶음 → 관련 테이블 기존 행 삭제 + 테이블별 upsert 문 (관련 행도 batch_size 행씩)
+
+    upsert 만 보내면 로컬에서 지운 관련 행(리뷰 등)이 샤드에 남으므로, 같은 호출 안에서
+    관련 테이블의 해당 시설 행을 먼저 지우고 로컬의 현재 행을 다시 넣는다.
+    """
+    placeholders = ', '.join('?' * len(facility_ids))
+    statements = delete_statements([table for table in tables if table != 'facilities'], facility_ids)
+    for table in tables:
+        config = SHARD_TABLES[table]
+        columns = table_columns(conn, table)
+        rows = conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {config['filter']} IN ({placeholders})",
+            facility_ids
+        ).fetchall()
+        for batch in chunked([tuple(row) for row in rows], batch_size):
+            statements.append(build_insert(
+                table, columns, batch,
+                conflict=[config['conflict']], update_columns=[c for c in columns if c != config['conflict']]
+            ))
+    return statements
+
+
+def delete_statements(tables, facility_ids):
+    ids = ', '.join(str(int(i)) for i in facility_ids)
+    return [f"DELETE FROM {table} WHERE {SHARD_TABLES[table]['filter']} IN ({ids})" for table in reversed(tables)]
+
+
+def sync_shard_upserts(db_path, shard, facility_ids, batch_size=BATCH_SIZE, delay=BATCH_DELAY):
+    """한 샤드에 시설 묶음 단위로 upsert (스레드마다 로컬 연결을 따로 연다) → 반영된 시설 id 집합"""
+    conn = connect_local(db_path)
+    tables = existing_tables(conn)
+    synced = set()
+    total = (len(facility_ids) + batch_size - 1) // batch_size
+    try:
+        for i, batch in enumerate(chunked(facility_ids, batch_size), start=1):
+            statements = upsert_statements(conn, tables, batch, batch_size)
+            success, error = execute_remote(';\n'.join(statements), database=shard)
+            if success:
+                synced.update(batch)
+                print(f"   [{shard}] {i}/{total} ✅ {len(batch)}개 시설", flush=True)
+            else:
+                print(f"   [{shard}] {i}/{total} ❌ {error}", flush=True)
+            time.sleep(delay)
+    finally:
+        conn.close()
+    return synced
+
+
+def delete_from_shard(db_path, shard, facility_ids, batch_size=BATCH_SIZE, delay=BATCH_DELAY):
+    """이전 샤드에서 시설과 관련 행 삭제 → 삭제된 시설 id 집합"""
+    conn = connect_local(db_path)
+    tables = existing_tables(conn)
+    conn.close()
+    deleted = set()
+    for batch in chunked(facility_ids, batch_size):
+        success, error = execute_remote(';\n'.join(delete_statements(tables, batch)), database=shard)
+        if success:
+            deleted.update(batch)
+        else:
+            print(f"   [{shard}] ❌ 삭제 실패: {error}", flush=True)
+        time.sleep(delay)
+    if deleted:
+        print(f"   [{shard}] 🗑️  {len(deleted):,}개 시설 삭제", flush=True)
+    return deleted
+
+
+def update_directory(conn, global_database, upserts, deletes, batch_size=BATCH_SIZE):
+    """전역 D1 facility_directory 반영 후 성공한 배치만 로컬 사본에 기록 → 실패 건수"""
+    failed = 0
+    for batch in chunked(upserts, batch_size):
+        sql = build_insert(
+            'facility_directory', DIRECTORY_COLUMNS, [tuple(entry[c] for c in DIRECTORY_COLUMNS) for entry in batch],
+            conflict=['facility_id'], update_columns=DIRECTORY_COLUMNS[1:]
+        ) + ", synced_at = CURRENT_TIMESTAMP"
+        success, error = execute_remote(sql, database=global_database)
+        if not success:
+            print(f"   ❌ 디렉터리 반영 실패: {error}")
+            failed += len(batch)
+            continue
+        with conn:
+            conn.execute(sql)
+
+    for batch in chunked(deletes, batch_size):
+        sql = f"DELETE FROM facility_directory WHERE facility_id IN ({', '.join(str(int(i)) for i in batch)})"
+        success, error = execute_remote(sql, database=global_database)
+        if not success:
+            print(f"   ❌ 디렉터리 삭제 실패: {error}")
+            failed += len(batch)
+            continue
+        with conn:
+            conn.execute(sql)
+    return failed
+
+
+def run_parallel(function, jobs, workers):
+    """{샤드: 인자 튜플} 를 샤드별 스레드로 실행 → {샤드: 결과}"""
+    if not jobs:
+        return {}
+    with ThreadPoolExecutor(max_workers=workers or len(jobs)) as executor:
+        futures = {shard: executor.submit(function, *args) for shard, args in jobs.items()}
+        return {shard: future.result() for shard, future in futures.items()}
+
+
+def sync(conn, db_path, shard_map, only_shards=None, batch_size=BATCH_SIZE, workers=None, dry_run=False,
+         full=False):
+    """샤드 동기화 → 실패 건수 (0 이면 전체 성공)"""
+    entries, directory, plans, unmapped = plan_sync(conn, shard_map, full)
+    if only_shards:
+        plans = {shard: plan for shard, plan in plans.items() if shard in only_shards}
+
+    for sido, count in sorted(unmapped.items()):
+        print(f"   ⚠️  매핑 없는 시도 '{sido or '(비어 있음)'}' {count:,}개 → {shard_map.default}")
+    for shard, plan in plans.items():
+        print(f"   {shard}: upsert {len(plan['upsert']):,}개 / 삭제 {len(plan['delete']):,}개")
+    if dry_run:
+        return 0
+
+    # 1) 새 위치에 먼저 반영
+    synced = run_parallel(sync_shard_upserts, {
+        shard: (db_path, shard, plan['upsert'], batch_size) for shard, plan in plans.items() if plan['upsert']
+    }, workers)
+    all_synced = set().union(*synced.values()) if synced else set()
+
+    # 2) 새 위치 반영이 끝난(또는 로컬에서 삭제된) 시설만 이전 샤드에서 삭제
+    delete_jobs = {}
+    for shard, plan in plans.items():
+        ready = [i for i in plan['delete'] if i not in entries or i in all_synced]
+        if ready:
+            delete_jobs[shard] = (db_path, shard, ready, batch_size)
+    deleted = run_parallel(delete_from_shard, delete_jobs, workers)
+    all_deleted = set().union(*deleted.values()) if deleted else set()
+
+    # 3) 디렉터리: 바뀐 항목만 (옮긴 시설은 이전 샤드 삭제까지 끝난 경우에만)
+    #    지문은 반영에 성공한 시설만 바뀌므로 실패한 시설은 다음 동기화 때 다시 보냄
+    directory_upserts = []
+    for facility_id in sorted(all_synced):
+        entry = entries[facility_id]
+        current = directory.get(facility_id)
+        if current == entry:
+            continue
+        if current is not None and current['shard'] != entry['shard'] and facility_id not in all_deleted:
+            continue
+        directory_upserts.append(entry)
+    directory_deletes = sorted(i for i in all_deleted if i not in entries)
+    directory_failed = update_directory(conn, shard_map.global_database, directory_upserts, directory_deletes,
+                                        batch_size)
+
+    upsert_failed = sum(len(plan['upsert']) for plan in plans.values()) - len(all_synced)
+    delete_failed = sum(len(job[2]) for job in delete_jobs.values()) - len(all_deleted)
+    print()
+    print(f"   샤드 반영: {len(all_synced):,}개 (실패 {upsert_failed:,}개)")
+    print(f"   이전 샤드 삭제: {len(all_deleted):,}개 (실패 {delete_failed:,}개)")
+    print(f"   디렉터리: 갱신 {len(directory_upserts):,}개 / 삭제 {len(directory_deletes):,}개 (실패 {directory_failed:,}개)")
+    return upsert_failed + delete_failed + directory_failed
+
+
+def print_status(conn, shard_map):
+    print(f"   전역 D1: {shard_map.global_database}")
+    counts = dict(conn.execute("SELECT shard, COUNT(*) FROM facility_directory GROUP BY shard").fetchall())
+    for shard in shard_map.shards:
+        sidos = [sido for sido, target in shard_map.by_sido.items() if target == shard]
+        default = ' (기본)' if shard == shard_map.default else ''
+        print(f"   - {shard}{default}: {counts.pop(shard, 0):,}개 / {', '.join(sidos)}")
+    for shard, count in counts.items():
+        print(f"   - {shard} (매핑에서 빠짐): {count:,}개 → 다음 동기화 때 다른 샤드로 이동")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='시도별 샤드 D1 동기화')
+    parser.add_argument('--db', help='로컬 SQLite 경로 (기본: 로컬 D1)')
+    parser.add_argument('--shard-map', default=SHARD_MAP_PATH, help=f'샤드 매핑 파일 (기본: {SHARD_MAP_PATH})')
+    parser.add_argument('--shards', nargs='+', help='이 샤드만 동기화 (기본: 전체)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f'배치당 시설 수 (기본: {BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, help='동시에 업로드할 샤드 수 (기본: 샤드 수)')
+    parser.add_argument('--full', action='store_true', help='지문과 상관없이 전체 시설 재전송 (샤드 D1 을 새로 만든 뒤)')
+    parser.add_argument('--dry-run', action='store_true', help='샤드별 반영 계획만 출력')
+    parser.add_argument('--status', action='store_true', help='샤드 매핑과 디렉터리 현황 출력')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🗺️  시도별 샤드 D1 동기화")
+    print("=" * 70)
+    print()
+
+    try:
+        shard_map = ShardMap.load(args.shard_map)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ 샤드 매핑 오류: {e}")
+        sys.exit(1)
+
+    unknown = set(args.shards or []) - set(shard_map.shards)
+    if unknown:
+        print(f"❌ 매핑에 없는 샤드: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    conn = connect_local(args.db)
+    started = time.time()
+    try:
+        if args.status:
+            print_status(conn, shard_map)
+            failed = 0
+        else:
+            failed = sync(conn, args.db, shard_map, only_shards=args.shards, batch_size=args.batch_size,
+                          workers=args.workers, dry_run=args.dry_run, full=args.full)
+    except Exception as e:
+        print(f"❌ 동기화 실패: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print()
+    print(f"✅ 완료! ({time.time() - started:.1f}초)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()